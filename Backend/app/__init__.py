@@ -1,9 +1,16 @@
 import os
+import hmac
 import logging
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 
 from .config import config_map
-from .extensions import db, jwt, cors, limiter, is_token_revoked
+from .extensions import (
+    db, jwt, cors, limiter, is_token_revoked, token_blocklist,
+    user_cache, token_version_cache, batch_cache, dashboard_cache, cache_version_cache, password_hasher, job_queue,
+    firestore_metrics, repository,
+)
+from .middleware.request_metrics import init_request_metrics
+from .utils.passwords import PasswordPoolBusy
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,8 +23,25 @@ def create_app(config_name=None):
     app.config.from_object(config_map.get(config_name, config_map['development']))
 
     # --- Initialize Extensions ---
+    # First, so requests the rate limiter rejects are still counted
+    init_request_metrics(app)
     jwt.init_app(app)
     limiter.init_app(app)
+    user_cache.configure(
+        maxsize=app.config.get('USER_CACHE_MAXSIZE'),
+        ttl=app.config.get('USER_CACHE_TTL'),
+    )
+    token_version_cache.configure(ttl=app.config.get('TOKEN_VERSION_TTL'))
+    batch_cache.configure(
+        maxsize=app.config.get('BATCH_CACHE_MAXSIZE'),
+        ttl=app.config.get('BATCH_CACHE_TTL'),
+    )
+    dashboard_cache.configure(ttl=app.config.get('DASHBOARD_CACHE_TTL'))
+    cache_version_cache.configure(ttl=app.config.get('HTTP_CACHE_VERSION_TTL'))
+    token_blocklist.init_app(app, client=db)
+    password_hasher.init_app(app)
+    job_queue.init_app(app)
+    repository.init_app(app)
 
     # --- CORS ---
     # We add your Firebase URL directly to the list
@@ -71,7 +95,7 @@ def create_app(config_name=None):
     # --- JWT Blocks ---
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        return is_token_revoked(jwt_payload["jti"])
+        return is_token_revoked(jwt_payload["jti"], jwt_payload.get("exp"))
 
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -96,6 +120,7 @@ def create_app(config_name=None):
     from .routes.batch import batch_bp
     from .routes.dashboard import dashboard_bp
     from .routes.reports import reports_bp
+    from .routes.jobs import jobs_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(faculty_bp, url_prefix='/api/faculty')
@@ -103,6 +128,11 @@ def create_app(config_name=None):
     app.register_blueprint(batch_bp, url_prefix='/api/batch')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+
+    # --- CLI maintenance commands ---
+    from .commands import register_commands
+    register_commands(app)
 
     # --- Health Check (Now checks Firestore) ---
     @app.route('/api/health', methods=['GET'])
@@ -118,8 +148,30 @@ def create_app(config_name=None):
         return jsonify({
             "status": "healthy",
             "database": db_status,
+            "caches": {
+                "users": user_cache.stats(),
+                "tokenVersions": token_version_cache.stats(),
+                "batches": batch_cache.stats(),
+                "dashboards": dashboard_cache.stats(),
+                "cacheVersions": cache_version_cache.stats(),
+            },
         }), 200
 
+    # --- Metrics (Prometheus text format) ---
+    @app.route('/api/metrics', methods=['GET'])
+    @limiter.exempt
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token:
+            # Never public outside development
+            if not app.config.get('DEBUG'):
+                return jsonify({"error": "Resource not found"}), 404
+        else:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(supplied, token):
+                return jsonify({"error": "Authorization token required"}), 401
+        return firestore_metrics.prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
     # --- Global Error Handlers ---
     @app.errorhandler(404)
     def not_found(error):
@@ -134,5 +186,11 @@ def create_app(config_name=None):
     def rate_limit_error(error):
         return jsonify({"error": "Too many requests. Please slow down."}), 429
 
+    @app.errorhandler(PasswordPoolBusy)
+    def password_pool_busy(error):
+        response = jsonify({"error": "Server is busy. Please try again in a moment.", "code": "SERVER_BUSY"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
     logger.info(f"✅ App created with '{config_name}' configuration")
     return app
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+asgi/__init__.py
+
+ASGI serving mode (entry point: Backend/asgi.py).
+
+Under gunicorn gthread a worker makes progress on at most `threads` requests
+at once, each thread parked on its Firestore RPCs. Here the hot endpoints in
+asgi/routes.py run as coroutines on the async Firestore client, so a single
+process overlaps the I/O of hundreds of concurrent student submissions.
+Every other route is served by the unchanged Flask app through a2wsgi, on a
+pool of ASGI_WSGI_THREADS threads.
+
+Both modes share the Flask app's configuration, caches, rate limiter and
+JWT settings, and answer the same requests with the same bodies and status
+codes.
+"""
+
+import logging
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Match
+
+from ..extensions import firestore_metrics
+from ..middleware.request_metrics import log_request_cost
+from .responses import json_response, DELEGATED
+from .routes import ROUTES
+
+logger = logging.getLogger(__name__)
+
+
+class _SecurityHeaders:
+    """The headers Talisman adds to Flask responses in production."""
+
+    HEADERS = [
+        (b'x-frame-options', b'DENY'),
+        (b'x-content-type-options', b'nosniff'),
+        (b'referrer-policy', b'strict-origin-when-cross-origin'),
+    ]
+    HSTS = (b'strict-transport-security', b'max-age=31536000; includeSubDomains')
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + self.HEADERS
+                if scope.get('scheme') == 'https':
+                    message['headers'].append(self.HSTS)
+            await send(message)
+        await self.app(scope, receive, send_with_headers)
+
+
+class _Dispatcher:
+    """Sends requests for the native routes to Starlette and the rest to Flask."""
+
+    def __init__(self, flask_app, native, fallback):
+        self.flask_app = flask_app
+        self.native = native
+        self.fallback = fallback
+
+    def _native_route(self, scope):
+        # A partial match (right path, other method) still goes to Starlette so
+        # the CORS middleware can answer preflight requests for it
+        return next((route for route in ROUTES if route.matches(scope)[0] != Match.NONE), None)
+
+    async def _serve_native(self, route, scope, receive, send):
+        """Runs a native route with the accounting of middleware/request_metrics.py."""
+        config = self.flask_app.config
+        started = time.perf_counter()
+        token = firestore_metrics.begin_request()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start' and not scope.get(DELEGATED):
+                status = message['status']
+                if config.get('SERVER_TIMING_ENABLED'):
+                    timing = firestore_metrics.current().server_timing(time.perf_counter() - started)
+                    message['headers'] = list(message.get('headers', [])) + [(b'server-timing', timing.encode())]
+            await send(message)
+
+        try:
+            await self.native(scope, receive, send_with_timing)
+        finally:
+            seconds = time.perf_counter() - started
+            cost = firestore_metrics.current()
+            if not scope.get(DELEGATED):
+                firestore_metrics.observe_request(route.name, status, cost, seconds)
+                if config.get('REQUEST_COST_LOGGING'):
+                    log_request_cost(scope['method'], scope['path'], route.name, status, seconds, cost)
+            firestore_metrics.end_request(token)
+
+    async def __call__(self, scope, receive, send):
+        route = self._native_route(scope) if scope['type'] == 'http' else None
+        if scope['type'] == 'lifespan':
+            await self.native(scope, receive, send)
+        elif route is not None:
+            with self.flask_app.app_context():
+                await self._serve_native(route, scope, receive, send)
+        else:
+            await self.fallback(scope, receive, send)
+
+
+def create_asgi_app(flask_app):
+    fallback = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS'))
+
+    origins = flask_app.config.get('CORS_ORIGINS')
+    if isinstance(origins, str):
+        origins = [o.strip() for o in origins.split(',')]
+    middleware = [Middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+    )]
+    if not flask_app.config.get('TESTING') and not flask_app.config.get('DEBUG'):
+        middleware.append(Middleware(_SecurityHeaders))
+
+    async def internal_error(request, exc):
+        logger.error(f"Internal server error: {exc}")
+        return json_response({"error": "Internal server error"}, 500)
+
+    native = Starlette(routes=ROUTES, middleware=middleware, exception_handlers={500: internal_error})
+    native.state.flask_app = flask_app
+    native.state.fallback = fallback
+    return _Dispatcher(flask_app, native, fallback)
@@ -0,0 +1,94 @@
+"""
+asgi/auth.py
+
+require_auth / require_role for the native ASGI routes.
+
+The token itself is verified by flask-jwt-extended against the Flask app's
+configuration (headers or cookies, blocklist and all) on a worker thread,
+since the blocklist lookup may block. The principal is then resolved with the
+async client, through the same caches as middleware/auth_middleware.py.
+"""
+
+import logging
+from functools import wraps
+
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from starlette.concurrency import run_in_threadpool
+
+from ..extensions import user_cache, token_version_cache
+from ..middleware.auth_middleware import remember_user, uses_embedded_claims, claims_principal
+from ..models.user import User
+from .firestore import async_db, stream
+from .responses import json_response
+
+logger = logging.getLogger(__name__)
+
+
+def _verify_token(flask_app, path, headers):
+    with flask_app.test_request_context(path, headers=headers):
+        verify_jwt_in_request()
+        return get_jwt_identity(), get_jwt()
+
+
+async def _load_active_user(user_id):
+    cached = user_cache.get(user_id, None)
+    if cached is not None:
+        return dict(cached)
+
+    query = async_db().collection(User.COLLECTION)\
+        .where('user_id', '==', user_id).where('is_active', '==', True).limit(1)
+    user_data = None
+    for doc in await stream(query):
+        user_data = doc.to_dict()
+        user_data['id'] = doc.id
+    return remember_user(user_id, user_data)
+
+
+async def _current_token_version(user_id):
+    version = token_version_cache.get(user_id, None)
+    if version is None:
+        doc = await async_db().collection(User.TOKEN_VERSION_COLLECTION).document(user_id).get()
+        version = (doc.to_dict() or {}).get('version', 0) if doc.exists else 0
+        token_version_cache.set(user_id, version)
+    return version
+
+
+async def _load_principal(user_id, claims):
+    if not uses_embedded_claims(claims):
+        return await _load_active_user(user_id)
+    if claims['tv'] != await _current_token_version(user_id):
+        return None
+    return claims_principal(user_id, claims)
+
+
+def require_role(allowed_roles=None):
+    """
+    Wraps `handler(request, user)`; with no roles any authenticated user is
+    allowed. Errors answer exactly like the Flask decorators.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(request):
+            flask_app = request.app.state.flask_app
+            try:
+                user_id, claims = await run_in_threadpool(
+                    _verify_token, flask_app, request.url.path, list(request.headers.items()))
+            except Exception as e:
+                logger.warning(f"JWT verification failed for {request.url.path}: {e}")
+                return json_response({"error": "Authentication required", "code": "INVALID_TOKEN"}, 401)
+
+            try:
+                user_data = await _load_principal(user_id, claims)
+                if not user_data:
+                    return json_response({"error": "User account not found or deactivated", "code": "INVALID_TOKEN"}, 401)
+
+                if allowed_roles and user_data.get('role') not in allowed_roles:
+                    logger.warning(f"RBAC denied: user={user_id}, role={user_data.get('role')}, required={allowed_roles}")
+                    return json_response({"error": "Access forbidden: insufficient permissions"}, 403)
+
+                return await handler(request, user_data)
+            except Exception as e:
+                logger.error(f"DB error during auth for {request.url.path}: {e}")
+                return json_response({"error": "Service temporarily unavailable", "code": "DB_ERROR"}, 503)
+        return wrapper
+    return decorator
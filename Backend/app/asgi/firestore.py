@@ -0,0 +1,41 @@
+"""
+asgi/firestore.py
+
+The AsyncClient used by the native ASGI routes.
+
+The client opens its gRPC channel on the event loop that first uses it, so
+it is created lazily from inside a request rather than at import time. Model
+helpers that only queue writes (WriteBatch / Transaction .set and .update)
+work unchanged with the async client's transactions; reads go through here.
+Its RPCs are counted like the sync client's (utils/firestore_metrics.py).
+"""
+
+from firebase_admin import firestore_async
+
+from ..extensions import firestore_metrics
+
+_client = None
+
+
+def async_db():
+    global _client
+    if _client is None:
+        _client = firestore_metrics.instrument(firestore_async.client())
+    return _client
+
+
+def async_ref(ref):
+    """The async client's reference to the same document as a sync `ref`."""
+    return async_db().document(ref.path)
+
+
+async def get_all(refs, **kwargs):
+    """Multi-get of sync or async references; returns a list of snapshots."""
+    refs = [async_ref(ref) for ref in refs]
+    if not refs:
+        return []
+    return [snap async for snap in async_db().get_all(refs, **kwargs)]
+
+
+async def stream(query):
+    return [doc async for doc in query.stream()]
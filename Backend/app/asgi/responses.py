@@ -0,0 +1,56 @@
+"""
+asgi/responses.py
+
+Response helpers for the native ASGI routes, matching what the Flask views
+send for the same request.
+"""
+
+from email.utils import format_datetime
+
+from flask import current_app
+from starlette.responses import Response
+from werkzeug.http import parse_etags
+
+
+def json_response(payload, status=200, headers=None):
+    """JSON encoded by the Flask app's provider, as jsonify() would."""
+    return Response(current_app.json.dumps(payload), status_code=status,
+                    headers=headers, media_type='application/json')
+
+
+def matches_etag(request, etag):
+    return parse_etags(request.headers.get('if-none-match')).contains(etag)
+
+
+def conditional(request, etag, render, last_modified=None):
+    """
+    304 if the request's If-None-Match matches `etag`, otherwise `render()`;
+    both carry the validators and Cache-Control of middleware/http_cache.py.
+    Non-200 renders are returned as they are.
+    """
+    if matches_etag(request, etag):
+        response = Response(status_code=304)
+    else:
+        response = render()
+        if response.status_code != 200:
+            return response
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if last_modified:
+        response.headers['Last-Modified'] = format_datetime(last_modified, usegmt=True)
+    return response
+
+
+# Set in the scope of requests handed to Flask, which does their accounting
+DELEGATED = 'fds.delegated'
+
+
+class DelegateToFlask(Response):
+    """Hands the request, unread, to the Flask app instead."""
+
+    def __init__(self):
+        super().__init__()
+
+    async def __call__(self, scope, receive, send):
+        scope[DELEGATED] = True
+        await scope['app'].state.fallback(scope, receive, send)
@@ -0,0 +1,254 @@
+"""
+asgi/routes.py
+
+Async versions of the hot endpoints. Each mirrors its Flask view and shares
+its validation, payload and cache helpers; only the Firestore I/O differs.
+
+    GET  /api/batch/<id>                    routes/batch.get_batch
+    POST /api/feedback/submit               routes/feedback.submit_feedback
+    GET  /api/feedback/faculty/<id>/stats   routes/feedback.get_faculty_stats
+    GET  /api/dashboard/admin               routes/dashboard.admin_dashboard (snapshot path)
+    GET  /api/dashboard/hod                 routes/dashboard.hod_dashboard
+
+The submission, stats and admin dashboard routes read and write feedback
+through the async Firestore client; with STORAGE_BACKEND=sql they hand the
+request to the Flask view instead (see repositories/).
+"""
+
+import asyncio
+from functools import wraps
+
+from google.cloud.firestore import async_transactional
+from limits import parse as parse_limit
+from starlette.convertors import Convertor, register_url_convertor
+from starlette.routing import Route
+
+from ..extensions import limiter, repository, DEFAULT_RATE_LIMIT
+from ..middleware.http_cache import compute_etag
+from ..models.batch import Batch
+from ..models.faculty import Faculty
+from ..models.feedback import FeedbackSubmission
+from ..repositories import SubmissionRejected, check_batch_open, check_capacity
+from ..repositories.firestore import (
+    SUBMIT_TRANSACTION_ATTEMPTS, submission_doc_id, open_batch_data, check_not_submitted, queue_submission,
+)
+from ..routes.feedback import SUBMIT_RATE_LIMIT, resolve_client_ip, ratings_from_responses
+from ..utils.aggregates import FacultyAggregate
+from ..utils.batch_cache import peek_batch, store_batch
+from ..utils.cache import MISSING
+from ..utils.cache_versions import CacheVersion, VERSION_FACULTY, VERSION_BATCHES
+from ..utils.counters import SubmissionCounter
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from .auth import require_role
+from .firestore import async_db, get_all, stream
+from .responses import json_response, conditional, matches_etag, DelegateToFlask
+
+
+class _BatchIdConvertor(Convertor):
+    """Batch ids, minus the static /api/batch/list and /api/batch/sections routes."""
+    regex = r"(?!(?:list|sections)$)[^/]+"
+
+    def convert(self, value):
+        return value
+
+    def to_string(self, value):
+        return value
+
+
+register_url_convertor('batch_id', _BatchIdConvertor())
+
+
+def _rate_limited(request, endpoint, limit=DEFAULT_RATE_LIMIT):
+    """Applies a Flask-Limiter limit string, keyed like get_remote_address."""
+    if not limiter.enabled:
+        return None
+    remote = request.client.host if request.client else '127.0.0.1'
+    if limiter.limiter.hit(parse_limit(limit), endpoint, remote):
+        return None
+    return json_response({"error": "Too many requests. Please slow down."}, 429)
+
+
+def _firestore_storage(view):
+    """Serves the route natively only when feedback is stored in Firestore."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if repository.name != 'firestore':
+            return DelegateToFlask()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _batch_data(batch_id):
+    data = peek_batch(batch_id)
+    if data is MISSING:
+        doc = await async_db().collection(Batch.COLLECTION).document(batch_id).get()
+        data = store_batch(batch_id, doc.to_dict() if doc.exists else None)
+    return data
+
+
+async def _marker_versions(markers):
+    versions, missing = CacheVersion.from_cache(markers)
+    if missing:
+        CacheVersion.store(versions, await get_all(missing, field_paths=[]))
+    return versions
+
+
+def _full_path(request):
+    # Same form as werkzeug's request.full_path, so ETags match the Flask views'
+    return f"{request.url.path}?{request.url.query}"
+
+
+# ── Student endpoints ───────────────────────────────────────────────────────
+
+async def get_batch(request):
+    limited = _rate_limited(request, 'batch.get_batch')
+    if limited:
+        return limited
+    data = await _batch_data(request.path_params['batch_id'])
+    if not data or not data.get('is_active'):
+        return json_response({"error": "Batch not found"}, 404)
+    return json_response({"batch": Batch.to_dict(request.path_params['batch_id'], data)})
+
+
+@async_transactional
+async def _submit_in_transaction(transaction, batch_ref, submission_ref, client_ip, comments, ratings_map):
+    """Async counterpart of repositories/firestore._submit_in_transaction."""
+    batch_data = open_batch_data(await batch_ref.get(transaction=transaction))
+    check_not_submitted(await submission_ref.get(transaction=transaction))
+
+    total_students = batch_data.get('total_students', 0)
+    if total_students > 0:
+        shards = await get_all(SubmissionCounter.shard_refs(batch_ref.id), transaction=transaction)
+        check_capacity(total_students, SubmissionCounter.tally({batch_ref.id: 0}, shards)[batch_ref.id])
+
+    queue_submission(transaction, batch_ref.id, batch_data, submission_ref, client_ip, comments, ratings_map)
+
+
+@_firestore_storage
+async def submit_feedback(request):
+    limited = _rate_limited(request, 'feedback.submit_feedback', SUBMIT_RATE_LIMIT)
+    if limited:
+        return limited
+    data = await request.json()
+    batch_id_str = data.get('batchId', '')
+    comments = data.get('comments', '')
+    client_ip = resolve_client_ip(request.headers.get('X-Forwarded-For'),
+                                  request.client.host if request.client else None)
+    ratings_map = ratings_from_responses(data.get('responses', []))
+
+    batch_data = await _batch_data(batch_id_str) if batch_id_str else None
+    submission_ref = async_db().collection(FeedbackSubmission.COLLECTION)\
+        .document(submission_doc_id(batch_id_str, client_ip))
+    try:
+        check_batch_open(batch_data)
+        await _submit_in_transaction(
+            async_db().transaction(max_attempts=SUBMIT_TRANSACTION_ATTEMPTS),
+            async_db().collection(Batch.COLLECTION).document(batch_id_str),
+            submission_ref, client_ip, comments, ratings_map,
+        )
+    except SubmissionRejected as e:
+        return json_response({"error": e.message}, e.status)
+
+    return json_response({"success": True, "message": "Feedback submitted"}, 201)
+
+
+# ── Staff read endpoints ────────────────────────────────────────────────────
+
+@_firestore_storage
+@require_role(['hod', 'admin'])
+async def get_faculty_stats(request, user):
+    limited = _rate_limited(request, 'feedback.get_faculty_stats')
+    if limited:
+        return limited
+    faculty_id = request.path_params['faculty_id']
+    refs = FacultyAggregate.shard_refs(faculty_id)
+    versions = await _marker_versions(refs)
+    etag = compute_etag(user.get('user_id'), _full_path(request), refs, versions)
+
+    stats = None
+    if not matches_etag(request, etag):
+        aggregates = FacultyAggregate.tally({faculty_id: None}, await get_all(refs))
+        stats = FacultyAggregate.to_stats(aggregates[faculty_id])
+
+    def render():
+        if stats is None:
+            return json_response({"stats": None, "message": "No feedback data"})
+        return json_response({"stats": stats})
+    return conditional(request, etag, render, max((v for v in versions.values() if v), default=None))
+
+
+@_firestore_storage
+@require_role(['admin'])
+async def admin_dashboard(request, user):
+    limited = _rate_limited(request, 'dashboard.admin_dashboard')
+    if limited:
+        return limited
+    college = user.get('college')
+    snapshot = DashboardSnapshot.cached(college)
+    if snapshot is MISSING:
+        scope = DashboardSnapshot.scope(college)
+        doc = await async_db().collection(DashboardSnapshot.COLLECTION).document(scope).get()
+        data = doc.to_dict() if doc.exists else None
+        if not DashboardSnapshot.is_built(data):
+            # Flask logs the missing snapshot and answers from live queries
+            return DelegateToFlask()
+        if college:
+            shards = await get_all(SubmissionCounter.shard_refs(scope))
+            submissions = SubmissionCounter.tally({scope: 0}, shards)[scope]
+        else:
+            result = await async_db().collection(FeedbackSubmission.COLLECTION).count().get()
+            submissions = result[0][0].value
+        snapshot = DashboardSnapshot.remember(college, DashboardSnapshot.payload(data, submissions))
+
+    etag, payload = snapshot
+    return conditional(request, etag, lambda: json_response(payload))
+
+
+@require_role(['hod'])
+async def hod_dashboard(request, user):
+    limited = _rate_limited(request, 'dashboard.hod_dashboard')
+    if limited:
+        return limited
+    college, dept = user.get('college'), user.get('department')
+    markers = [CacheVersion.ref(VERSION_FACULTY, college, dept), CacheVersion.ref(VERSION_BATCHES, college, dept)]
+    versions = await _marker_versions(markers)
+    etag = compute_etag(user.get('user_id'), _full_path(request), markers, versions)
+
+    payload = None
+    if not matches_etag(request, etag):
+        f_query = async_db().collection(Faculty.COLLECTION)\
+            .where('college', '==', college)\
+            .where('department', '==', dept)\
+            .where('is_active', '==', True)
+        b_query = async_db().collection(Batch.COLLECTION)\
+            .where('college', '==', college)\
+            .where('department', '==', dept)\
+            .where('is_active', '==', True)
+        f_docs, b_docs = await asyncio.gather(stream(f_query), stream(b_query))
+        payload = {
+            "faculty": [Faculty.to_dict(d.id, d.to_dict()) for d in f_docs],
+            "batches": [Batch.to_dict(d.id, d.to_dict()) for d in b_docs],
+            "college": college,
+            "department": dept,
+        }
+
+    stamps = [v for v in versions.values() if v]
+    return conditional(request, etag, lambda: json_response(payload), max(stamps) if stamps else None)
+
+
+async def _admin_dashboard_route(request):
+    # Paginated requests (?limit etc.) use the live queries in the Flask view
+    if request.query_params:
+        return DelegateToFlask()
+    return await admin_dashboard(request)
+
+
+# Named after the Flask endpoints, so /api/metrics reports both modes alike
+ROUTES = [
+    Route('/api/batch/{batch_id:batch_id}', get_batch, methods=['GET'], name='batch.get_batch'),
+    Route('/api/feedback/submit', submit_feedback, methods=['POST'], name='feedback.submit_feedback'),
+    Route('/api/feedback/faculty/{faculty_id}/stats', get_faculty_stats, methods=['GET'],
+          name='feedback.get_faculty_stats'),
+    Route('/api/dashboard/admin', _admin_dashboard_route, methods=['GET'], name='dashboard.admin_dashboard'),
+    Route('/api/dashboard/hod', hod_dashboard, methods=['GET'], name='dashboard.hod_dashboard'),
+]
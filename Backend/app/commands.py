@@ -0,0 +1,213 @@
+"""
+commands.py
+
+Maintenance commands registered on the Flask CLI. Run from Backend/, e.g.:
+
+    flask --app run backfill-login-identifiers
+"""
+
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from .extensions import db, repository
+from .models.user import User
+from .models.batch import Batch
+from .models.feedback import FeedbackSubmission
+from .utils.counters import SubmissionCounter
+from .utils.aggregates import FacultyAggregate
+from .utils.bulk import BATCH_WRITE_LIMIT
+from .utils.dashboard_snapshot import DashboardSnapshot
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_login_identifiers)
+    app.cli.add_command(backfill_submission_faculty_ids)
+    app.cli.add_command(reconcile_submission_counters)
+    app.cli.add_command(rebuild_faculty_aggregates)
+    app.cli.add_command(rebuild_dashboard_snapshots)
+    app.cli.add_command(init_sql_storage)
+
+
+@click.command('backfill-login-identifiers')
+@with_appcontext
+def backfill_login_identifiers():
+    """
+    Populate users.login_identifiers for accounts created before it existed,
+    and list active accounts whose identifiers only differ in case (login
+    matches them case-insensitively). Then set LOGIN_IDENTIFIER_FALLBACK=false.
+    """
+    batch = db.batch()
+    pending = scanned = updated = 0
+    owners = {}
+
+    for doc in db.collection(User.COLLECTION).stream():
+        scanned += 1
+        data = doc.to_dict()
+        identifiers = User.login_identifiers(data)
+        if data.get('is_active'):
+            for key in identifiers:
+                owners.setdefault(key, []).append(data.get('user_id') or doc.id)
+        if data.get('login_identifiers') == identifiers:
+            continue
+
+        batch.update(doc.reference, {'login_identifiers': identifiers})
+        pending += 1
+        updated += 1
+        if pending >= BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+    click.echo(f"Scanned {scanned} users, updated {updated}.")
+    for key, user_ids in sorted(owners.items()):
+        if len(user_ids) > 1:
+            click.echo(f"  '{key}' is shared by {', '.join(user_ids)}; "
+                       f"login prefers user_id over email over mobile, then the exact-case match.")
+
+
+@click.command('backfill-submission-faculty-ids')
+@click.option('--start-after', default=None, help='Resume after this submission id (printed as each page commits).')
+@click.option('--page-size', default=BATCH_WRITE_LIMIT, show_default=True, help='Submissions read per page.')
+@with_appcontext
+def backfill_submission_faculty_ids(start_after, page_size):
+    """Populate feedback_submissions.faculty_ids for submissions written before it existed."""
+    collection = db.collection(FeedbackSubmission.COLLECTION)
+    query = collection.order_by(FieldPath.document_id()).select(['ratings', 'faculty_ids'])
+    page_size = min(page_size, BATCH_WRITE_LIMIT)
+    scanned = updated = 0
+    last = start_after
+
+    # Pages in document id order, committing each page before reading the
+    # next, so an interrupted run can continue from the last id it printed.
+    while True:
+        page_query = query.limit(page_size)
+        if last is not None:
+            page_query = page_query.start_after({FieldPath.document_id(): collection.document(last)})
+        page = list(page_query.stream())
+        if not page:
+            break
+
+        batch = db.batch()
+        pending = 0
+        for doc in page:
+            data = doc.to_dict()
+            faculty_ids = sorted(data.get('ratings') or {})
+            if data.get('faculty_ids') == faculty_ids:
+                continue
+            batch.update(doc.reference, {'faculty_ids': faculty_ids})
+            pending += 1
+        if pending:
+            batch.commit()
+
+        scanned += len(page)
+        updated += pending
+        last = page[-1].id
+        click.echo(f"{scanned} scanned, {updated} updated; resume with --start-after {last}")
+        if len(page) < page_size:
+            break
+
+    click.echo(f"Scanned {scanned} submissions, updated {updated}.")
+
+
+@click.command('reconcile-submission-counters')
+@click.option('--batch-id', default=None, help='Only rebuild this batch (default: every batch).')
+@with_appcontext
+def reconcile_submission_counters(batch_id):
+    """Rebuild the sharded per-batch submission counters from feedback_submissions."""
+    if batch_id:
+        batch_ids = [batch_id]
+    else:
+        batch_ids = [doc.id for doc in db.collection(Batch.COLLECTION).select([]).stream()]
+
+    drifted = 0
+    for bid in batch_ids:
+        actual = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', '==', bid).count().get()[0][0].value
+        if SubmissionCounter.get_count(bid) == actual:
+            continue
+        writer = db.batch()
+        SubmissionCounter.reset(writer, bid, actual)
+        writer.commit()
+        drifted += 1
+        click.echo(f"{bid}: reset to {actual}")
+    click.echo(f"Checked {len(batch_ids)} batches, corrected {drifted}.")
+
+
+@click.command('rebuild-faculty-aggregates')
+@click.option('--faculty-id', default=None, help='Only rebuild this faculty member (default: everyone).')
+@with_appcontext
+def rebuild_faculty_aggregates(faculty_id):
+    """Recompute faculty_aggregates from feedback_submissions."""
+    query = db.collection(FeedbackSubmission.COLLECTION)
+    if faculty_id:
+        query = FeedbackSubmission.faculty_query(
+            query, faculty_id, legacy=current_app.config.get('SUBMISSION_FACULTY_IDS_FALLBACK'))
+
+    totals = {}
+    scanned = 0
+    for doc in query.select(FeedbackSubmission.RATING_FIELDS).stream():
+        scanned += 1
+        data = doc.to_dict()
+        if faculty_id:
+            ratings = {faculty_id: FeedbackSubmission.faculty_ratings(data, faculty_id)}
+        else:
+            ratings = FeedbackSubmission.ratings(data)
+        FacultyAggregate.accumulate(totals, data.get('slot', 1), ratings)
+
+    # list_documents() includes the missing parents of shard subcollections
+    if faculty_id:
+        stale = [] if faculty_id in totals else [faculty_id]
+    else:
+        stale = [ref.id for ref in db.collection(FacultyAggregate.COLLECTION).list_documents() if ref.id not in totals]
+
+    # Everything lands in shard 0; the other shards and the unsharded
+    # document of older versions are cleared
+    now = datetime.now(timezone.utc)
+    writes = []
+    for fid in list(totals) + stale:
+        shards = FacultyAggregate.shard_refs(fid)
+        if fid in totals:
+            writes.append((shards[0], {'faculty_id': fid, 'slots': totals[fid], 'updated_at': now}))
+            shards = shards[1:]
+        writes += [(ref, None) for ref in shards]
+        writes.append((db.collection(FacultyAggregate.COLLECTION).document(fid), None))
+
+    batch = db.batch()
+    pending = 0
+    for ref, data in writes:
+        if data is None:
+            batch.delete(ref)
+        else:
+            batch.set(ref, data)
+        pending += 1
+        if pending >= BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+    click.echo(f"Scanned {scanned} submissions, rebuilt {len(totals)} faculty aggregates, removed {len(stale)}.")
+
+
+@click.command('rebuild-dashboard-snapshots')
+@with_appcontext
+def rebuild_dashboard_snapshots():
+    """Recompute dashboard_snapshots and the per-college submission counters."""
+    written = DashboardSnapshot.rebuild()
+    click.echo(f"Rebuilt {written} dashboard snapshots.")
+
+
+@click.command('init-sql-storage')
+@with_appcontext
+def init_sql_storage():
+    """Create the feedback tables at DATABASE_URL for STORAGE_BACKEND=sql (SQLite; use Alembic on Postgres)."""
+    if repository.name != 'sql':
+        raise click.ClickException("STORAGE_BACKEND is not 'sql'; nothing to create.")
+    repository.create_schema()
+    click.echo(f"Created the feedback tables at {repository.engine.url.render_as_string(hide_password=True)}.")
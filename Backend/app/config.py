@@ -30,6 +30,99 @@ class BaseConfig:
         'http://localhost:5173,https://rise-fds.web.app,https://rise-fds.firebaseapp.com'
     ).split(',')
 
+    # Per-process cache of authenticated users (require_auth / require_role)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))
+    USER_CACHE_MAXSIZE = int(os.getenv('USER_CACHE_MAXSIZE', 1024))
+
+    # Request threads per gunicorn worker (gunicorn_config.py reads the same variable)
+    REQUEST_THREADS = int(os.getenv('GUNICORN_THREADS', 2))
+
+    # bcrypt cost and the per-worker process pool that runs it.
+    # Hashes with a different cost are transparently upgraded on the next login.
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', os.cpu_count() or 1))
+    # 0 → REQUEST_THREADS - 1, so one request thread is never stuck behind bcrypt
+    PASSWORD_POOL_MAX_PENDING = int(os.getenv('PASSWORD_POOL_MAX_PENDING', 0))
+    PASSWORD_POOL_TIMEOUT = int(os.getenv('PASSWORD_POOL_TIMEOUT', 10))
+
+    # Fall back to the old user_id → email → mobile queries when the
+    # login_identifiers lookup misses, storing login_identifiers on the account
+    # found. Disable once `flask backfill-login-identifiers` has run; until then
+    # every failed login costs three more queries.
+    LOGIN_IDENTIFIER_FALLBACK = os.getenv('LOGIN_IDENTIFIER_FALLBACK', 'true').lower() == 'true'
+
+    # Find a faculty member's submissions by the ratings map key instead of the
+    # faculty_ids array. Disable once `flask backfill-submission-faculty-ids` has run.
+    SUBMISSION_FACULTY_IDS_FALLBACK = os.getenv('SUBMISSION_FACULTY_IDS_FALLBACK', 'true').lower() == 'true'
+
+    # Per-process cache of batch documents (student link + submit endpoints)
+    BATCH_CACHE_TTL = int(os.getenv('BATCH_CACHE_TTL', 30))
+    BATCH_CACHE_NEGATIVE_TTL = int(os.getenv('BATCH_CACHE_NEGATIVE_TTL', 10))
+    BATCH_CACHE_MAXSIZE = int(os.getenv('BATCH_CACHE_MAXSIZE', 512))
+
+    # How long a worker serves (and answers If-None-Match for) an assembled admin dashboard
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 15))
+
+    # How long a worker trusts its cached ETag version markers; writes made on
+    # another instance can be answered with 304 for up to this long
+    HTTP_CACHE_VERSION_TTL = int(os.getenv('HTTP_CACHE_VERSION_TTL', 5))
+
+    # POST /api/feedback/faculty/stats/multi: aggregate documents are read as
+    # multi-gets of CHUNK_SIZE ids, up to WORKERS at once
+    MULTI_STATS_MAX_IDS = int(os.getenv('MULTI_STATS_MAX_IDS', 500))
+    MULTI_STATS_CHUNK_SIZE = int(os.getenv('MULTI_STATS_CHUNK_SIZE', 100))
+    MULTI_STATS_WORKERS = int(os.getenv('MULTI_STATS_WORKERS', 4))
+
+    # Largest ?limit accepted by the paginated list endpoints
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 500))
+
+    # Streaming report exports page through Firestore this many documents at a time
+    REPORT_EXPORT_PAGE_SIZE = int(os.getenv('REPORT_EXPORT_PAGE_SIZE', 500))
+
+    # Background report jobs: worker threads per process, artifact directory
+    # (shared by all workers on a host) and how long finished jobs are kept
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_DIR = os.getenv('JOB_DIR', '')
+    JOB_TTL = int(os.getenv('JOB_TTL', 3600))
+
+    # Cascade deletes / deactivations (utils/bulk.py): concurrent batch commits,
+    # attempts per commit, and the size above which they run as a background job
+    BULK_WRITE_PARALLELISM = int(os.getenv('BULK_WRITE_PARALLELISM', 4))
+    BULK_WRITE_ATTEMPTS = int(os.getenv('BULK_WRITE_ATTEMPTS', 5))
+    BULK_JOB_THRESHOLD = int(os.getenv('BULK_JOB_THRESHOLD', 2000))
+
+    # ASGI mode (asgi.py): threads serving the routes that still run on Flask
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 8))
+
+    # Firestore cost accounting (utils/firestore_metrics.py): a Server-Timing
+    # header and a log line per request. /api/metrics requires METRICS_TOKEN as
+    # a bearer token; without one it is only served in DEBUG (development).
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    REQUEST_COST_LOGGING = os.getenv('REQUEST_COST_LOGGING', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # Turn off only for load tests that send every request from one address
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+
+    # Opt-in: embed role/college/department + token version in access tokens so
+    # protected routes authorize without reading the user document.
+    JWT_EMBED_USER_CLAIMS = os.getenv('JWT_EMBED_USER_CLAIMS', 'false').lower() == 'true'
+    # How long a worker trusts its cached copy of a user's token version.
+    TOKEN_VERSION_TTL = int(os.getenv('TOKEN_VERSION_TTL', 300))
+
+    # Feedback storage: 'firestore', or 'sql' for the schema in migrations/ at
+    # DATABASE_URL (SQLite or Postgres); see repositories/__init__.py
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+    DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///fds.db')
+
+    # Revoked-token storage: 'memory' (single worker only), 'firestore' or 'redis'
+    BLOCKLIST_BACKEND = os.getenv('BLOCKLIST_BACKEND', 'memory')
+    BLOCKLIST_NEGATIVE_TTL = int(os.getenv('BLOCKLIST_NEGATIVE_TTL', 5))
+    BLOCKLIST_NEGATIVE_CACHE_SIZE = int(os.getenv('BLOCKLIST_NEGATIVE_CACHE_SIZE', 10000))
+    # Accept tokens when the shared backend is unreachable instead of rejecting them
+    BLOCKLIST_FAIL_OPEN = os.getenv('BLOCKLIST_FAIL_OPEN', 'false').lower() == 'true'
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
     JWT_COOKIE_SECURE = False
@@ -37,6 +130,8 @@ class DevelopmentConfig(BaseConfig):
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    # Shared across gunicorn workers and Cloud Run instances
+    BLOCKLIST_BACKEND = os.getenv('BLOCKLIST_BACKEND', 'firestore')
     # CRITICAL for Cloud Run: Secure must be True for HTTPS
     JWT_COOKIE_SECURE = True
     JWT_COOKIE_SAMESITE = 'None' 
@@ -6,24 +6,62 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
 
+from .utils.cache import TTLCache
+from .utils.firestore_metrics import FirestoreMetrics
+from .utils.token_blocklist import TokenBlocklist
+from .utils.passwords import PasswordHasher
+from .utils.jobs import JobQueue
+from .repositories import Repository
+
 # Initialize Firebase Admin SDK
 # On Google Cloud Run, it automatically uses the built-in Service Account
 if not _apps:
     initialize_app()
 
-db = firestore.client()  # This is now your primary Database gateway
+# Firestore ops and RPC time per request / endpoint; see utils/firestore_metrics.py
+firestore_metrics = FirestoreMetrics()
+
+db = firestore_metrics.instrument(firestore.client())  # This is now your primary Database gateway
 jwt = JWTManager()
 cors = CORS()
 talisman = Talisman()
 
 # Rate Limiter (Stay on Memory for free tier unless you add Redis later)
-limiter = Limiter(key_func=get_remote_address, default_limits=["200 per minute"])
+DEFAULT_RATE_LIMIT = "200 per minute"
+limiter = Limiter(key_func=get_remote_address, default_limits=[DEFAULT_RATE_LIMIT])
+
+# bcrypt off the request threads; sized from PASSWORD_POOL_* in create_app()
+password_hasher = PasswordHasher()
+
+# Background report jobs (in-process threads + local file store); see utils/jobs.py
+job_queue = JobQueue()
+
+# Feedback submissions / stats storage; backend chosen by STORAGE_BACKEND in create_app().
+# See repositories/__init__.py
+repository = Repository()
+
+# Per-process cache of authenticated user principals, keyed by JWT identity.
+# Sized / timed from USER_CACHE_MAXSIZE and USER_CACHE_TTL in create_app().
+user_cache = TTLCache()
+
+# Per-process cache of batch documents for the public student endpoints.
+batch_cache = TTLCache(maxsize=512, ttl=30)
+
+# Per-process cache of assembled admin dashboards + ETags (utils/dashboard_snapshot.py).
+dashboard_cache = TTLCache(maxsize=256, ttl=15)
+
+# Per-process cache of HTTP cache version markers (utils/cache_versions.py).
+cache_version_cache = TTLCache(maxsize=4096, ttl=5)
+
+# Per-process cache of token version counters (JWT_EMBED_USER_CLAIMS mode).
+token_version_cache = TTLCache(maxsize=4096)
 
-# --- JWT Blocklist Logic (Cleaned up) ---
-TOKEN_BLOCKLIST: set = set()
+# --- JWT Blocklist Logic ---
+# Backend chosen by BLOCKLIST_BACKEND in create_app(); see utils/token_blocklist.py
+token_blocklist = TokenBlocklist()
 
-def add_to_blocklist(jti: str) -> None:
-    TOKEN_BLOCKLIST.add(jti)
+def add_to_blocklist(jti: str, expires_at: float) -> None:
+    token_blocklist.add(jti, expires_at)
 
-def is_token_revoked(jti: str) -> bool:
-    return jti in TOKEN_BLOCKLIST
\ No newline at end of file
+def is_token_revoked(jti: str, expires_at: float = None) -> bool:
+    return token_blocklist.is_revoked(jti, expires_at)
\ No newline at end of file
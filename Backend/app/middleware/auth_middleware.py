@@ -1,12 +1,94 @@
 import logging
 from functools import wraps
-from flask import request, jsonify, g
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from ..extensions import db
+from flask import request, jsonify, g, current_app
+from firebase_admin import firestore
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from ..extensions import db, user_cache, token_version_cache
 from ..models.user import User
 
 logger = logging.getLogger(__name__)
 
+# Never kept in the principal cache or exposed on g.current_user.
+_PRIVATE_FIELDS = ('password_hash', 'reset_otp', 'reset_otp_expiry')
+
+def _load_active_user(user_id):
+    """
+    Returns the active user document for `user_id` as a dict (with 'id' set to
+    the Firestore document id), or None if the account is missing/deactivated.
+    Served from user_cache when fresh; routes that change a user's profile,
+    password or active flag must call user_cache.invalidate(user_id).
+    """
+    cached = user_cache.get(user_id, None)
+    if cached is not None:
+        return dict(cached)
+
+    docs = db.collection(User.COLLECTION).where('user_id', '==', user_id).where('is_active', '==', True).limit(1).stream()
+
+    user_data = None
+    for doc in docs:
+        user_data = doc.to_dict()
+        user_data['id'] = doc.id
+        break
+
+    return remember_user(user_id, user_data)
+
+def remember_user(user_id, user_data):
+    """Strips private fields from a freshly read user, caches it and returns a copy."""
+    if not user_data:
+        return None
+
+    for field in _PRIVATE_FIELDS:
+        user_data.pop(field, None)
+    user_cache.set(user_id, user_data)
+    return dict(user_data)
+
+def current_token_version(user_id):
+    """
+    Returns the user's token version counter (0 if never bumped). Cached per
+    worker for TOKEN_VERSION_TTL seconds, so a bump made on another instance
+    takes effect there within that window; bumps made here apply immediately.
+    """
+    version = token_version_cache.get(user_id, None)
+    if version is None:
+        doc = db.collection(User.TOKEN_VERSION_COLLECTION).document(user_id).get()
+        version = (doc.to_dict() or {}).get('version', 0) if doc.exists else 0
+        token_version_cache.set(user_id, version)
+    return version
+
+def bump_token_version(user_id):
+    """Invalidates every claims-bearing access token issued to `user_id`."""
+    db.collection(User.TOKEN_VERSION_COLLECTION).document(user_id).set(
+        {'version': firestore.Increment(1)}, merge=True
+    )
+    token_version_cache.invalidate(user_id)
+    user_cache.invalidate(user_id)
+
+def _load_principal(user_id):
+    """
+    Resolves g.current_user for the verified token. Tokens minted with embedded
+    claims are authorized from the claims plus the (cached) token version;
+    everything else falls back to the user document.
+    """
+    claims = get_jwt()
+    if not uses_embedded_claims(claims):
+        return _load_active_user(user_id)
+
+    if claims['tv'] != current_token_version(user_id):
+        return None
+    return claims_principal(user_id, claims)
+
+def uses_embedded_claims(claims):
+    return 'tv' in claims and current_app.config.get('JWT_EMBED_USER_CLAIMS')
+
+def claims_principal(user_id, claims):
+    return {
+        'id': claims.get('uid'),
+        'user_id': user_id,
+        'role': claims.get('role'),
+        'college': claims.get('college'),
+        'department': claims.get('department'),
+    }
+
 def require_auth(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
@@ -15,20 +97,12 @@ def require_auth(fn):
         except Exception as e:
             logger.warning(f"JWT verification failed for {request.path}: {e}")
             return jsonify({"error": "Authentication required", "code": "INVALID_TOKEN"}), 401
-        
+
         try:
-            user_id = get_jwt_identity()
-            docs = db.collection(User.COLLECTION).where('user_id', '==', user_id).where('is_active', '==', True).limit(1).stream()
-            
-            user_data = None
-            for doc in docs:
-                user_data = doc.to_dict()
-                user_data['id'] = doc.id
-                break
-                
+            user_data = _load_principal(get_jwt_identity())
             if not user_data:
                 return jsonify({"error": "User account not found or deactivated", "code": "INVALID_TOKEN"}), 401
-                
+
             g.current_user = user_data
             return fn(*args, **kwargs)
         except Exception as e:
@@ -45,28 +119,21 @@ def require_role(allowed_roles):
             except Exception as e:
                 logger.warning(f"JWT verification failed for {request.path}: {e}")
                 return jsonify({"error": "Authentication required", "code": "INVALID_TOKEN"}), 401
-            
+
             try:
                 user_id = get_jwt_identity()
-                docs = db.collection(User.COLLECTION).where('user_id', '==', user_id).where('is_active', '==', True).limit(1).stream()
-                
-                user_data = None
-                for doc in docs:
-                    user_data = doc.to_dict()
-                    user_data['id'] = doc.id
-                    break
-                    
+                user_data = _load_principal(user_id)
                 if not user_data:
                     return jsonify({"error": "User account not found or deactivated", "code": "INVALID_TOKEN"}), 401
-                    
+
                 if user_data.get('role') not in allowed_roles:
                     logger.warning(f"RBAC denied: user={user_id}, role={user_data.get('role')}, required={allowed_roles}")
                     return jsonify({"error": "Access forbidden: insufficient permissions"}), 403
-                    
+
                 g.current_user = user_data
                 return fn(*args, **kwargs)
             except Exception as e:
                 logger.error(f"DB error during auth for {request.path}: {e}")
                 return jsonify({"error": "Service temporarily unavailable", "code": "DB_ERROR"}), 503
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,73 @@
+"""
+middleware/http_cache.py
+
+Conditional GETs for the authenticated read endpoints.
+
+    @faculty_bp.route('', methods=['GET'])
+    @require_auth
+    @http_cached(lambda user, **kw: [CacheVersion.ref(VERSION_FACULTY, ...)])
+    def get_all_faculty(): ...
+
+The ETag is derived from the version markers the response depends on (see
+utils/cache_versions.py) plus the caller and the full request path, never from
+the response body, so a matching If-None-Match is answered with 304 before the
+view, and any Firestore query in it, runs. Last-Modified is the newest marker
+commit time; it is informational only, since one-second HTTP dates are too
+coarse to validate against.
+
+Responses are marked `private, no-cache`: browsers keep them but revalidate on
+every use. A write on another instance is noticed once this worker's cached
+markers expire (HTTP_CACHE_VERSION_TTL).
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import g, make_response, request
+
+from ..utils.cache_versions import CacheVersion
+
+
+def compute_etag(user_id, full_path, markers, versions):
+    """
+    ETag for `full_path` ('/path?query', as werkzeug's request.full_path) as
+    seen by `user_id`, given the marker refs and their {path: version}.
+    """
+    parts = [user_id or '', full_path]
+    for ref in markers:
+        version = versions.get(ref.path)
+        parts.append(f"{ref.path}@{version.isoformat() if version else 0}")
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def http_cached(markers_for):
+    """
+    Adds ETag / Cache-Control handling to a GET view. `markers_for(user,
+    **view_args)` returns the version marker references the response depends
+    on, or None if it has none and must not be revalidated. Must be applied
+    below require_auth / require_role.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            markers = markers_for(g.current_user, **kwargs)
+            if markers is None:
+                return fn(*args, **kwargs)
+            versions = CacheVersion.get_many(markers)
+            etag = compute_etag(g.current_user.get('user_id'), request.full_path, markers, versions)
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            stamps = [v for v in versions.values() if v]
+            if stamps:
+                response.last_modified = max(stamps)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+"""
+middleware/request_metrics.py
+
+Reports each request's Firestore cost (utils/firestore_metrics.py): a
+Server-Timing header, one log line with the counts as structured fields, and
+the per-endpoint totals behind /api/metrics.
+
+The header is set when the response leaves the view; the totals and the log
+line are taken at teardown, so reads made while a streamed body is generated
+are included there.
+"""
+
+import logging
+import time
+
+from flask import g, request
+
+from ..extensions import firestore_metrics
+
+logger = logging.getLogger(__name__)
+
+# Requests that matched no route (404s, CORS preflight for unknown paths)
+UNMATCHED = 'unmatched'
+
+
+def log_request_cost(method, path, endpoint, status, seconds, cost):
+    fields = cost.to_dict() if cost else {}
+    logger.info(
+        f"{method} {path} {status} {seconds * 1000:.1f}ms "
+        + ' '.join(f"{key}={value}" for key, value in fields.items()),
+        extra={'endpoint': endpoint, 'status': status, 'durationMs': round(seconds * 1000, 1), 'firestore': fields},
+    )
+
+
+def init_request_metrics(app):
+    @app.before_request
+    def start_request_cost():
+        g.request_started = time.perf_counter()
+        g.request_cost_token = firestore_metrics.begin_request()
+
+    @app.after_request
+    def add_server_timing(response):
+        g.response_status = response.status_code
+        cost = firestore_metrics.current()
+        if cost is not None and app.config.get('SERVER_TIMING_ENABLED'):
+            response.headers['Server-Timing'] = cost.server_timing(time.perf_counter() - g.request_started)
+        return response
+
+    @app.teardown_request
+    def finish_request_cost(exc):
+        token = g.pop('request_cost_token', None)
+        if token is None:
+            return
+        seconds = time.perf_counter() - g.request_started
+        cost = firestore_metrics.current()
+        status = g.get('response_status', 500)
+        endpoint = request.endpoint or UNMATCHED
+        firestore_metrics.observe_request(endpoint, status, cost, seconds)
+        if app.config.get('REQUEST_COST_LOGGING'):
+            log_request_cost(request.method, request.path, endpoint, status, seconds, cost)
+        firestore_metrics.end_request(token)
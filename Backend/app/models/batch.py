@@ -4,6 +4,27 @@ from datetime import datetime, timezone
 class Batch:
     COLLECTION = 'batches'
 
+    # API key → Firestore field it is read from (list projections / ordering).
+    # responseCount is computed, not stored.
+    FIELDS = {
+        'college': 'college',
+        'dept': 'department',
+        'branch': 'branch',
+        'year': 'year',
+        'sem': 'semester',
+        'sec': 'section',
+        'slot': 'slot',
+        'slotStartDate': 'slot_start_date',
+        'slotEndDate': 'slot_end_date',
+        'slotLabel': 'slot_label',
+        'totalStudents': 'total_students',
+        'created': 'created_at',
+        'createdTimestamp': 'created_at',
+        'faculty': 'faculty',
+        'responseCount': None,
+        'isActive': 'is_active',
+    }
+
     @staticmethod
     def _safe_isoformat(value):
         """
@@ -26,11 +47,11 @@ class Batch:
         return str(value)
 
     @staticmethod
-    def to_dict(doc_id, data, submission_count=0):
+    def to_dict(doc_id, data, submission_count=0, fields=None):
         # In Firestore, faculty data is embedded directly in the batch document
         faculty_list = data.get('faculty', [])
 
-        return {
+        result = {
             'id': data.get('batch_id', doc_id),
             'college': data.get('college', ''),
             'dept': data.get('department', ''),
@@ -56,4 +77,7 @@ class Batch:
             'faculty': faculty_list,
             'responseCount': submission_count,
             'isActive': data.get('is_active', True),
-        }
\ No newline at end of file
+        }
+        if fields:
+            result = {k: v for k, v in result.items() if k == 'id' or k in fields}
+        return result
@@ -3,9 +3,23 @@ from datetime import datetime, timezone
 class Faculty:
     COLLECTION = 'faculty'
 
+    # API key → Firestore field it is read from (list projections / ordering)
+    FIELDS = {
+        'name': 'name',
+        'subject': 'subject',
+        'year': 'year',
+        'sem': 'semester',
+        'sec': 'section',
+        'branch': 'branch',
+        'dept': 'department',
+        'college': 'college',
+        'addedDate': 'created_at',
+        'isActive': 'is_active',
+    }
+
     @staticmethod
-    def to_dict(doc_id, data):
-        return {
+    def to_dict(doc_id, data, fields=None):
+        result = {
             'id': doc_id,
             'name': data.get('name', ''),
             'subject': data.get('subject', ''),
@@ -20,4 +34,7 @@ class Faculty:
                 if data.get('created_at') else None
             ),
             'isActive': data.get('is_active', True)
-        }
\ No newline at end of file
+        }
+        if fields:
+            result = {k: v for k, v in result.items() if k == 'id' or k in fields}
+        return result
@@ -1,8 +1,12 @@
 from datetime import datetime, timezone
+from ..utils.rating_schema import encode_ratings, decode_ratings, decode_faculty_ratings
 
 class FeedbackSubmission:
     COLLECTION = 'feedback_submissions'
 
+    # Fields to project when only the ratings of a submission are needed
+    RATING_FIELDS = ['slot', 'ratings', 'form_version']
+
     @staticmethod
     def create_submission_data(batch_id, slot, comments, ip_address, ratings_map):
         """
@@ -12,12 +16,41 @@ class FeedbackSubmission:
             "faculty_id_1": { "parameter1": 10, "parameter2": 8 },
             "faculty_id_2": { "parameter1": 9, "parameter2": 9 }
         }
+
+        faculty_ids repeats the keys of ratings_map so the submissions rating a
+        faculty member can be found with array_contains (see faculty_query).
+        The ratings themselves are stored in the compact form of the current
+        form version (utils/rating_schema.py); read them back with ratings().
         """
+        form_version, stored_ratings = encode_ratings(ratings_map)
         return {
             'batch_id': batch_id,
             'slot': slot,
             'comments': comments,
             'ip_address': ip_address,
-            'ratings': ratings_map,
+            'ratings': stored_ratings,
+            'form_version': form_version,
+            'faculty_ids': sorted(ratings_map),
             'submitted_at': datetime.now(timezone.utc)
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def ratings(data):
+        """{faculty_id: {parameter: rating}} of a stored submission, old or compact."""
+        return decode_ratings(data.get('ratings'), data.get('form_version'))
+
+    @staticmethod
+    def faculty_ratings(data, faculty_id):
+        """{parameter: rating} one faculty member got in a stored submission."""
+        return decode_faculty_ratings((data.get('ratings') or {}).get(faculty_id), data.get('form_version'))
+
+    @staticmethod
+    def faculty_query(collection, faculty_id, legacy=False):
+        """
+        Submissions in `collection` that rate `faculty_id`. legacy=True matches
+        on the ratings map key instead, which also finds documents written
+        before faculty_ids existed.
+        """
+        if legacy:
+            return collection.where(f'ratings.{faculty_id}', '!=', None)
+        return collection.where('faculty_ids', 'array_contains', faculty_id)
@@ -3,9 +3,21 @@ from datetime import datetime, timezone
 class DepartmentSection:
     COLLECTION = 'department_sections'
 
+    # API key → Firestore field it is read from (list projections / ordering)
+    FIELDS = {
+        'college': 'college',
+        'department': 'department',
+        'year': 'year',
+        'sectionName': 'section_name',
+        'branch': 'branch',
+        'strength': 'strength',
+        'isActive': 'is_active',
+        'createdAt': 'created_at',
+    }
+
     @staticmethod
-    def to_dict(doc_id, data):
-        return {
+    def to_dict(doc_id, data, fields=None):
+        result = {
             'id': doc_id,
             'college': data.get('college', ''),
             'department': data.get('department', ''),
@@ -15,4 +27,7 @@ class DepartmentSection:
             'strength': data.get('strength', 0),
             'isActive': data.get('is_active', True),
             'createdAt': data.get('created_at').isoformat() if data.get('created_at') else None
-        }
\ No newline at end of file
+        }
+        if fields:
+            result = {k: v for k, v in result.items() if k == 'id' or k in fields}
+        return result
@@ -1,17 +1,55 @@
-import bcrypt
 from datetime import datetime, timezone
+from ..extensions import password_hasher
 
 class User:
     COLLECTION = 'users'
+    # One doc per user_id: {'version': int}. Bumped to invalidate every
+    # access token minted with embedded claims for that user.
+    TOKEN_VERSION_COLLECTION = 'token_versions'
 
+    # Hashing runs on the password worker pool (utils/passwords.py) and may
+    # raise PasswordPoolBusy, which the app maps to 503.
     @staticmethod
     def set_password(password):
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        return password_hasher.hash(password)
 
     @staticmethod
     def check_password(password, hashed_password):
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return password_hasher.verify(password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password):
+        return password_hasher.needs_rehash(hashed_password)
+
+    @staticmethod
+    def normalize_identifier(value):
+        """Canonical form used for login lookups (trimmed, case-insensitive)."""
+        return str(value or '').strip().lower()
+
+    @staticmethod
+    def login_identifiers(data):
+        """
+        Values stored in the `login_identifiers` array so login can resolve a
+        user_id, email or mobile number with a single array_contains query.
+        Must be recomputed whenever user_id, email or mobile change.
+        """
+        identifiers = []
+        for field in ('user_id', 'email', 'mobile'):
+            value = User.normalize_identifier(data.get(field))
+            if value and value not in identifiers:
+                identifiers.append(value)
+        return identifiers
+
+    @staticmethod
+    def access_claims(doc_id, data, token_version):
+        """Authorization claims embedded in access tokens (JWT_EMBED_USER_CLAIMS)."""
+        return {
+            'uid': doc_id,
+            'role': data.get('role', ''),
+            'college': data.get('college'),
+            'department': data.get('department'),
+            'tv': token_version,
+        }
 
     @staticmethod
     def to_dict(doc_id, data):
@@ -0,0 +1,174 @@
+"""
+repositories/
+
+Storage of the feedback itself: submissions, the rating statistics and
+submission counts derived from them, and response wipes. Accounts, faculty,
+batches and sections stay in Firestore whichever backend is active; batch
+state (open, slot window, total_students) is written there first and passed
+on to the repository with sync_batch() / close_batches().
+
+Backends (STORAGE_BACKEND):
+  - firestore  → feedback_submissions documents, with the derived
+                 sharded faculty_aggregates and submission counters
+                 maintained in the same transaction (repositories/firestore.py).
+  - sql        → the relational schema in migrations/ through SQLAlchemy at
+                 DATABASE_URL, SQLite or Postgres (repositories/sql.py). Stats
+                 and counts are GROUP BY queries over the indexed
+                 feedback_ratings / feedback_submissions tables, so there is
+                 no derived data to keep in step.
+
+Routes use the `repository` instance in extensions.py, which forwards to
+the backend chosen in create_app(). Backend modules are imported there,
+not here, since they import extensions themselves.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionRejected(Exception):
+    """Raised while storing a submission to abort it with an HTTP error."""
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def check_batch_open(batch_data):
+    """Raises SubmissionRejected unless the batch accepts submissions."""
+    if not batch_data or not batch_data.get('is_active'):
+        raise SubmissionRejected("Feedback batch not found or closed.", 404)
+
+    # Check slot end date — students cannot submit after the window closes
+    slot_end = batch_data.get('slot_end_date')
+    if slot_end:
+        end_date = slot_end.date() if hasattr(slot_end, 'date') else None
+        if end_date and date.today() > end_date:
+            raise SubmissionRejected("The feedback window for this link has closed.")
+
+
+def check_capacity(total_students, current_count):
+    if current_count >= total_students:
+        raise SubmissionRejected(f"This section has reached its maximum response limit ({total_students}).")
+
+
+class FeedbackRepository(ABC):
+    """
+    What a storage backend provides; a backend missing one of the abstract
+    methods fails when it is instantiated, not on first use. Faculty and batch
+    ids are the Firestore document ids in both backends; RatingStats are
+    utils/rating_stats.py.
+    """
+
+    name = None
+
+    @abstractmethod
+    def submit(self, batch_id, batch_data, client_ip, comments, ratings_map):
+        """
+        Stores one submission of {faculty_id: {parameter: rating}} for an open
+        batch (`batch_data` is its Firestore document). Raises
+        SubmissionRejected for a second response from the same device or one
+        past total_students.
+        """
+
+    @abstractmethod
+    def faculty_stats(self, faculty_ids):
+        """RatingStats of every response to the given faculty members."""
+
+    @abstractmethod
+    def scope_stats(self, college, department, faculty_ids, progress=None):
+        """RatingStats for `faculty_ids` over the batches of a college (and department)."""
+
+    def stats_markers(self, faculty_id):
+        """
+        Version markers for the ETag of one faculty member's stats
+        (middleware/http_cache.py), or None if they cannot be revalidated.
+        """
+        return None
+
+    @abstractmethod
+    def sync_batch(self, batch_id, batch_data):
+        """
+        Called after a batch document is created or edited in Firestore, with
+        its new contents, so a backend that checks submissions against its
+        own copy of the batch (is_active, total_students) can refresh it.
+        """
+
+    @abstractmethod
+    def close_batches(self, college, batch_ids):
+        """
+        Called after the given batches of `college` were deactivated in
+        Firestore: their submissions stop counting towards the college's
+        count_submissions(), and no more are accepted.
+        """
+
+    @abstractmethod
+    def count_submissions(self, college=None):
+        """Submissions to the active batches of a college, or to every batch."""
+
+    @abstractmethod
+    def submission_counts(self, batch_ids):
+        """{batch_id: submissions} for the given batches."""
+
+    @abstractmethod
+    def count_batch_responses(self, batch_ids):
+        """Submissions to the given batches in total (an estimate is fine)."""
+
+    @abstractmethod
+    def count_faculty_responses(self, faculty_id):
+        """Submissions that rate `faculty_id`."""
+
+    @abstractmethod
+    def wipe_batch_responses(self, batch_ids, progress=None):
+        """Deletes every submission to the given batches. Returns how many were deleted."""
+
+    @abstractmethod
+    def wipe_faculty_responses(self, faculty_id, progress=None):
+        """Deletes every submission that rates `faculty_id`. Returns how many were deleted."""
+
+    @abstractmethod
+    def faculty_cursor(self, faculty_id, submission_id):
+        """
+        Resume position after `submission_id` for faculty_submissions(), or
+        None if no submission with that id rates `faculty_id`.
+        """
+
+    @abstractmethod
+    def faculty_submissions(self, faculty_id, start_after=None, page_size=None):
+        """
+        Yields (submission_id, stored submission dict) for every submission
+        that rates `faculty_id`, in a stable order. With a page_size they are
+        read one page at a time; start_after is a faculty_cursor().
+        """
+
+
+class Repository:
+    """The active FeedbackRepository, chosen by STORAGE_BACKEND in init_app()."""
+
+    def __init__(self):
+        self.backend = None
+
+    @property
+    def name(self):
+        return self.backend.name if self.backend else None
+
+    def init_app(self, app):
+        name = app.config.get('STORAGE_BACKEND', 'firestore')
+        if name == 'sql':
+            from .sql import SqlRepository
+            self.backend = SqlRepository.from_url(app.config['DATABASE_URL'])
+        elif name == 'firestore':
+            from .firestore import FirestoreRepository
+            self.backend = FirestoreRepository()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND {name!r}; use 'firestore' or 'sql'")
+        logger.info(f"Feedback storage backend: {name}")
+
+    def __getattr__(self, attr):
+        if self.backend is None:
+            raise RuntimeError("Feedback storage is not initialised; call repository.init_app(app)")
+        return getattr(self.backend, attr)
@@ -0,0 +1,291 @@
+"""
+repositories/firestore.py
+
+Feedback stored in Firestore.
+
+Each submission is one feedback_submissions document, keyed by
+submission_doc_id() so a device can answer a batch only once, and written
+in a transaction that re-reads the batch document, together with its per-batch counter shard
+(utils/counters.py), faculty aggregates (utils/aggregates.py) and the
+college's dashboard counter (utils/dashboard_snapshot.py). Stats are read
+from the aggregate documents, or recomputed by one pass over a scope's
+submissions; wipes retract what they delete from the derived data.
+"""
+
+import hashlib
+
+from firebase_admin import firestore
+from flask import current_app
+
+from ..extensions import db
+from ..models.batch import Batch
+from ..models.feedback import FeedbackSubmission
+from ..utils.aggregates import FacultyAggregate
+from ..utils.bulk import BulkWriter, BATCH_WRITE_LIMIT
+from ..utils.counters import SubmissionCounter
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from ..utils.rating_stats import RatingStats
+from . import FeedbackRepository, SubmissionRejected, check_batch_open, check_capacity
+
+# Submissions to one batch serialize on its counter shards; allow a few more
+# retries than the SDK default so a burst of students doesn't surface Aborted.
+SUBMIT_TRANSACTION_ATTEMPTS = 10
+
+# Firestore 'in' filters accept at most 30 values.
+IN_QUERY_LIMIT = 30
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ── Submitting ──────────────────────────────────────────────────────────────
+
+def submission_doc_id(batch_id, client_ip):
+    """
+    Deterministic feedback_submissions document id for one device on one batch.
+    Keying the document this way makes "one response per device" a property of
+    the write itself instead of a separate IP query.
+    """
+    return hashlib.sha256(f"{batch_id}|{client_ip}".encode('utf-8')).hexdigest()
+
+
+@firestore.transactional
+def _submit_in_transaction(transaction, batch_ref, submission_ref, client_ip, comments, ratings_map):
+    """
+    Stores one submission atomically. The batch document, device uniqueness
+    and the response cap are all read inside the transaction, so a
+    submission cannot land after the batch is revoked or deactivated, overshoot
+    total_students or double-submit. The batch cache only turns closed
+    batches away early, in the caller.
+    """
+    batch_data = open_batch_data(batch_ref.get(transaction=transaction))
+
+    # One-per-device: the document id is derived from (batch, client IP)
+    check_not_submitted(submission_ref.get(transaction=transaction))
+
+    # Submission limit, read from the counter shards under the same transaction
+    total_students = batch_data.get('total_students', 0)
+    if total_students > 0:
+        check_capacity(total_students, SubmissionCounter.get_count(batch_ref.id, transaction=transaction))
+
+    queue_submission(transaction, batch_ref.id, batch_data, submission_ref, client_ip, comments, ratings_map)
+
+
+def open_batch_data(batch_snapshot):
+    """The batch document as read in the submit transaction; raises unless it still accepts submissions."""
+    batch_data = batch_snapshot.to_dict() if batch_snapshot.exists else None
+    check_batch_open(batch_data)
+    return batch_data
+
+
+def check_not_submitted(submission_snapshot):
+    if submission_snapshot.exists:
+        raise SubmissionRejected("A response from this device has already been submitted for this link.")
+
+
+def queue_submission(transaction, batch_id, batch_data, submission_ref, client_ip, comments, ratings_map):
+    """Queues the submission and its derived-data updates on the transaction."""
+    submission_data = FeedbackSubmission.create_submission_data(
+        batch_id=batch_id,
+        slot=batch_data.get('slot', 1),
+        comments=comments,
+        ip_address=client_ip,
+        ratings_map=ratings_map
+    )
+    transaction.set(submission_ref, submission_data)
+    SubmissionCounter.increment(transaction, batch_id)
+    FacultyAggregate.apply(transaction, submission_data['slot'], ratings_map)
+    DashboardSnapshot.count_submissions(transaction, batch_data.get('college'))
+
+
+# ── Deleting ────────────────────────────────────────────────────────────────
+
+def _submissions_for_batches(batch_ids):
+    for chunk in _chunks(list(batch_ids), IN_QUERY_LIMIT):
+        query = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', 'in', chunk)
+        yield from query.select(['batch_id'] + FeedbackSubmission.RATING_FIELDS).stream()
+
+
+def _delete_submissions(writer, submissions, drop_counters_for=()):
+    """
+    Bulk-deletes the given submission snapshots with `writer` (a BulkWriter),
+    then retracts them from the faculty aggregates and the per-batch
+    counters. Counters of batches in `drop_counters_for` are deleted outright
+    instead of decremented.
+    """
+    deleted_per_batch = {}
+    # Retractions are summed per faculty / slot / parameter as the snapshots
+    # stream past, so memory stays bounded by the faculty, not the responses
+    totals = {}
+    with writer:
+        for sub in submissions:
+            data = sub.to_dict()
+            writer.delete(sub.reference)
+            FacultyAggregate.accumulate(totals, data.get('slot', 1), FeedbackSubmission.ratings(data), sign=-1)
+            batch_id = data.get('batch_id')
+            deleted_per_batch[batch_id] = deleted_per_batch.get(batch_id, 0) + 1
+
+    # Derived-data adjustments contain Increments, so they are not retried;
+    # they are still chunked to stay under the per-batch write limit.
+    # Per-college submission totals for the dashboard snapshots, which only
+    # count active batches (closed ones were subtracted by close_batches)
+    per_college = {}
+    batch_refs = [db.collection(Batch.COLLECTION).document(bid) for bid in deleted_per_batch if bid]
+    for snap in (db.get_all(batch_refs, field_paths=['college', 'is_active']) if batch_refs else []):
+        data = snap.to_dict() if snap.exists else None
+        if data and data.get('is_active'):
+            college = data.get('college')
+            per_college[college] = per_college.get(college, 0) + deleted_per_batch[snap.id]
+
+    dropped = set(drop_counters_for)
+    adjustments = [('aggregate', fid, slots) for fid, slots in totals.items()]
+    adjustments += [('college', college, n) for college, n in per_college.items()]
+    adjustments += [('drop', bid, None) for bid in dropped]
+    adjustments += [('decrement', bid, n) for bid, n in deleted_per_batch.items() if bid not in dropped]
+    # Dropping a counter is NUM_SHARDS deletes, the largest adjustment
+    for chunk in _chunks(adjustments, BATCH_WRITE_LIMIT // SubmissionCounter.NUM_SHARDS):
+        batch = db.batch()
+        for kind, key, value in chunk:
+            if kind == 'aggregate':
+                FacultyAggregate.write_deltas(batch, {key: value})
+            elif kind == 'college':
+                DashboardSnapshot.count_submissions(batch, key, -value)
+            elif kind == 'drop':
+                SubmissionCounter.delete(batch, key)
+            else:
+                SubmissionCounter.increment(batch, key, -value)
+        batch.commit()
+
+    return sum(deleted_per_batch.values())
+
+
+class FirestoreRepository(FeedbackRepository):
+    name = 'firestore'
+
+    @staticmethod
+    def _writer(progress=None):
+        return BulkWriter(
+            parallelism=current_app.config.get('BULK_WRITE_PARALLELISM'),
+            max_attempts=current_app.config.get('BULK_WRITE_ATTEMPTS'),
+            progress=progress,
+        )
+
+    @staticmethod
+    def _faculty_query(faculty_id):
+        return FeedbackSubmission.faculty_query(
+            db.collection(FeedbackSubmission.COLLECTION), faculty_id,
+            legacy=current_app.config.get('SUBMISSION_FACULTY_IDS_FALLBACK'))
+
+    # ── writes ──────────────────────────────────────────────────────────────
+
+    def submit(self, batch_id, batch_data, client_ip, comments, ratings_map):
+        submission_ref = db.collection(FeedbackSubmission.COLLECTION).document(submission_doc_id(batch_id, client_ip))
+        _submit_in_transaction(
+            db.transaction(max_attempts=SUBMIT_TRANSACTION_ATTEMPTS),
+            db.collection(Batch.COLLECTION).document(batch_id), submission_ref, client_ip, comments, ratings_map,
+        )
+
+    def sync_batch(self, batch_id, batch_data):
+        # Submit transactions read the batch document itself
+        pass
+
+    def close_batches(self, college, batch_ids):
+        # Read after the deactivation committed: submit transactions re-read the
+        # batch, so these totals can no longer grow.
+        closed = sum(SubmissionCounter.get_counts(batch_ids).values()) if batch_ids else 0
+        if closed:
+            batch = db.batch()
+            DashboardSnapshot.count_submissions(batch, college, -closed)
+            batch.commit()
+        else:
+            DashboardSnapshot.forget([college])
+
+    def wipe_batch_responses(self, batch_ids, progress=None):
+        return _delete_submissions(self._writer(progress), _submissions_for_batches(batch_ids),
+                                   drop_counters_for=list(batch_ids))
+
+    def wipe_faculty_responses(self, faculty_id, progress=None):
+        query = self._faculty_query(faculty_id).select(['batch_id'] + FeedbackSubmission.RATING_FIELDS)
+        return _delete_submissions(self._writer(progress), query.stream())
+
+    # ── stats ───────────────────────────────────────────────────────────────
+
+    def faculty_stats(self, faculty_ids):
+        return RatingStats.from_aggregates(FacultyAggregate.get_many(
+            faculty_ids,
+            chunk_size=current_app.config.get('MULTI_STATS_CHUNK_SIZE'),
+            max_workers=current_app.config.get('MULTI_STATS_WORKERS'),
+        ))
+
+    def scope_stats(self, college, department, faculty_ids, progress=None):
+        """One pass over the submissions of every batch in scope."""
+        batches = db.collection(Batch.COLLECTION).where('college', '==', college)
+        if department:
+            batches = batches.where('department', '==', department)
+        batch_ids = [doc.id for doc in batches.select([]).stream()]
+
+        scope_stats = RatingStats(faculty_ids)
+        chunks = _chunks(batch_ids, IN_QUERY_LIMIT)
+        for done, chunk in enumerate(chunks, start=1):
+            query = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', 'in', chunk)
+            for sub in query.select(FeedbackSubmission.RATING_FIELDS).stream():
+                scope_stats.add_submission(sub.to_dict())
+            if progress:
+                progress(done, len(chunks))
+        return scope_stats
+
+    def stats_markers(self, faculty_id):
+        # The aggregate shards are their own ETag version markers
+        return FacultyAggregate.shard_refs(faculty_id)
+
+    # ── counts ──────────────────────────────────────────────────────────────
+
+    def count_submissions(self, college=None):
+        if college:
+            return SubmissionCounter.get_count(DashboardSnapshot.scope(college))
+        return db.collection(FeedbackSubmission.COLLECTION).count().get()[0][0].value
+
+    def submission_counts(self, batch_ids):
+        return SubmissionCounter.get_counts(batch_ids)
+
+    def count_batch_responses(self, batch_ids):
+        return sum(
+            db.collection(FeedbackSubmission.COLLECTION).where('batch_id', 'in', chunk).count().get()[0][0].value
+            for chunk in _chunks(list(batch_ids), IN_QUERY_LIMIT)
+        )
+
+    def count_faculty_responses(self, faculty_id):
+        return self._faculty_query(faculty_id).count().get()[0][0].value
+
+    # ── raw export ──────────────────────────────────────────────────────────
+
+    def faculty_cursor(self, faculty_id, submission_id):
+        snapshot = db.collection(FeedbackSubmission.COLLECTION).document(submission_id).get()
+        if not snapshot.exists or not (snapshot.to_dict().get('ratings') or {}).get(faculty_id):
+            return None
+        return snapshot
+
+    def faculty_submissions(self, faculty_id, start_after=None, page_size=None):
+        """
+        Pages through the faculty query with document cursors, holding at most
+        one page in memory. Each page is a fresh short query, so a long export
+        never rides on a single long-lived stream.
+        """
+        query = self._faculty_query(faculty_id)
+        if page_size is None:
+            for sub in query.stream():
+                yield sub.id, sub.to_dict()
+            return
+
+        last = start_after
+        while True:
+            page_query = query.limit(page_size)
+            if last is not None:
+                page_query = page_query.start_after(last)
+            page = list(page_query.stream())
+            for sub in page:
+                yield sub.id, sub.to_dict()
+            if len(page) < page_size:
+                return
+            last = page[-1]
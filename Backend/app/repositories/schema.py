@@ -0,0 +1,132 @@
+"""
+repositories/schema.py
+
+The relational schema of migrations/ (head: c7e4a2d9f1b3) as SQLAlchemy
+Core tables, for the SQL feedback backend. Alembic owns the schema on
+Postgres; create_all() here builds the same tables and indexes for a fresh
+SQLite database (`flask --app run init-sql-storage`).
+
+faculty.doc_id holds the Firestore id of the faculty member a row mirrors,
+the id the API uses. Batches are looked up by batches.batch_id, which is
+already their Firestore id.
+"""
+
+import sqlalchemy as sa
+
+metadata = sa.MetaData()
+
+users = sa.Table(
+    'users', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.String(50), nullable=False),
+    sa.Column('password_hash', sa.String(255), nullable=False),
+    sa.Column('name', sa.String(150), nullable=False),
+    sa.Column('role', sa.String(20), nullable=False),
+    sa.Column('college', sa.String(100)),
+    sa.Column('department', sa.String(50)),
+    sa.Column('mobile', sa.String(15)),
+    sa.Column('email', sa.String(150)),
+    sa.Column('is_active', sa.Boolean, nullable=False),
+    sa.Column('created_at', sa.DateTime, nullable=False),
+    sa.Column('updated_at', sa.DateTime),
+    sa.Column('reset_otp', sa.String(6)),
+    sa.Column('reset_otp_expiry', sa.DateTime),
+    sa.Index('ix_users_user_id', 'user_id', unique=True),
+    sa.Index('ix_users_role', 'role'),
+    sa.Index('ix_users_email', 'email'),
+    sa.Index('ix_users_mobile', 'mobile'),
+    sa.Index('idx_user_college_dept', 'college', 'department'),
+)
+
+batches = sa.Table(
+    'batches', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('batch_id', sa.String(200), nullable=False),
+    sa.Column('college', sa.String(100), nullable=False),
+    sa.Column('department', sa.String(50), nullable=False),
+    sa.Column('branch', sa.String(50), nullable=False),
+    sa.Column('year', sa.String(10), nullable=False),
+    sa.Column('semester', sa.String(10), nullable=False),
+    sa.Column('section', sa.String(20), nullable=False),
+    sa.Column('slot', sa.Integer, nullable=False),
+    sa.Column('slot_start_date', sa.Date),
+    sa.Column('slot_end_date', sa.Date),
+    sa.Column('slot_label', sa.String(100)),
+    sa.Column('created_by', sa.Integer, sa.ForeignKey('users.id')),
+    sa.Column('is_active', sa.Boolean, nullable=False),
+    sa.Column('created_at', sa.DateTime, nullable=False),
+    sa.Column('total_students', sa.Integer),
+    sa.Index('ix_batches_batch_id', 'batch_id', unique=True),
+    sa.Index('idx_batch_college_dept', 'college', 'department'),
+)
+
+faculty = sa.Table(
+    'faculty', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(150), nullable=False),
+    sa.Column('subject', sa.String(200), nullable=False),
+    sa.Column('year', sa.String(10), nullable=False),
+    sa.Column('semester', sa.String(10), nullable=False),
+    sa.Column('section', sa.String(20), nullable=False),
+    sa.Column('branch', sa.String(50), nullable=False),
+    sa.Column('department', sa.String(50), nullable=False),
+    sa.Column('college', sa.String(100), nullable=False),
+    sa.Column('added_by', sa.Integer, sa.ForeignKey('users.id')),
+    sa.Column('is_active', sa.Boolean, nullable=False),
+    sa.Column('created_at', sa.DateTime, nullable=False),
+    sa.Column('updated_at', sa.DateTime),
+    sa.Column('doc_id', sa.String(64)),
+    sa.Index('ix_faculty_doc_id', 'doc_id', unique=True),
+    sa.Index('ix_faculty_college', 'college'),
+    sa.Index('ix_faculty_department', 'department'),
+    sa.Index('idx_faculty_college_dept', 'college', 'department'),
+    sa.Index('idx_faculty_lookup', 'college', 'department', 'year', 'semester', 'section'),
+)
+
+batch_faculty = sa.Table(
+    'batch_faculty', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('batch_id', sa.Integer, sa.ForeignKey('batches.id', ondelete='CASCADE'), nullable=False),
+    sa.Column('faculty_id', sa.Integer, sa.ForeignKey('faculty.id', ondelete='CASCADE'), nullable=False),
+    sa.UniqueConstraint('batch_id', 'faculty_id', name='uq_batch_faculty'),
+)
+
+feedback_submissions = sa.Table(
+    'feedback_submissions', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('batch_db_id', sa.Integer, sa.ForeignKey('batches.id', ondelete='CASCADE'), nullable=False),
+    sa.Column('slot', sa.Integer, nullable=False),
+    sa.Column('comments', sa.Text),
+    sa.Column('submitted_at', sa.DateTime, nullable=False),
+    sa.Column('ip_address', sa.String(50)),
+    sa.Index('idx_submission_batch', 'batch_db_id'),
+    sa.Index('idx_submission_ip_batch', 'batch_db_id', 'ip_address'),
+)
+
+feedback_ratings = sa.Table(
+    'feedback_ratings', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('submission_id', sa.Integer, sa.ForeignKey('feedback_submissions.id', ondelete='CASCADE'),
+              nullable=False),
+    sa.Column('faculty_id', sa.Integer, sa.ForeignKey('faculty.id', ondelete='CASCADE'), nullable=False),
+    sa.Column('parameter', sa.String(200), nullable=False),
+    sa.Column('rating', sa.Integer, nullable=False),
+    sa.CheckConstraint('rating >= 1 AND rating <= 10', name='chk_rating_range'),
+    sa.Index('idx_rating_faculty', 'faculty_id'),
+    sa.Index('idx_rating_submission', 'submission_id'),
+)
+
+department_sections = sa.Table(
+    'department_sections', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('college', sa.String(100), nullable=False),
+    sa.Column('department', sa.String(50), nullable=False),
+    sa.Column('year', sa.String(10), nullable=False),
+    sa.Column('section_name', sa.String(50), nullable=False),
+    sa.Column('branch', sa.String(50)),
+    sa.Column('strength', sa.Integer, nullable=False),
+    sa.Column('created_by', sa.Integer, sa.ForeignKey('users.id')),
+    sa.Column('is_active', sa.Boolean, nullable=False),
+    sa.Column('created_at', sa.DateTime, nullable=False),
+    sa.UniqueConstraint('college', 'department', 'year', 'branch', 'section_name', name='uq_dept_section'),
+)
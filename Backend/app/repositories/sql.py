@@ -0,0 +1,394 @@
+"""
+repositories/sql.py
+
+Feedback stored in the relational schema of migrations/ (repositories/schema.py)
+through SQLAlchemy: one feedback_submissions row per submission and one
+feedback_ratings row per faculty member and parameter rated.
+
+A batch and its faculty members are mirrored from their Firestore documents
+into batches / faculty / batch_faculty the first time the batch receives a
+submission. Ratings of faculty members who are not on the batch are not
+stored, and ratings outside 1–10 (chk_rating_range) reject the submission.
+The one-response-per-device and total_students checks run in the
+transaction that inserts the submission, after locking the batch row
+(SELECT ... FOR UPDATE), so concurrent submissions to a batch queue up
+instead of overshooting. is_active and total_students are read from the
+locked row, not the (possibly cached) batch document: sync_batch() mirrors
+them when the batch is created or edited, close_batches() when it is
+deactivated.
+
+Stats are one GROUP BY faculty, slot, parameter, rating over
+feedback_ratings (through idx_rating_faculty, or idx_batch_college_dept and
+idx_submission_batch for a department): the histogram of every cell, from
+which count, sum and sum of squares follow. They are handed to RatingStats
+in the faculty_aggregates document shape, so both backends format stats
+the same way. Submission counts are COUNT / GROUP BY batch queries.
+
+DATABASE_URL is any SQLAlchemy URL: sqlite:///fds.db, or postgresql://...
+with a driver such as psycopg2 installed (Render's postgres:// URLs are
+accepted too). On SQLite, meant for development and tests, every
+transaction takes the write lock up front (BEGIN IMMEDIATE) and foreign
+keys are enforced; create the tables with `flask --app run init-sql-storage`.
+"""
+
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from ..utils.rating_stats import RatingStats
+from . import FeedbackRepository, SubmissionRejected, check_capacity
+from .schema import metadata, batches, faculty, batch_faculty, feedback_submissions, feedback_ratings
+
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+IN_LIST_CHUNK = 500
+
+# Attempts at mirroring a batch that another submission may be mirroring at the same time
+REGISTER_ATTEMPTS = 3
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _utc(value):
+    """Naive UTC for the DateTime columns (they store no time zone)."""
+    if value is None or not hasattr(value, 'astimezone'):
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _date(value):
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return value.date() if hasattr(value, 'date') else None
+
+
+def _sqlite_transactions(engine):
+    @sa.event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None   # let the 'begin' hook below open transactions
+        dbapi_connection.execute('PRAGMA foreign_keys = ON')
+
+    @sa.event.listens_for(engine, 'begin')
+    def begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+class SqlRepository(FeedbackRepository):
+    name = 'sql'
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @classmethod
+    def from_url(cls, url):
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        engine = sa.create_engine(url, pool_pre_ping=True)
+        if engine.dialect.name == 'sqlite':
+            _sqlite_transactions(engine)
+        return cls(engine)
+
+    def create_schema(self):
+        """Creates any missing tables and indexes (SQLite; Postgres is migrated with Alembic)."""
+        metadata.create_all(self.engine)
+
+    # ── mirroring batches and faculty ───────────────────────────────────────
+
+    def _register_faculty(self, conn, faculty_list):
+        """Inserts the faculty rows that don't exist yet. Returns {doc_id: faculty.id}."""
+        by_doc_id = {f['id']: f for f in faculty_list if f.get('id')}
+        if not by_doc_id:
+            return {}
+        found = dict(conn.execute(
+            sa.select(faculty.c.doc_id, faculty.c.id).where(faculty.c.doc_id.in_(list(by_doc_id)))).all())
+        now = _utc(datetime.now(timezone.utc))
+        for doc_id, f in by_doc_id.items():
+            if doc_id in found:
+                continue
+            found[doc_id] = conn.execute(sa.insert(faculty).values(
+                doc_id=doc_id,
+                name=f.get('name') or '',
+                subject=f.get('subject') or '',
+                year=f.get('year') or '',
+                semester=f.get('semester') or '',
+                section=f.get('section') or '',
+                branch=f.get('branch') or '',
+                department=f.get('department') or '',
+                college=f.get('college') or '',
+                is_active=True,
+                created_at=_utc(f.get('created_at')) or now,
+            )).inserted_primary_key[0]
+        return found
+
+    def _register_batch(self, batch_id, batch_data):
+        """batches.id of the batch, mirroring it and its faculty first if needed."""
+        lookup = sa.select(batches.c.id).where(batches.c.batch_id == batch_id)
+        for attempt in range(REGISTER_ATTEMPTS):
+            with self.engine.begin() as conn:
+                batch_db_id = conn.execute(lookup).scalar()
+                if batch_db_id is not None:
+                    return batch_db_id
+            try:
+                with self.engine.begin() as conn:
+                    faculty_db_ids = self._register_faculty(conn, batch_data.get('faculty') or [])
+                    batch_db_id = conn.execute(sa.insert(batches).values(
+                        batch_id=batch_id,
+                        college=batch_data.get('college') or '',
+                        department=batch_data.get('department') or '',
+                        branch=batch_data.get('branch') or '',
+                        year=batch_data.get('year') or '',
+                        semester=batch_data.get('semester') or '',
+                        section=batch_data.get('section') or '',
+                        slot=batch_data.get('slot', 1),
+                        slot_start_date=_date(batch_data.get('slot_start_date')),
+                        slot_end_date=_date(batch_data.get('slot_end_date')),
+                        slot_label=batch_data.get('slot_label'),
+                        is_active=bool(batch_data.get('is_active', True)),
+                        created_at=_utc(batch_data.get('created_at')) or _utc(datetime.now(timezone.utc)),
+                        total_students=batch_data.get('total_students'),
+                    )).inserted_primary_key[0]
+                    if faculty_db_ids:
+                        conn.execute(sa.insert(batch_faculty), [
+                            {'batch_id': batch_db_id, 'faculty_id': fid} for fid in set(faculty_db_ids.values())
+                        ])
+                    return batch_db_id
+            except IntegrityError:
+                # Another submission mirrored the batch or one of its faculty first
+                if attempt == REGISTER_ATTEMPTS - 1:
+                    raise
+
+    # ── writes ──────────────────────────────────────────────────────────────
+
+    def submit(self, batch_id, batch_data, client_ip, comments, ratings_map):
+        rated = [(fid, param, rating) for fid, ratings in ratings_map.items() for param, rating in ratings.items()]
+        if any(not 1 <= rating <= 10 for _, _, rating in rated):
+            raise SubmissionRejected("Ratings must be between 1 and 10.", 400)
+        if any(len(param) > feedback_ratings.c.parameter.type.length for _, param, _ in rated):
+            raise SubmissionRejected("Invalid rating parameter.", 400)
+
+        batch_db_id = self._register_batch(batch_id, batch_data)
+        with self.engine.begin() as conn:
+            # Submissions to one batch are checked and stored one at a time,
+            # against the batch state mirrored by sync_batch() / close_batches()
+            is_active, total_students = conn.execute(
+                sa.select(batches.c.is_active, batches.c.total_students)
+                .where(batches.c.id == batch_db_id).with_for_update()).one()
+            if not is_active:
+                raise SubmissionRejected("Feedback batch not found or closed.", 404)
+
+            submitted = conn.execute(
+                sa.select(feedback_submissions.c.id)
+                .where(feedback_submissions.c.batch_db_id == batch_db_id, feedback_submissions.c.ip_address == client_ip)
+                .limit(1)).first()
+            if submitted is not None:
+                raise SubmissionRejected("A response from this device has already been submitted for this link.")
+
+            if total_students and total_students > 0:
+                count = conn.execute(sa.select(sa.func.count()).select_from(feedback_submissions)
+                                     .where(feedback_submissions.c.batch_db_id == batch_db_id)).scalar_one()
+                check_capacity(total_students, count)
+
+            on_batch = dict(conn.execute(
+                sa.select(faculty.c.doc_id, faculty.c.id)
+                .join(batch_faculty, batch_faculty.c.faculty_id == faculty.c.id)
+                .where(batch_faculty.c.batch_id == batch_db_id, faculty.c.doc_id.in_(list(ratings_map)))).all())
+            submission_id = conn.execute(sa.insert(feedback_submissions).values(
+                batch_db_id=batch_db_id,
+                slot=batch_data.get('slot', 1),
+                comments=comments,
+                submitted_at=_utc(datetime.now(timezone.utc)),
+                ip_address=client_ip,
+            )).inserted_primary_key[0]
+            rows = [{'submission_id': submission_id, 'faculty_id': on_batch[fid], 'parameter': param, 'rating': rating}
+                    for fid, param, rating in rated if fid in on_batch]
+            if rows:
+                conn.execute(sa.insert(feedback_ratings), rows)
+        DashboardSnapshot.forget([batch_data.get('college')])
+
+    def sync_batch(self, batch_id, batch_data):
+        batch_db_id = self._register_batch(batch_id, batch_data)
+        with self.engine.begin() as conn:
+            conn.execute(sa.update(batches).where(batches.c.id == batch_db_id).values(
+                slot_start_date=_date(batch_data.get('slot_start_date')),
+                slot_end_date=_date(batch_data.get('slot_end_date')),
+                slot_label=batch_data.get('slot_label'),
+                is_active=bool(batch_data.get('is_active', True)),
+                total_students=batch_data.get('total_students'),
+            ))
+        DashboardSnapshot.forget([batch_data.get('college')])
+
+    def close_batches(self, college, batch_ids):
+        with self.engine.begin() as conn:
+            for chunk in _chunks(list(batch_ids), IN_LIST_CHUNK):
+                conn.execute(sa.update(batches).where(batches.c.batch_id.in_(chunk)).values(is_active=False))
+        DashboardSnapshot.forget([college])
+
+    def _delete_submissions(self, submission_ids_query, progress=None):
+        """Deletes the submissions (and their ratings) the query selects the ids of."""
+        deleted = 0
+        with self.engine.begin() as conn:
+            ids = conn.execute(submission_ids_query).scalars().all()
+            colleges = set()
+            for chunk in _chunks(ids, IN_LIST_CHUNK):
+                colleges.update(conn.execute(
+                    sa.select(batches.c.college).distinct()
+                    .join(feedback_submissions, feedback_submissions.c.batch_db_id == batches.c.id)
+                    .where(feedback_submissions.c.id.in_(chunk))).scalars())
+                conn.execute(sa.delete(feedback_ratings).where(feedback_ratings.c.submission_id.in_(chunk)))
+                deleted += conn.execute(sa.delete(feedback_submissions).where(feedback_submissions.c.id.in_(chunk))).rowcount
+                if progress:
+                    progress(deleted)
+        DashboardSnapshot.forget(colleges)
+        return deleted
+
+    def wipe_batch_responses(self, batch_ids, progress=None):
+        return self._delete_submissions(
+            sa.select(feedback_submissions.c.id)
+            .join(batches, batches.c.id == feedback_submissions.c.batch_db_id)
+            .where(batches.c.batch_id.in_(list(batch_ids))), progress)
+
+    def wipe_faculty_responses(self, faculty_id, progress=None):
+        return self._delete_submissions(self._rated_by(faculty_id), progress)
+
+    @staticmethod
+    def _rated_by(faculty_id):
+        """Ids of the submissions that rate a faculty member."""
+        return sa.select(feedback_ratings.c.submission_id).distinct()\
+            .join(faculty, faculty.c.id == feedback_ratings.c.faculty_id)\
+            .where(faculty.c.doc_id == faculty_id)
+
+    # ── stats ───────────────────────────────────────────────────────────────
+
+    def _rating_stats(self, faculty_ids, *conditions, scoped=False):
+        source = feedback_ratings\
+            .join(feedback_submissions, feedback_submissions.c.id == feedback_ratings.c.submission_id)\
+            .join(faculty, faculty.c.id == feedback_ratings.c.faculty_id)
+        if scoped:
+            source = source.join(batches, batches.c.id == feedback_submissions.c.batch_db_id)
+        cell = (faculty.c.doc_id, feedback_submissions.c.slot)
+        responses = sa.select(*cell, sa.func.count(feedback_ratings.c.submission_id.distinct()))\
+            .select_from(source).where(*conditions).group_by(*cell)
+        histogram = sa.select(*cell, feedback_ratings.c.parameter, feedback_ratings.c.rating, sa.func.count())\
+            .select_from(source).where(*conditions)\
+            .group_by(*cell, feedback_ratings.c.parameter, feedback_ratings.c.rating)
+
+        aggregates = dict.fromkeys(faculty_ids)
+
+        def slot_entry(doc_id, slot):
+            if aggregates[doc_id] is None:
+                aggregates[doc_id] = {'slots': {}}
+            return aggregates[doc_id]['slots'].setdefault(str(slot), {'responses': 0, 'parameters': {}})
+
+        with self.engine.connect() as conn:
+            for doc_id, slot, n in conn.execute(responses):
+                if doc_id in aggregates:
+                    slot_entry(doc_id, slot)['responses'] = n
+            for doc_id, slot, param, rating, n in conn.execute(histogram):
+                if doc_id not in aggregates:
+                    continue
+                entry = slot_entry(doc_id, slot)['parameters'].setdefault(
+                    param, {'count': 0, 'sum': 0, 'sum_squares': 0, 'histogram': {}})
+                entry['count'] += n
+                entry['sum'] += n * rating
+                entry['sum_squares'] += n * rating * rating
+                entry['histogram'][str(rating)] = n
+        return RatingStats.from_aggregates(aggregates)
+
+    def faculty_stats(self, faculty_ids):
+        ids = list(dict.fromkeys(faculty_ids))
+        return self._rating_stats(ids, faculty.c.doc_id.in_(ids))
+
+    def scope_stats(self, college, department, faculty_ids, progress=None):
+        conditions = [batches.c.college == college]
+        if department:
+            conditions.append(batches.c.department == department)
+        stats = self._rating_stats(faculty_ids, *conditions, scoped=True)
+        if progress:
+            progress(1, 1)
+        return stats
+
+    # ── counts ──────────────────────────────────────────────────────────────
+
+    def count_submissions(self, college=None):
+        query = sa.select(sa.func.count(feedback_submissions.c.id))
+        if college:
+            query = query.join(batches, batches.c.id == feedback_submissions.c.batch_db_id)\
+                .where(batches.c.college == college, batches.c.is_active)
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar_one()
+
+    def submission_counts(self, batch_ids):
+        counts = {batch_id: 0 for batch_id in batch_ids}
+        if not counts:
+            return counts
+        query = sa.select(batches.c.batch_id, sa.func.count(feedback_submissions.c.id))\
+            .join(feedback_submissions, feedback_submissions.c.batch_db_id == batches.c.id)\
+            .where(batches.c.batch_id.in_(list(counts)))\
+            .group_by(batches.c.batch_id)
+        with self.engine.connect() as conn:
+            counts.update(conn.execute(query).all())
+        return counts
+
+    def count_batch_responses(self, batch_ids):
+        return sum(self.submission_counts(batch_ids).values())
+
+    def count_faculty_responses(self, faculty_id):
+        with self.engine.connect() as conn:
+            return conn.execute(sa.select(sa.func.count()).select_from(self._rated_by(faculty_id).subquery())).scalar_one()
+
+    # ── raw export ──────────────────────────────────────────────────────────
+
+    def faculty_cursor(self, faculty_id, submission_id):
+        try:
+            submission_id = int(submission_id)
+        except (TypeError, ValueError):
+            return None
+        with self.engine.connect() as conn:
+            found = conn.execute(self._rated_by(faculty_id)
+                                 .where(feedback_ratings.c.submission_id == submission_id)).first()
+        return submission_id if found else None
+
+    def faculty_submissions(self, faculty_id, start_after=None, page_size=None):
+        """
+        Submissions in id order, `page_size` at a time (all at once without
+        one), each with only this faculty member's ratings. Every page is a
+        separate short query.
+        """
+        last = start_after
+        while True:
+            query = sa.select(feedback_submissions.c.id, feedback_submissions.c.slot,
+                              feedback_submissions.c.comments, feedback_submissions.c.submitted_at)\
+                .where(feedback_submissions.c.id.in_(self._rated_by(faculty_id)))\
+                .order_by(feedback_submissions.c.id)
+            if last is not None:
+                query = query.where(feedback_submissions.c.id > last)
+            if page_size is not None:
+                query = query.limit(page_size)
+            with self.engine.connect() as conn:
+                page = conn.execute(query).all()
+                ratings = {}
+                for chunk in _chunks([row.id for row in page], IN_LIST_CHUNK):
+                    for submission_id, param, rating in conn.execute(
+                            sa.select(feedback_ratings.c.submission_id, feedback_ratings.c.parameter,
+                                      feedback_ratings.c.rating)
+                            .join(faculty, faculty.c.id == feedback_ratings.c.faculty_id)
+                            .where(faculty.c.doc_id == faculty_id, feedback_ratings.c.submission_id.in_(chunk))
+                            .order_by(feedback_ratings.c.id)):
+                        ratings.setdefault(submission_id, {})[param] = rating
+
+            for row in page:
+                yield str(row.id), {
+                    'slot': row.slot,
+                    'comments': row.comments or '',
+                    'submitted_at': row.submitted_at.replace(tzinfo=timezone.utc) if row.submitted_at else None,
+                    'ratings': {faculty_id: ratings.get(row.id, {})},
+                }
+            if page_size is None or len(page) < page_size:
+                return
+            last = page[-1].id
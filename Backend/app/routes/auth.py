@@ -1,6 +1,6 @@
 import logging
 import secrets
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, request, jsonify, make_response, current_app
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -12,8 +12,10 @@ from flask_jwt_extended import (
 )
 from datetime import datetime, timedelta, timezone
 
-from ..extensions import db, limiter, add_to_blocklist
+from ..extensions import db, limiter, add_to_blocklist, job_queue
 from ..models.user import User
+from ..middleware.auth_middleware import current_token_version, bump_token_version
+from ..utils.cascade import estimate_deactivation, deactivate_scope_job
 from ..utils.validators import (
     sanitize_string, validate_name, validate_email, 
     validate_mobile, validate_password
@@ -23,24 +25,58 @@ from ..utils.email import send_otp_email
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth', __name__)
 
-def get_user_by_identifier(identifier):
-    """Helper to find user by user_id, email, or mobile in Firestore."""
+def _legacy_user_lookup(identifier):
+    """
+    Pre-`login_identifiers` lookup: user_id, then email, then mobile. The
+    account found gets its login_identifiers, so it is only looked up this
+    way once.
+    """
     users_ref = db.collection(User.COLLECTION)
-    
-    # Try user_id
-    docs = users_ref.where('user_id', '==', identifier).where('is_active', '==', True).limit(1).stream()
-    for doc in docs: return doc
-    
-    # Try email
-    docs = users_ref.where('email', '==', identifier).where('is_active', '==', True).limit(1).stream()
-    for doc in docs: return doc
-    
-    # Try mobile
-    docs = users_ref.where('mobile', '==', identifier).where('is_active', '==', True).limit(1).stream()
-    for doc in docs: return doc
-    
+
+    for field in ('user_id', 'email', 'mobile'):
+        docs = users_ref.where(field, '==', identifier).where('is_active', '==', True).limit(1).stream()
+        for doc in docs:
+            doc.reference.update({'login_identifiers': User.login_identifiers(doc.to_dict())})
+            return doc
+
+    return None
+
+def get_user_by_identifier(identifier):
+    """Helper to find user by user_id, email, or mobile in Firestore (one query)."""
+    key = User.normalize_identifier(identifier)
+    if not key:
+        return None
+
+    docs = list(db.collection(User.COLLECTION)
+                .where('login_identifiers', 'array_contains', key)
+                .where('is_active', '==', True).limit(5).stream())
+    if docs:
+        # Keep the old precedence if an identifier is shared: user_id, email, mobile,
+        # and among accounts that only differ in case, the one typed exactly.
+        def rank(doc):
+            data = doc.to_dict()
+            for i, field in enumerate(('user_id', 'email', 'mobile')):
+                if User.normalize_identifier(data.get(field)) == key:
+                    return i, str(data.get(field)).strip() != identifier.strip()
+            return 3, True
+        return min(docs, key=rank)
+
+    if current_app.config.get('LOGIN_IDENTIFIER_FALLBACK'):
+        return _legacy_user_lookup(identifier)
     return None
 
+def _issue_access_token(doc_id, user_data):
+    """
+    Mints an access token for the user. With JWT_EMBED_USER_CLAIMS enabled the
+    token also carries role/college/department and the current token version,
+    which lets require_auth/require_role skip the user lookup.
+    """
+    user_id = user_data.get('user_id')
+    claims = None
+    if current_app.config.get('JWT_EMBED_USER_CLAIMS'):
+        claims = User.access_claims(doc_id, user_data, current_token_version(user_id))
+    return create_access_token(identity=user_id, additional_claims=claims)
+
 @auth_bp.route('/login', methods=['POST'])
 @limiter.limit("10 per minute")
 def login():
@@ -64,6 +100,9 @@ def login():
     if not User.check_password(password, user_data.get('password_hash')):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    if User.needs_rehash(user_data.get('password_hash')):
+        user_doc.reference.update({'password_hash': User.set_password(password)})
+
     if user_data.get('role') != role:
         return jsonify({"error": f"This account is not registered as {role}"}), 401
 
@@ -73,7 +112,7 @@ def login():
         if user_data.get('college') != college or user_data.get('department') != department:
             return jsonify({"error": "College or department mismatch"}), 401
 
-    access_token = create_access_token(identity=user_data.get('user_id'))
+    access_token = _issue_access_token(user_doc.id, user_data)
     refresh_token = create_refresh_token(identity=user_data.get('user_id'))
 
     response = make_response(jsonify({
@@ -87,8 +126,8 @@ def login():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]
-    add_to_blocklist(jti)
+    token = get_jwt()
+    add_to_blocklist(token["jti"], token["exp"])
     response = make_response(jsonify({"success": True, "message": "Logged out successfully"}))
     unset_refresh_cookies(response)
     return response, 200
@@ -136,6 +175,7 @@ def register():
         'is_active': True,
         'created_at': datetime.now(timezone.utc)
     }
+    new_user['login_identifiers'] = User.login_identifiers(new_user)
     
     users_ref.add(new_user)
     return jsonify({"success": True, "userId": new_user_id}), 201
@@ -156,11 +196,12 @@ def get_current_user():
 def refresh():
     user_id = get_jwt_identity()
     docs = db.collection(User.COLLECTION).where('user_id', '==', user_id).where('is_active', '==', True).limit(1).stream()
-    
-    if not any(docs):
+    user_doc = next(docs, None)
+
+    if not user_doc:
         return jsonify({"error": "User account not found or deactivated", "code": "INVALID_TOKEN"}), 401
         
-    return jsonify({"access_token": create_access_token(identity=user_id)}), 200
+    return jsonify({"access_token": _issue_access_token(user_doc.id, user_doc.to_dict())}), 200
 @auth_bp.route('/forgot-password', methods=['POST'])
 @limiter.limit("3 per minute")
 def forgot_password():
@@ -230,6 +271,7 @@ def reset_password():
         'reset_otp': None,
         'reset_otp_expiry': None,
     })
+    bump_token_version(user_data.get('user_id'))
     return jsonify({"success": True, "message": "Password reset successfully"}), 200
 
 
@@ -251,19 +293,21 @@ def delete_account():
     if not User.check_password(password, user_data.get('password_hash')):
         return jsonify({"error": "Incorrect password"}), 401
 
-    jti = get_jwt()["jti"]
-    add_to_blocklist(jti)
+    token = get_jwt()
+    add_to_blocklist(token["jti"], token["exp"])
 
     if user_data.get('role') == 'hod':
         college = user_data.get('college')
         department = user_data.get('department')
-        # Soft-delete faculty and batches for this department
-        for f_doc in db.collection('faculty').where('college', '==', college).where('department', '==', department).stream():
-            f_doc.reference.update({'is_active': False})
-        for b_doc in db.collection('batches').where('college', '==', college).where('department', '==', department).stream():
-            b_doc.reference.update({'is_active': False})
+        # Soft-delete faculty and batches for this department (in the background if large)
+        params = {'college': college, 'department': department}
+        if estimate_deactivation(college, department) > current_app.config.get('BULK_JOB_THRESHOLD'):
+            job_queue.submit('deactivate-department', deactivate_scope_job, user_id, params)
+        else:
+            deactivate_scope_job(params, None)
 
     user_doc.reference.update({'is_active': False})
+    bump_token_version(user_id)
 
     response = make_response(jsonify({"success": True, "message": "Account deleted successfully"}))
     unset_refresh_cookies(response)
@@ -312,6 +356,7 @@ def register_admin():
         'is_active': True,
         'created_at': datetime.now(timezone.utc),
     }
+    new_user['login_identifiers'] = User.login_identifiers(new_user)
     db.collection(User.COLLECTION).add(new_user)
     return jsonify({"success": True, "userId": new_user_id}), 201
 
@@ -338,7 +383,10 @@ def update_profile():
         updates['mobile'] = sanitize_string(data['mobile'], 15)
 
     if updates:
+        updates['login_identifiers'] = User.login_identifiers({**user_doc.to_dict(), **updates})
         user_doc.reference.update(updates)
+        # Retire access tokens carrying the old claims (also drops the cached principal)
+        bump_token_version(user_id)
 
     updated_data = {**user_doc.to_dict(), **updates}
     return jsonify({"success": True, "user": User.to_dict(user_doc.id, updated_data)}), 200
@@ -369,4 +417,5 @@ def change_password():
         return jsonify({"error": msg}), 400
 
     user_doc.reference.update({'password_hash': User.set_password(new_password)})
+    bump_token_version(user_id)
     return jsonify({"success": True, "message": "Password changed successfully"}), 200
\ No newline at end of file
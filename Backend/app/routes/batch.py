@@ -1,16 +1,26 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime, timezone
-from ..extensions import db
+from ..extensions import db, firestore_metrics, repository
 from ..models.batch import Batch
 from ..models.faculty import Faculty
 from ..models.section import DepartmentSection
 from ..middleware.auth_middleware import require_role, require_auth
+from ..middleware.http_cache import http_cached
+from ..utils.batch_cache import get_batch_data, invalidate_batch
+from ..utils.cascade import wipe_batch_responses
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from ..utils.cache_versions import CacheVersion, VERSION_BATCHES, VERSION_SECTIONS
+from ..utils.pagination import parse_page, fetch_page, PaginationError
 from ..utils.validators import sanitize_string
 
 logger = logging.getLogger(__name__)
 batch_bp = Blueprint('batch', __name__)
 
+# Small shared pool for the independent lookups in create_batch
+_lookup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='batch-lookup')
+
 
 def _parse_date(date_str):
     """
@@ -32,6 +42,15 @@ def _parse_date(date_str):
         return None
 
 
+def _scoped_version(resource):
+    """Version markers for a list that admins see platform-wide and HoDs per department."""
+    def markers(user):
+        if user.get('role') == 'admin':
+            return [CacheVersion.ref(resource)]
+        return [CacheVersion.ref(resource, user.get('college'), user.get('department'))]
+    return markers
+
+
 # ── Batch Management ─────────────────────────────────────────────────────────
 
 @batch_bp.route('/create', methods=['POST'])
@@ -62,24 +81,28 @@ def create_batch():
     slot_start = _parse_date(data.get('slotStartDate'))
     slot_end = _parse_date(data.get('slotEndDate'))
 
-    # Overlap check
-    overlapping = db.collection(Batch.COLLECTION)\
+    # Overlap check runs on a worker thread while the faculty are resolved in one multi-get
+    overlap_query = db.collection(Batch.COLLECTION)\
         .where('college', '==', college)\
         .where('department', '==', department)\
         .where('section', '==', section)\
         .where('slot', '==', slot)\
-        .where('is_active', '==', True).limit(1).stream()
-    if any(overlapping):
-        return jsonify({"error": f"A Slot {slot} batch already exists for this section."}), 409
-
-    # Fetch and embed faculty
-    faculty_data = []
-    for fid in faculty_ids:
-        f_doc = db.collection(Faculty.COLLECTION).document(fid).get()
-        if f_doc.exists and f_doc.to_dict().get('is_active'):
-            f_dict = f_doc.to_dict()
+        .where('is_active', '==', True).limit(1)
+    overlap_future = _lookup_pool.submit(firestore_metrics.carry(lambda: any(overlap_query.stream())))
+
+    # Fetch and embed faculty (get_all returns documents in arbitrary order)
+    unique_ids = list(dict.fromkeys(fid for fid in faculty_ids if isinstance(fid, str) and fid))
+    refs = [db.collection(Faculty.COLLECTION).document(fid) for fid in unique_ids]
+    found = {}
+    for f_doc in (db.get_all(refs) if refs else []):
+        f_dict = f_doc.to_dict() if f_doc.exists else None
+        if f_dict and f_dict.get('is_active'):
             f_dict['id'] = f_doc.id
-            faculty_data.append(f_dict)
+            found[f_doc.id] = f_dict
+    faculty_data = [found[fid] for fid in unique_ids if fid in found]
+
+    if overlap_future.result():
+        return jsonify({"error": f"A Slot {slot} batch already exists for this section."}), 409
 
     if not faculty_data:
         return jsonify({"error": "None of the provided faculty IDs are valid"}), 400
@@ -105,7 +128,13 @@ def create_batch():
         'created_at': datetime.now(timezone.utc),
     }
 
-    db.collection(Batch.COLLECTION).document(batch_id).set(new_batch)
+    writer = db.batch()
+    writer.set(db.collection(Batch.COLLECTION).document(batch_id), new_batch)
+    DashboardSnapshot.put_batch(writer, batch_id, college)
+    CacheVersion.bump(writer, VERSION_BATCHES, college, department)
+    writer.commit()
+    invalidate_batch(batch_id)
+    repository.sync_batch(batch_id, new_batch)
 
     frontend_url = current_app.config.get('FRONTEND_URL', '').rstrip('/')
     return jsonify({
@@ -117,22 +146,29 @@ def create_batch():
 
 @batch_bp.route('/<batch_id>', methods=['GET'])
 def get_batch(batch_id):
-    doc = db.collection(Batch.COLLECTION).document(batch_id).get()
-    if not doc.exists or not doc.to_dict().get('is_active'):
+    data = get_batch_data(batch_id)
+    if not data or not data.get('is_active'):
         return jsonify({"error": "Batch not found"}), 404
-    return jsonify({"batch": Batch.to_dict(doc.id, doc.to_dict())}), 200
+    return jsonify({"batch": Batch.to_dict(batch_id, data)}), 200
 
 
 @batch_bp.route('/list', methods=['GET'])
 @require_auth
+@http_cached(_scoped_version(VERSION_BATCHES))
 def list_batches():
     user = g.current_user
     query = db.collection(Batch.COLLECTION).where('is_active', '==', True)
     if user.get('role') != 'admin':
         query = query.where('college', '==', user.get('college'))\
                      .where('department', '==', user.get('department'))
-    batches = [Batch.to_dict(doc.id, doc.to_dict()) for doc in query.stream()]
-    return jsonify({"batches": batches}), 200
+    try:
+        page = parse_page(request.args, Batch.FIELDS, current_app.config.get('PAGE_MAX_LIMIT'))
+        docs, next_cursor = fetch_page(query, db.collection(Batch.COLLECTION), page)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    batches = [Batch.to_dict(doc.id, doc.to_dict(), fields=page.fields) for doc in docs]
+    return jsonify({"batches": batches, "nextCursor": next_cursor}), 200
 
 
 @batch_bp.route('/<batch_id>/revoke', methods=['DELETE'])
@@ -147,10 +183,15 @@ def revoke_batch(batch_id):
     b = doc.to_dict()
     if user.get('role') == 'hod' and (b.get('college') != user.get('college') or b.get('department') != user.get('department')):
         return jsonify({"error": "Access denied"}), 403
-    doc_ref.update({'is_active': False})
-    subs = db.collection('feedback_submissions').where('batch_id', '==', batch_id).stream()
-    for sub in subs:
-        sub.reference.delete()
+    writer = db.batch()
+    writer.update(doc_ref, {'is_active': False})
+    DashboardSnapshot.remove(writer, b.get('college'), batch_ids=[batch_id])
+    CacheVersion.bump(writer, VERSION_BATCHES, b.get('college'), b.get('department'))
+    writer.commit()
+    invalidate_batch(batch_id)
+    if b.get('is_active'):
+        repository.close_batches(b.get('college'), [batch_id])
+    wipe_batch_responses([batch_id])
     logger.info(f"Batch revoked + responses wiped: {batch_id} by {user.get('user_id','?')}")
     return jsonify({"success": True, "message": "Batch revoked and responses deleted"}), 200
 
@@ -167,7 +208,14 @@ def deactivate_batch(batch_id):
     b = doc.to_dict()
     if user.get('role') == 'hod' and (b.get('college') != user.get('college') or b.get('department') != user.get('department')):
         return jsonify({"error": "Access denied"}), 403
-    doc_ref.update({'is_active': False})
+    writer = db.batch()
+    writer.update(doc_ref, {'is_active': False})
+    DashboardSnapshot.remove(writer, b.get('college'), batch_ids=[batch_id])
+    CacheVersion.bump(writer, VERSION_BATCHES, b.get('college'), b.get('department'))
+    writer.commit()
+    invalidate_batch(batch_id)
+    if b.get('is_active'):
+        repository.close_batches(b.get('college'), [batch_id])
     logger.info(f"Batch deactivated (data kept): {batch_id} by {user.get('user_id','?')}")
     return jsonify({"success": True, "message": "Link closed. Submitted responses are preserved."}), 200
 
@@ -176,16 +224,23 @@ def deactivate_batch(batch_id):
 
 @batch_bp.route('/sections', methods=['GET'])
 @require_auth
+@http_cached(_scoped_version(VERSION_SECTIONS))
 def list_sections():
     user = g.current_user
     if user.get('role') == 'admin':
         return jsonify({"error": "Admins do not have sections"}), 403
-    docs = db.collection(DepartmentSection.COLLECTION)\
+    query = db.collection(DepartmentSection.COLLECTION)\
         .where('college', '==', user.get('college'))\
         .where('department', '==', user.get('department'))\
-        .where('is_active', '==', True).stream()
-    sections = [DepartmentSection.to_dict(d.id, d.to_dict()) for d in docs]
-    return jsonify({"sections": sections}), 200
+        .where('is_active', '==', True)
+    try:
+        page = parse_page(request.args, DepartmentSection.FIELDS, current_app.config.get('PAGE_MAX_LIMIT'))
+        docs, next_cursor = fetch_page(query, db.collection(DepartmentSection.COLLECTION), page)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    sections = [DepartmentSection.to_dict(d.id, d.to_dict(), fields=page.fields) for d in docs]
+    return jsonify({"sections": sections, "nextCursor": next_cursor}), 200
 
 
 @batch_bp.route('/sections', methods=['POST'])
@@ -227,7 +282,10 @@ def create_section():
         'created_at': datetime.now(timezone.utc),
     }
     doc_ref = db.collection(DepartmentSection.COLLECTION).document()
-    doc_ref.set(new_section)
+    writer = db.batch()
+    writer.set(doc_ref, new_section)
+    CacheVersion.bump(writer, VERSION_SECTIONS, user.get('college'), user.get('department'))
+    writer.commit()
     return jsonify({"success": True, "section": DepartmentSection.to_dict(doc_ref.id, new_section)}), 201
 
 
@@ -254,7 +312,10 @@ def update_section(section_id):
     if 'sectionName' in data:
         updates['section_name'] = sanitize_string(data['sectionName'], 50)
 
-    doc_ref.update(updates)
+    writer = db.batch()
+    writer.update(doc_ref, updates)
+    CacheVersion.bump(writer, VERSION_SECTIONS, s.get('college'), s.get('department'))
+    writer.commit()
     updated = {**s, **updates}
     return jsonify({"success": True, "section": DepartmentSection.to_dict(section_id, updated)}), 200
 
@@ -272,5 +333,8 @@ def delete_section(section_id):
     if s.get('college') != user.get('college') or s.get('department') != user.get('department'):
         return jsonify({"error": "Access denied"}), 403
 
-    doc_ref.update({'is_active': False})
+    writer = db.batch()
+    writer.update(doc_ref, {'is_active': False})
+    CacheVersion.bump(writer, VERSION_SECTIONS, s.get('college'), s.get('department'))
+    writer.commit()
     return jsonify({"success": True, "message": "Section deleted"}), 200
\ No newline at end of file
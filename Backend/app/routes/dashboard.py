@@ -1,9 +1,14 @@
 import logging
-from flask import Blueprint, jsonify, request, g
-from ..extensions import db
+from flask import Blueprint, jsonify, request, g, current_app, make_response
+from ..extensions import db, repository
 from ..models.faculty import Faculty
 from ..models.batch import Batch
 from ..middleware.auth_middleware import require_role
+from ..middleware.http_cache import http_cached
+from ..utils.cascade import run_or_queue, estimate_deactivation, deactivate_scope_job
+from ..utils.pagination import parse_page, fetch_page, PaginationError
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from ..utils.cache_versions import CacheVersion, VERSION_FACULTY, VERSION_BATCHES
 from ..utils.validators import sanitize_string  # FIX: was missing; caused NameError on POST /department
 
 logger = logging.getLogger(__name__)
@@ -16,6 +21,21 @@ def admin_dashboard():
     user = g.current_user
     scoped_college = user.get('college')
 
+    # Plain requests are served from the materialized snapshot, with ETag revalidation
+    if not request.args:
+        snapshot = DashboardSnapshot.get(scoped_college)
+        if snapshot is not None:
+            etag, payload = snapshot
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(jsonify(payload), 200)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        logger.warning(f"Dashboard snapshot for {scoped_college or 'all colleges'} missing; "
+                       f"run `flask --app run rebuild-dashboard-snapshots`")
+
     faculty_ref = db.collection(Faculty.COLLECTION).where('is_active', '==', True)
     batch_ref = db.collection(Batch.COLLECTION).where('is_active', '==', True)
 
@@ -23,36 +43,53 @@ def admin_dashboard():
         faculty_ref = faculty_ref.where('college', '==', scoped_college)
         batch_ref = batch_ref.where('college', '==', scoped_college)
 
-    faculties = [Faculty.to_dict(d.id, d.to_dict()) for d in faculty_ref.stream()]
-    batches = [Batch.to_dict(d.id, d.to_dict()) for d in batch_ref.stream()]
-
-    # Submissions count aggregation
-    sub_count = 0
+    # masterFacultyList supports ?limit/startAfter/orderBy/order/select like GET /api/faculty;
+    # grouping needs college + department, so they are always read.
+    try:
+        page = parse_page(request.args, Faculty.FIELDS, current_app.config.get('PAGE_MAX_LIMIT'))
+        if page.projection is not None:
+            page.projection = sorted(set(page.projection) | {'college', 'department'})
+        faculty_docs, next_cursor = fetch_page(faculty_ref, db.collection(Faculty.COLLECTION), page)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Batch and submission totals; batches are only counted, never serialized
     if scoped_college:
-        for b in batches:
-            count_query = db.collection('feedback_submissions').where('batch_id', '==', b['id']).count()
-            sub_count += count_query.get()[0][0].value
+        batch_ids = [d.id for d in batch_ref.select([]).stream()]
+        total_batches = len(batch_ids)
+        sub_count = sum(repository.submission_counts(batch_ids).values())
     else:
-        count_query = db.collection('feedback_submissions').count()
-        sub_count = count_query.get()[0][0].value
+        total_batches = batch_ref.count().get()[0][0].value
+        sub_count = repository.count_submissions()
 
     faculty_by_dept = {}
-    for f in faculties:
-        key = f"{f['college']}_{f['dept']}"
+    for d in faculty_docs:
+        data = d.to_dict()
+        key = f"{data.get('college', '')}_{data.get('department', '')}"
         if key not in faculty_by_dept:
             faculty_by_dept[key] = []
-        faculty_by_dept[key].append(f)
+        faculty_by_dept[key].append(Faculty.to_dict(d.id, data, fields=page.fields))
+
+    if page.limit is None:
+        total_faculty = len(faculty_docs)
+    else:
+        total_faculty = faculty_ref.count().get()[0][0].value
 
     return jsonify({
-        "totalFaculty": len(faculties),
-        "totalBatches": len(batches),
+        "totalFaculty": total_faculty,
+        "totalBatches": total_batches,
         "totalSubmissions": sub_count,
         "masterFacultyList": faculty_by_dept,
+        "nextCursor": next_cursor,
     }), 200
 
 
 @dashboard_bp.route('/hod', methods=['GET'])
 @require_role(['hod'])
+@http_cached(lambda user: [
+    CacheVersion.ref(VERSION_FACULTY, user.get('college'), user.get('department')),
+    CacheVersion.ref(VERSION_BATCHES, user.get('college'), user.get('department')),
+])
 def hod_dashboard():
     user = g.current_user
     college, dept = user.get('college'), user.get('department')
@@ -95,11 +132,8 @@ def delete_department():
         return jsonify({"error": "Request body required"}), 400
     college = sanitize_string(data.get('college', ''), 100)
     dept = sanitize_string(data.get('dept', ''), 50)
-    for f in db.collection('faculty').where('college', '==', college).where('department', '==', dept).stream():
-        f.reference.update({'is_active': False})
-    for b in db.collection('batches').where('college', '==', college).where('department', '==', dept).stream():
-        b.reference.update({'is_active': False})
-    return jsonify({"success": True}), 200
+    params = {'college': college, 'department': dept}
+    return run_or_queue('deactivate-department', estimate_deactivation(college, dept), deactivate_scope_job, params)
 
 
 @dashboard_bp.route('/college', methods=['DELETE'])
@@ -109,10 +143,5 @@ def delete_college():
     if not data:
         return jsonify({"error": "Request body required"}), 400
     college = sanitize_string(data.get('college', ''), 100)
-    for f in db.collection('faculty').where('college', '==', college).stream():
-        f.reference.update({'is_active': False})
-    for b in db.collection('batches').where('college', '==', college).stream():
-        b.reference.update({'is_active': False})
-    for u in db.collection('users').where('college', '==', college).where('role', '==', 'hod').stream():
-        u.reference.update({'is_active': False})
-    return jsonify({"success": True}), 200
\ No newline at end of file
+    params = {'college': college, 'includeHods': True}
+    return run_or_queue('deactivate-college', estimate_deactivation(college), deactivate_scope_job, params)
@@ -1,16 +1,26 @@
 import logging
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 from datetime import datetime, timezone
 from ..extensions import db
 from ..models.faculty import Faculty
 from ..middleware.auth_middleware import require_role, require_auth
+from ..middleware.http_cache import http_cached
 from ..utils.validators import sanitize_string
+from ..utils.pagination import parse_page, fetch_page, PaginationError
+from ..utils.dashboard_snapshot import DashboardSnapshot
+from ..utils.cache_versions import CacheVersion, VERSION_FACULTY
 
 logger = logging.getLogger(__name__)
 faculty_bp = Blueprint('faculty', __name__)
 
+def _faculty_version(user):
+    if user.get('role') == 'admin':
+        return [CacheVersion.ref(VERSION_FACULTY)]
+    return [CacheVersion.ref(VERSION_FACULTY, user.get('college'), user.get('department'))]
+
 @faculty_bp.route('', methods=['GET'])
 @require_auth
+@http_cached(_faculty_version)
 def get_all_faculty():
     user = g.current_user
     query = db.collection(Faculty.COLLECTION).where('is_active', '==', True)
@@ -19,8 +29,14 @@ def get_all_faculty():
         query = query.where('college', '==', user.get('college'))\
                      .where('department', '==', user.get('department'))
 
-    faculty_list = [Faculty.to_dict(doc.id, doc.to_dict()) for doc in query.stream()]
-    return jsonify({"faculty": faculty_list}), 200
+    try:
+        page = parse_page(request.args, Faculty.FIELDS, current_app.config.get('PAGE_MAX_LIMIT'))
+        docs, next_cursor = fetch_page(query, db.collection(Faculty.COLLECTION), page)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    faculty_list = [Faculty.to_dict(doc.id, doc.to_dict(), fields=page.fields) for doc in docs]
+    return jsonify({"faculty": faculty_list, "nextCursor": next_cursor}), 200
 
 @faculty_bp.route('', methods=['POST'])
 @require_role(['hod', 'admin'])
@@ -45,7 +61,11 @@ def create_faculty():
     }
 
     doc_ref = db.collection(Faculty.COLLECTION).document()
-    doc_ref.set(new_faculty)
+    writer = db.batch()
+    writer.set(doc_ref, new_faculty)
+    DashboardSnapshot.put_faculty(writer, doc_ref.id, new_faculty)
+    CacheVersion.bump(writer, VERSION_FACULTY, college, department)
+    writer.commit()
 
     return jsonify({"success": True, "faculty": Faculty.to_dict(doc_ref.id, new_faculty)}), 201
 @faculty_bp.route('/<faculty_id>', methods=['PUT'])
@@ -70,12 +90,24 @@ def update_faculty(faculty_id):
     if 'sec' in data:
         updates['section'] = sanitize_string(str(data['sec']), 20)
 
-    doc_ref.update(updates)
     updated = {**doc.to_dict(), **updates}
+    writer = db.batch()
+    writer.update(doc_ref, updates)
+    DashboardSnapshot.put_faculty(writer, faculty_id, updated)
+    CacheVersion.bump(writer, VERSION_FACULTY, updated.get('college'), updated.get('department'))
+    writer.commit()
     return jsonify({"success": True, "faculty": Faculty.to_dict(faculty_id, updated)}), 200
 
 @faculty_bp.route('/<faculty_id>', methods=['DELETE'])
 @require_role(['hod', 'admin'])
 def delete_faculty(faculty_id):
-    db.collection(Faculty.COLLECTION).document(faculty_id).update({'is_active': False})
+    doc_ref = db.collection(Faculty.COLLECTION).document(faculty_id)
+    doc = doc_ref.get()
+    writer = db.batch()
+    writer.update(doc_ref, {'is_active': False})
+    if doc.exists:
+        f = doc.to_dict()
+        DashboardSnapshot.remove(writer, f.get('college'), faculty_ids=[faculty_id])
+        CacheVersion.bump(writer, VERSION_FACULTY, f.get('college'), f.get('department'))
+    writer.commit()
     return jsonify({"success": True, "message": "Faculty deleted successfully"}), 200
\ No newline at end of file
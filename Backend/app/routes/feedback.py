@@ -1,171 +1,164 @@
 import logging
-from flask import Blueprint, request, jsonify, g
-from datetime import datetime, timezone
-from ..extensions import db, limiter
-from ..models.batch import Batch
-from ..models.feedback import FeedbackSubmission
+from flask import Blueprint, request, jsonify, g, current_app
+from ..extensions import db, limiter, repository
+from ..models.faculty import Faculty
 from ..middleware.auth_middleware import require_role
+from ..middleware.http_cache import http_cached
+from ..repositories import SubmissionRejected, check_batch_open
+from ..utils.batch_cache import get_batch_data
+from ..utils.slot_comparison import compare_slots
+from ..utils.validators import sanitize_string
+from ..utils.cascade import (
+    run_or_queue, scope_batch_ids,
+    wipe_batch_responses_job, wipe_faculty_responses_job,
+)
 
 logger = logging.getLogger(__name__)
 feedback_bp = Blueprint('feedback', __name__)
 
-@feedback_bp.route('/submit', methods=['POST'])
-@limiter.limit("30 per minute")
-def submit_feedback():
-    data = request.get_json()
-    batch_id_str = data.get('batchId', '')
-    responses = data.get('responses', [])
-    comments = data.get('comments', '')
+SUBMIT_RATE_LIMIT = "30 per minute"
+SLOT_COMPARISON_MAX_TOP = 50
+
 
-    # 1. Verify Batch
-    batch_ref = db.collection(Batch.COLLECTION).document(batch_id_str)
-    batch_doc = batch_ref.get()
-    
-    if not batch_doc.exists or not batch_doc.to_dict().get('is_active'):
-        return jsonify({"error": "Feedback batch not found or closed."}), 404
-
-    batch_data = batch_doc.to_dict()
-    client_ip = request.headers.get('X-Forwarded-For', request.remote_addr).split(',')[0].strip()
-
-    # Check slot end date — students cannot submit after the window closes
-    slot_end = batch_data.get('slot_end_date')
-    if slot_end:
-        from datetime import date
-        end_date = slot_end.date() if hasattr(slot_end, 'date') else None
-        if end_date and date.today() > end_date:
-            return jsonify({"error": "The feedback window for this link has closed."}), 409
-
-    # 2. Check Submission Limits
-    total_students = batch_data.get('total_students', 0)
-    if total_students > 0:
-        count_query = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', '==', batch_id_str).count()
-        current_count = count_query.get()[0][0].value
-        if current_count >= total_students:
-            return jsonify({"error": f"This section has reached its maximum response limit ({total_students})."}), 409
-
-    # 2b. One-per-device check via IP (best-effort — covers most cases)
-    existing_ip = db.collection(FeedbackSubmission.COLLECTION)\
-        .where('batch_id', '==', batch_id_str)\
-        .where('ip_address', '==', client_ip)\
-        .limit(1).stream()
-    if any(existing_ip):
-        return jsonify({"error": "A response from this device has already been submitted for this link."}), 409
-
-    # 3. Format the Embedded Ratings Map (The Cost Saver)
+def resolve_client_ip(forwarded_for, remote_addr):
+    return (forwarded_for or remote_addr or '').split(',')[0].strip()
+
+
+def ratings_from_responses(responses):
+    """Builds the embedded {faculty_id: {parameter: rating}} map from the request body."""
     ratings_map = {}
     for resp in responses:
         fac_id = resp.get('facultyId')
         fac_ratings = resp.get('ratings', {})
         if fac_id and fac_ratings:
             ratings_map[fac_id] = {k: int(v) for k, v in fac_ratings.items()}
+    return ratings_map
+
+
+@feedback_bp.route('/submit', methods=['POST'])
+@limiter.limit(SUBMIT_RATE_LIMIT)
+def submit_feedback():
+    data = request.get_json()
+    batch_id_str = data.get('batchId', '')
+    responses = data.get('responses', [])
+    comments = data.get('comments', '')
+
+    client_ip = resolve_client_ip(request.headers.get('X-Forwarded-For'), request.remote_addr)
 
-    # 4. Save as ONE document
-    submission_data = FeedbackSubmission.create_submission_data(
-        batch_id=batch_id_str,
-        slot=batch_data.get('slot', 1),
-        comments=comments,
-        ip_address=client_ip,
-        ratings_map=ratings_map
-    )
+    # Format the Embedded Ratings Map (The Cost Saver)
+    ratings_map = ratings_from_responses(responses)
+
+    # Turn away closed batches from the cache; the repository re-checks the
+    # batch when it stores the submission
+    batch_data = get_batch_data(batch_id_str) if batch_id_str else None
+    try:
+        check_batch_open(batch_data)
+        repository.submit(batch_id_str, batch_data, client_ip, comments, ratings_map)
+    except SubmissionRejected as e:
+        return jsonify({"error": e.message}), e.status
 
-    db.collection(FeedbackSubmission.COLLECTION).add(submission_data)
     return jsonify({"success": True, "message": "Feedback submitted"}), 201
 
 
 @feedback_bp.route('/faculty/<faculty_id>/stats', methods=['GET'])
 @require_role(['hod', 'admin'])
+@http_cached(lambda user, faculty_id: repository.stats_markers(faculty_id))
 def get_faculty_stats(faculty_id):
-    """Calculates averages in-memory from embedded documents."""
-    # Find all submissions that contain this faculty_id in their ratings map
-    # Firestore syntax allows querying inside map keys
-    query = db.collection(FeedbackSubmission.COLLECTION).where(f'ratings.{faculty_id}', '!=', None)
-    submissions = query.stream()
-
-    slot_data = {}
-    total_submissions = 0
-
-    for sub in submissions:
-        data = sub.to_dict()
-        slot = data.get('slot', 1)
-        fac_ratings = data.get('ratings', {}).get(faculty_id, {})
-        
-        if not fac_ratings: continue
-        total_submissions += 1
-
-        if slot not in slot_data: slot_data[slot] = {}
-        
-        for param, rating in fac_ratings.items():
-            if param not in slot_data[slot]: slot_data[slot][param] = []
-            slot_data[slot][param].append(rating)
-
-    if total_submissions == 0:
+    """Slot stats of one faculty member (the aggregate document, with Firestore storage)."""
+    stats_response = repository.faculty_stats([faculty_id]).stats()[faculty_id]
+    if stats_response is None:
         return jsonify({"stats": None, "message": "No feedback data"}), 200
+    return jsonify({"stats": stats_response}), 200
 
-    result = {}
-    for slot, params in slot_data.items():
-        param_stats = {}
-        all_ratings = []
-        for param, vals in params.items():
-            avg = sum(vals) / len(vals)
-            param_stats[param] = {
-                'average': round(avg, 2),
-                'percentage': round((avg / 10) * 100, 1),
-                'totalRatings': len(vals),
-            }
-            all_ratings.extend(vals)
-
-        overall = sum(all_ratings) / len(all_ratings) if all_ratings else 0
-        
-        result[f'slot{slot}'] = {
-            'parameterStats': param_stats,
-            'overallAverage': round(overall, 2),
-            'responseCount': len(all_ratings) // len(params) if params else 0
-        }
-
-    stats_response = {
-        "totalResponses": total_submissions,
-        "hasSlot1": 1 in slot_data,
-        "hasSlot2": 2 in slot_data,
-    }
-    if 1 in slot_data:
-        stats_response["slot1"] = result.get("slot1", {})
-    if 2 in slot_data:
-        stats_response["slot2"] = result.get("slot2", {})
 
-    return jsonify({"stats": stats_response}), 200
 @feedback_bp.route('/faculty/stats/multi', methods=['POST'])
 @require_role(['hod', 'admin'])
 def get_multi_faculty_stats():
-    data = request.get_json()
+    """Full slot stats for many faculty members in one response."""
+    data = request.get_json(silent=True) or {}
     faculty_ids = data.get('faculty_ids', [])
-    results = {}
-    for fid in faculty_ids:
-        query = db.collection(FeedbackSubmission.COLLECTION).where(f'ratings.{fid}', '!=', None)
-        slot_data = {}
-        total = 0
-        for sub in query.stream():
-            s = sub.to_dict()
-            slot = s.get('slot', 1)
-            fac_ratings = s.get('ratings', {}).get(fid, {})
-            if not fac_ratings:
-                continue
-            total += 1
-            if slot not in slot_data:
-                slot_data[slot] = {}
-            for param, rating in fac_ratings.items():
-                slot_data[slot].setdefault(param, []).append(rating)
-        if total > 0:
-            results[fid] = {"totalResponses": total, "hasSlot1": 1 in slot_data, "hasSlot2": 2 in slot_data}
+    if not isinstance(faculty_ids, list) or not all(isinstance(fid, str) and fid for fid in faculty_ids):
+        return jsonify({"error": "faculty_ids must be a list of faculty IDs"}), 400
+    limit = current_app.config.get('MULTI_STATS_MAX_IDS')
+    if len(set(faculty_ids)) > limit:
+        return jsonify({"error": f"At most {limit} faculty IDs per request"}), 400
+
+    results = {fid: stats for fid, stats in repository.faculty_stats(faculty_ids).stats().items() if stats is not None}
     return jsonify({"stats": results}), 200
 
 
+@feedback_bp.route('/department/slot-comparison', methods=['GET'])
+@require_role(['hod', 'admin'])
+def get_department_slot_comparison():
+    """
+    Slot-over-slot changes for every active faculty member of a department
+    (utils/slot_comparison.py). Query: from / to (slots, default 1 and 2),
+    top (ranking length) and source: 'aggregates' (default) reads the
+    faculty_aggregates documents, 'submissions' recomputes from one pass over
+    the department's submissions. HoDs always get their own department;
+    admins pass college and department, and college-scoped admins may
+    leave out the college (any other one is refused).
+    """
+    user = g.current_user
+    if user.get('role') == 'hod':
+        college, department = user.get('college'), user.get('department')
+    else:
+        college = sanitize_string(request.args.get('college', ''), 100)
+        department = sanitize_string(request.args.get('department', ''), 50)
+        # College-scoped admins (e.g. a principal) only see their own college
+        scoped_college = user.get('college')
+        if scoped_college:
+            if college and college != scoped_college:
+                return jsonify({"error": "Access denied"}), 403
+            college = scoped_college
+        if not college or not department:
+            return jsonify({"error": "college and department required"}), 400
+
+    try:
+        from_slot = int(request.args.get('from', 1))
+        to_slot = int(request.args.get('to', 2))
+        top = int(request.args.get('top', 10))
+    except ValueError:
+        return jsonify({"error": "from, to and top must be integers"}), 400
+    if from_slot == to_slot:
+        return jsonify({"error": "from and to must be different slots"}), 400
+    if not 1 <= top <= SLOT_COMPARISON_MAX_TOP:
+        return jsonify({"error": f"top must be between 1 and {SLOT_COMPARISON_MAX_TOP}"}), 400
+    source = request.args.get('source', 'aggregates')
+    if source not in ('aggregates', 'submissions'):
+        return jsonify({"error": "source must be 'aggregates' or 'submissions'"}), 400
+
+    faculty = {
+        doc.id: doc.to_dict() for doc in db.collection(Faculty.COLLECTION)
+        .where('college', '==', college)
+        .where('department', '==', department)
+        .where('is_active', '==', True)
+        .select(['name', 'subject']).stream()
+    }
+    if source == 'aggregates':
+        stats = repository.faculty_stats(list(faculty))
+    else:
+        stats = repository.scope_stats(college, department, list(faculty))
+
+    comparison = compare_slots(stats, from_slot, to_slot, top)
+    for entry in comparison['faculty']:
+        data = faculty[entry['facultyId']]
+        entry['name'], entry['subject'] = data.get('name', ''), data.get('subject', '')
+    return jsonify({
+        "college": college,
+        "department": department,
+        "fromSlot": from_slot,
+        "toSlot": to_slot,
+        "source": source,
+        **comparison,
+    }), 200
+
+
 @feedback_bp.route('/faculty/<faculty_id>/responses', methods=['DELETE'])
 @require_role(['hod', 'admin'])
 def delete_faculty_responses(faculty_id):
-    subs = db.collection(FeedbackSubmission.COLLECTION).where(f'ratings.{faculty_id}', '!=', None).stream()
-    for sub in subs:
-        sub.reference.delete()
-    return jsonify({"success": True}), 200
+    estimate = repository.count_faculty_responses(faculty_id)
+    return run_or_queue('wipe-faculty-responses', estimate, wipe_faculty_responses_job, {'facultyId': faculty_id})
 
 
 @feedback_bp.route('/department/responses', methods=['DELETE'])
@@ -174,12 +167,9 @@ def delete_department_responses():
     data = request.get_json()
     college = data.get('college')
     dept = data.get('dept')
-    batches = db.collection('batches').where('college', '==', college).where('department', '==', dept).stream()
-    for batch in batches:
-        subs = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', '==', batch.id).stream()
-        for sub in subs:
-            sub.reference.delete()
-    return jsonify({"success": True}), 200
+    batch_ids = scope_batch_ids(college, dept)
+    estimate = repository.count_batch_responses(batch_ids)
+    return run_or_queue('wipe-department-responses', estimate, wipe_batch_responses_job, {'batchIds': batch_ids})
 
 
 @feedback_bp.route('/college/responses', methods=['DELETE'])
@@ -187,9 +177,6 @@ def delete_department_responses():
 def delete_college_responses():
     data = request.get_json()
     college = data.get('college')
-    batches = db.collection('batches').where('college', '==', college).stream()
-    for batch in batches:
-        subs = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', '==', batch.id).stream()
-        for sub in subs:
-            sub.reference.delete()
-    return jsonify({"success": True}), 200
\ No newline at end of file
+    batch_ids = scope_batch_ids(college)
+    estimate = repository.count_batch_responses(batch_ids)
+    return run_or_queue('wipe-college-responses', estimate, wipe_batch_responses_job, {'batchIds': batch_ids})
@@ -0,0 +1,43 @@
+import logging
+from flask import Blueprint, jsonify, g
+from ..extensions import job_queue
+from ..middleware.auth_middleware import require_role
+
+logger = logging.getLogger(__name__)
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def job_view(job):
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'result': job.get('result'),
+        'scope': job['params'],
+        'filename': job['filename'],
+        'createdAt': job['created_at'],
+        'updatedAt': job['updated_at'],
+    }
+
+
+def owned_job(job_id, kind=None):
+    """The job if it exists (and is of `kind`) and the current user may see it."""
+    job = job_queue.get(job_id)
+    if not job or (kind and job['kind'] != kind):
+        return None
+    user = g.current_user
+    if user.get('role') != 'admin' and job['owner'] != user.get('user_id'):
+        return None
+    return job
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@require_role(['hod', 'admin'])
+def get_job(job_id):
+    """Status of any background job (report bundles, bulk deletes / deactivations)."""
+    job = owned_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job": job_view(job)}), 200
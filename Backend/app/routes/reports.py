@@ -1,31 +1,149 @@
+import csv
+import io
+import json
 import logging
-from flask import Blueprint, jsonify, g
-from ..extensions import db
+from flask import Blueprint, Response, jsonify, g, request, current_app, stream_with_context, send_file
+from ..extensions import job_queue, repository
 from ..models.feedback import FeedbackSubmission
-from ..middleware.auth_middleware import require_auth
+from ..middleware.auth_middleware import require_auth, require_role
+from ..utils.report_bundle import build_report
+from ..utils.validators import sanitize_string
+from .jobs import job_view, owned_job
 
 logger = logging.getLogger(__name__)
 reports_bp = Blueprint('reports', __name__)
 
+EXPORT_COLUMNS = ['submissionId', 'slot', 'parameter', 'rating', 'submittedAt', 'comments']
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def _report_rows(submission_id, data, faculty_id):
+    fac_ratings = FeedbackSubmission.faculty_ratings(data, faculty_id)
+    submitted_at = data.get('submitted_at').isoformat() if data.get('submitted_at') else None
+    for param, rating in fac_ratings.items():
+        yield {
+            'submissionId': submission_id,
+            'slot': data.get('slot', 1),
+            'parameter': param,
+            'rating': rating,
+            'submittedAt': submitted_at,
+            'comments': data.get('comments', ''),
+        }
+
+
+def _csv_line(values):
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue()
+
+
 @reports_bp.route('/faculty/<faculty_id>/data', methods=['GET'])
 @require_auth
 def get_faculty_report_data(faculty_id):
-    """Extract raw data from the embedded NoSQL arrays for CSV export."""
-    query = db.collection(FeedbackSubmission.COLLECTION).where(f'ratings.{faculty_id}', '!=', None)
-    submissions = query.stream()
-
-    raw_data = []
-    for sub in submissions:
-        data = sub.to_dict()
-        fac_ratings = data.get('ratings', {}).get(faculty_id, {})
-        
-        for param, rating in fac_ratings.items():
-            raw_data.append({
-                'parameter': param,
-                'rating': rating,
-                'slot': data.get('slot', 1),
-                'submittedAt': data.get('submitted_at').isoformat() if data.get('submitted_at') else None,
-                'comments': data.get('comments', '')
-            })
-
-    return jsonify({"data": raw_data}), 200
\ No newline at end of file
+    """
+    Extract raw data from the embedded NoSQL arrays for CSV export.
+
+    ?format=csv|ndjson streams the rows instead of returning one JSON body.
+    Every row carries its submissionId; a client that lost the connection
+    can pass the last complete one back as ?cursor=<submissionId> to resume.
+    """
+    export_format = request.args.get('format', 'json').lower()
+    if export_format == 'json':
+        raw_data = []
+        for submission_id, data in repository.faculty_submissions(faculty_id):
+            for row in _report_rows(submission_id, data, faculty_id):
+                row.pop('submissionId')
+                raw_data.append(row)
+        return jsonify({"data": raw_data}), 200
+
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be one of json, csv, ndjson"}), 400
+
+    start_after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        start_after = repository.faculty_cursor(faculty_id, cursor)
+        if start_after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    page_size = current_app.config.get('REPORT_EXPORT_PAGE_SIZE')
+
+    def generate():
+        if export_format == 'csv' and not cursor:
+            yield _csv_line(EXPORT_COLUMNS)
+        # Read one page at a time, each page a fresh short query
+        for submission_id, data in repository.faculty_submissions(faculty_id, start_after, page_size):
+            for row in _report_rows(submission_id, data, faculty_id):
+                if export_format == 'csv':
+                    yield _csv_line([row[col] for col in EXPORT_COLUMNS])
+                else:
+                    yield json.dumps(row) + '\n'
+
+    logger.info(f"Streaming {export_format} report for faculty {faculty_id} to {g.current_user.get('user_id', '?')}")
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="faculty-{faculty_id}.{export_format}"',
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+# ── Bulk report jobs ────────────────────────────────────────────────────────
+
+@reports_bp.route('/jobs', methods=['POST'])
+@require_role(['hod', 'admin'])
+def create_report_job():
+    """
+    Queues a department- or college-wide report. Body:
+    {scope: 'department' | 'college', college, department, format: 'xlsx' | 'csv'}.
+    HoDs always get their own department. Poll GET /jobs/<id>, then download.
+    """
+    user = g.current_user
+    data = request.get_json(silent=True) or {}
+
+    export_format = data.get('format', 'xlsx')
+    if export_format not in ('xlsx', 'csv'):
+        return jsonify({"error": "format must be 'xlsx' or 'csv'"}), 400
+
+    if user.get('role') == 'hod':
+        college, department = user.get('college'), user.get('department')
+    else:
+        scope = data.get('scope', 'department')
+        if scope not in ('department', 'college'):
+            return jsonify({"error": "scope must be 'department' or 'college'"}), 400
+        college = sanitize_string(data.get('college', ''), 100)
+        department = sanitize_string(data.get('department', ''), 50) if scope == 'department' else None
+        if not college or (scope == 'department' and not department):
+            return jsonify({"error": "college (and department for a department report) required"}), 400
+
+    params = {'college': college, 'department': department, 'format': export_format}
+    job = job_queue.submit('report', build_report, user.get('user_id'), params)
+    logger.info(f"Report job {job['id']} queued by {user.get('user_id', '?')}: {params}")
+    return jsonify({"job": job_view(job)}), 202
+
+
+@reports_bp.route('/jobs/<job_id>', methods=['GET'])
+@require_role(['hod', 'admin'])
+def get_report_job(job_id):
+    job = owned_job(job_id, kind='report')
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job": job_view(job)}), 200
+
+
+@reports_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@require_role(['hod', 'admin'])
+def download_report_job(job_id):
+    job = owned_job(job_id, kind='report')
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if job['status'] != 'done':
+        return jsonify({"error": f"Report is {job['status']}", "job": job_view(job)}), 409
+    return send_file(
+        job_queue.artifact_path(job),
+        mimetype=job['mimetype'],
+        as_attachment=True,
+        download_name=job['filename'],
+    )
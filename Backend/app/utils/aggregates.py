@@ -0,0 +1,164 @@
+"""
+utils/aggregates.py
+
+Per-faculty rating aggregates, maintained alongside feedback_submissions.
+
+    faculty_aggregates/{faculty_id}/shards/{0..NUM_SHARDS-1}  →  {
+        'faculty_id': ...,
+        'slots': {
+            '1': {
+                'responses': int,
+                'parameters': {
+                    '<parameter>': {'count': int, 'sum': int, 'sum_squares': int,
+                                    'histogram': {'1': int, ..., '10': int}},
+                },
+            },
+        },
+        'updated_at': timestamp,
+    }
+
+Each shard holds partial sums. A submission adds its ratings to one random
+shard per faculty member with Increment transforms, in the same transaction
+that stores it, so a class submitting at once rarely contends on the same
+document (like the submission counters in utils/counters.py); deleting
+submissions retracts them the same way. Reading a faculty member's stats is
+one multi-get of NUM_SHARDS documents summed together, however many
+responses they have.
+
+Aggregates are derived data: `flask --app run rebuild-faculty-aggregates`
+recomputes them from feedback_submissions (run it once after upgrading; it
+also removes the unsharded faculty_aggregates/{faculty_id} documents older
+versions wrote).
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from firebase_admin import firestore
+from ..extensions import db, firestore_metrics
+from .cache_versions import CacheVersion
+from .rating_stats import RatingStats
+
+RATING_SCALE = range(1, 11)
+
+
+class FacultyAggregate:
+    COLLECTION = 'faculty_aggregates'
+    SHARD_COLLECTION = 'shards'
+    NUM_SHARDS = 5
+
+    @staticmethod
+    def shard_refs(faculty_id):
+        parent = db.collection(FacultyAggregate.COLLECTION).document(faculty_id)
+        return [
+            parent.collection(FacultyAggregate.SHARD_COLLECTION).document(str(i))
+            for i in range(FacultyAggregate.NUM_SHARDS)
+        ]
+
+    @staticmethod
+    def accumulate(totals, slot, ratings_map, sign=1):
+        """
+        Adds one submission's ratings (sign=-1 to remove them) into `totals`,
+        a plain {faculty_id: {slot: {...}}} dict shaped like the 'slots' field.
+        """
+        for faculty_id, ratings in (ratings_map or {}).items():
+            if not ratings:
+                continue
+            slot_totals = totals.setdefault(faculty_id, {}).setdefault(str(slot), {})
+            slot_totals['responses'] = slot_totals.get('responses', 0) + sign
+            params = slot_totals.setdefault('parameters', {})
+            for param, rating in ratings.items():
+                entry = params.setdefault(param, {'count': 0, 'sum': 0, 'sum_squares': 0, 'histogram': {}})
+                entry['count'] += sign
+                entry['sum'] += sign * rating
+                entry['sum_squares'] += sign * rating * rating
+                if rating in RATING_SCALE:
+                    key = str(rating)
+                    entry['histogram'][key] = entry['histogram'].get(key, 0) + sign
+        return totals
+
+    @staticmethod
+    def _increments(value):
+        if isinstance(value, dict):
+            return {k: FacultyAggregate._increments(v) for k, v in value.items()}
+        return firestore.Increment(value)
+
+    @staticmethod
+    def write_deltas(writer, totals):
+        """
+        Queues one merged Increment write per faculty, to a random shard, on
+        `writer` (a WriteBatch or Transaction).
+        """
+        for faculty_id, slots in totals.items():
+            ref = random.choice(FacultyAggregate.shard_refs(faculty_id))
+            writer.set(ref, {
+                'faculty_id': faculty_id,
+                'slots': FacultyAggregate._increments(slots),
+                'updated_at': firestore.SERVER_TIMESTAMP,
+            }, merge=True)
+            CacheVersion.invalidate(ref)  # the shards are their own ETag version markers
+
+    @staticmethod
+    def apply(writer, slot, ratings_map, sign=1):
+        FacultyAggregate.write_deltas(writer, FacultyAggregate.accumulate({}, slot, ratings_map, sign))
+
+    @staticmethod
+    def _add(into, values):
+        for key, value in values.items():
+            if isinstance(value, dict):
+                FacultyAggregate._add(into.setdefault(key, {}), value)
+            else:
+                into[key] = into.get(key, 0) + value
+
+    @staticmethod
+    def tally(aggregates, shard_snapshots):
+        """
+        Sums shard snapshots (from a multi-get of shard_refs) into
+        {faculty_id: aggregate dict}; ids without any shard are left alone.
+        """
+        for snap in shard_snapshots:
+            if snap.exists:
+                faculty_id = snap.reference.parent.parent.id
+                if aggregates.get(faculty_id) is None:
+                    aggregates[faculty_id] = {'faculty_id': faculty_id, 'slots': {}}
+                FacultyAggregate._add(aggregates[faculty_id]['slots'], (snap.to_dict() or {}).get('slots') or {})
+        return aggregates
+
+    @staticmethod
+    def _fetch(faculty_ids):
+        refs = [ref for fid in faculty_ids for ref in FacultyAggregate.shard_refs(fid)]
+        return FacultyAggregate.tally({}, db.get_all(refs))
+
+    @staticmethod
+    def get_many(faculty_ids, chunk_size=100, max_workers=4):
+        """
+        Returns {faculty_id: aggregate dict or None}. Ids are de-duplicated and
+        read as multi-gets of the shards of `chunk_size` faculty, at most
+        `max_workers` in flight at once, so latency stays flat as the list grows.
+        """
+        ids = list(dict.fromkeys(faculty_ids))
+        result = dict.fromkeys(ids)
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        if len(chunks) <= 1:
+            for chunk in chunks:
+                result.update(FacultyAggregate._fetch(chunk))
+            return result
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            for found in pool.map(firestore_metrics.carry(FacultyAggregate._fetch), chunks):
+                result.update(found)
+        return result
+
+    @staticmethod
+    def stats_many(aggregates):
+        """
+        {faculty_id: aggregate document or None} → {faculty_id: stats payload
+        or None}, computed for all of them at once (utils/rating_stats.py).
+        """
+        return RatingStats.from_aggregates(aggregates).stats()
+
+    @staticmethod
+    def to_stats(data):
+        """
+        Formats an aggregate document as the stats payload the dashboards use,
+        or returns None if it holds no responses.
+        """
+        return FacultyAggregate.stats_many({None: data})[None]
@@ -0,0 +1,50 @@
+"""
+utils/batch_cache.py
+
+Read-through cache for batch documents on the public student endpoints
+(GET /api/batch/<id>, POST /api/feedback/submit), which see bursts of the
+same batch id within a few minutes.
+
+Unknown ids are cached too (for BATCH_CACHE_NEGATIVE_TTL seconds) so a bad
+link can't be used to hammer Firestore. Routes that close or change a batch
+call invalidate_batch(), which makes the change visible immediately on this
+instance; other instances pick it up within BATCH_CACHE_TTL seconds.
+"""
+
+from flask import current_app
+
+from ..extensions import db, batch_cache
+from ..models.batch import Batch
+from .cache import MISSING
+
+
+def get_batch_data(batch_id):
+    """Returns the raw batch document dict, or None if it doesn't exist."""
+    data = peek_batch(batch_id)
+    if data is MISSING:
+        doc = db.collection(Batch.COLLECTION).document(batch_id).get()
+        data = store_batch(batch_id, doc.to_dict() if doc.exists else None)
+    return data
+
+
+def peek_batch(batch_id):
+    """Cached copy of the batch (None for a cached miss), or MISSING if it isn't cached."""
+    data = batch_cache.get(batch_id)
+    if data is MISSING or data is None:
+        return data
+    return dict(data)
+
+
+def store_batch(batch_id, data):
+    """Caches a freshly read batch document (None if it doesn't exist) and returns a copy."""
+    ttl = None if data is not None else current_app.config.get('BATCH_CACHE_NEGATIVE_TTL')
+    batch_cache.set(batch_id, data, ttl=ttl)
+    return dict(data) if data is not None else None
+
+
+def invalidate_batch(batch_id=None):
+    """Drops one batch from this instance's cache, or all of them if no id is given."""
+    if batch_id is None:
+        batch_cache.clear()
+    else:
+        batch_cache.invalidate(batch_id)
@@ -0,0 +1,151 @@
+"""
+utils/bulk.py
+
+Batched, parallel Firestore mutations for cascade deletes / deactivations.
+
+    with BulkWriter(progress=report) as writer:
+        for doc in query.stream():
+            writer.delete(doc.reference)
+
+Operations are grouped into WriteBatches of BATCH_WRITE_LIMIT (500, the
+Firestore maximum). Full batches are committed on a small thread pool while
+the caller keeps streaming, up to `parallelism` commits in flight. A commit
+that fails with a transient error (contention, quota, unavailable) is retried
+with exponential backoff and jitter.
+
+Only queue idempotent operations (delete, plain set / update): a retried
+commit may re-apply writes that had already landed. Increments and other
+transforms belong in a single write after the bulk pass.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from google.api_core import exceptions as gexc
+
+from ..extensions import db, firestore_metrics
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batched writes with more than 500 operations.
+BATCH_WRITE_LIMIT = 500
+
+RETRYABLE_ERRORS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.InternalServerError,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+)
+
+
+class BulkWriter:
+    def __init__(self, client=None, batch_size=BATCH_WRITE_LIMIT, parallelism=4,
+                 max_attempts=5, base_delay=0.5, progress=None):
+        self._client = client or db
+        self._batch_size = min(batch_size, BATCH_WRITE_LIMIT)
+        self._parallelism = max(1, parallelism)
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._progress = progress
+        self._pending = []
+        self._in_flight = set()
+        self._executor = None
+        self._lock = threading.Lock()
+        self.committed = 0
+        self.batches = 0
+
+    # ── queueing ────────────────────────────────────────────────────────────
+
+    def delete(self, ref):
+        self._add(('delete', ref, None))
+
+    def update(self, ref, data):
+        self._add(('update', ref, data))
+
+    def set(self, ref, data, merge=False):
+        self._add(('set', ref, (data, merge)))
+
+    def _add(self, op):
+        self._pending.append(op)
+        if len(self._pending) >= self._batch_size:
+            self._dispatch()
+
+    # ── committing ──────────────────────────────────────────────────────────
+
+    def _dispatch(self):
+        ops, self._pending = self._pending, []
+        if not ops:
+            return
+        if self._parallelism == 1:
+            self._commit(ops)
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._parallelism, thread_name_prefix='bulk')
+        # Backpressure: never hold more than `parallelism` batches in memory
+        while len(self._in_flight) >= self._parallelism:
+            done, _ = wait(self._in_flight, return_when=FIRST_COMPLETED)
+            self._reap(done)
+        self._in_flight.add(self._executor.submit(firestore_metrics.carry(self._commit), ops))
+
+    def _reap(self, futures):
+        for future in futures:
+            self._in_flight.discard(future)
+            future.result()  # re-raise a commit that ran out of retries
+
+    def _commit(self, ops):
+        for attempt in range(1, self._max_attempts + 1):
+            batch = self._client.batch()
+            for kind, ref, data in ops:
+                if kind == 'delete':
+                    batch.delete(ref)
+                elif kind == 'update':
+                    batch.update(ref, data)
+                else:
+                    batch.set(ref, data[0], merge=data[1])
+            try:
+                batch.commit()
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self._max_attempts:
+                    raise
+                delay = self._base_delay * (2 ** (attempt - 1)) * (0.5 + random.random())
+                logger.warning(f"Bulk commit of {len(ops)} ops failed ({e.__class__.__name__}), "
+                               f"retry {attempt}/{self._max_attempts - 1} in {delay:.2f}s")
+                time.sleep(delay)
+
+        with self._lock:
+            self.committed += len(ops)
+            self.batches += 1
+            committed = self.committed
+        if self._progress:
+            self._progress(committed)
+
+    def flush(self):
+        """Commits everything queued so far and waits for in-flight commits."""
+        self._dispatch()
+        if self._in_flight:
+            done, _ = wait(self._in_flight)
+            self._reap(done)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return False
@@ -0,0 +1,93 @@
+"""
+utils/cache_versions.py
+
+Version markers behind the HTTP caching layer (middleware/http_cache.py).
+
+    cache_versions/{resource}                       →  {'updated_at': timestamp}
+    cache_versions/{resource}:{college}|{department} →  {'updated_at': timestamp}
+
+A marker is any document whose commit time (`update_time`) changes whenever
+the data it stands for does. Routes that change faculty, batches or sections
+queue a bump() in the same WriteBatch as the change itself, touching both the
+department marker and the platform-wide one for that resource. Rating
+aggregates need no separate marker: every write to a faculty_aggregates
+shard already moves that shard's update_time, and stats ETags cover all the
+shards of a faculty member.
+
+Markers are read with an empty field mask (metadata only), several at a time,
+and cached per process for HTTP_CACHE_VERSION_TTL seconds. Bumps made on this
+instance drop the cached copy straight away; ones made elsewhere are picked up
+when it expires.
+"""
+
+from firebase_admin import firestore
+
+from ..extensions import db, cache_version_cache
+from .cache import MISSING
+
+VERSION_FACULTY = 'faculty'
+VERSION_BATCHES = 'batches'
+VERSION_SECTIONS = 'sections'
+
+
+class CacheVersion:
+    COLLECTION = 'cache_versions'
+
+    @staticmethod
+    def ref(resource, college=None, department=None):
+        """Marker for a department's `resource`, or the platform-wide one without a college."""
+        if not college:
+            return db.collection(CacheVersion.COLLECTION).document(resource)
+        # Document ids may not contain '/'
+        key = f"{college}|{department or ''}".replace('/', '_')
+        return db.collection(CacheVersion.COLLECTION).document(f"{resource}:{key}")
+
+    @staticmethod
+    def bump(writer, resource, college=None, department=None):
+        """Queues marker writes on `writer` (a WriteBatch or Transaction)."""
+        CacheVersion.bump_departments(writer, resource, college, [department] if college else [])
+
+    @staticmethod
+    def bump_departments(writer, resource, college, departments):
+        """Like bump(), for several departments of one college at once."""
+        refs = [CacheVersion.ref(resource)]
+        refs += [CacheVersion.ref(resource, college, dept) for dept in sorted({d or '' for d in departments})]
+        for ref in refs:
+            writer.set(ref, {'updated_at': firestore.SERVER_TIMESTAMP}, merge=True)
+            CacheVersion.invalidate(ref)
+
+    @staticmethod
+    def invalidate(ref):
+        cache_version_cache.invalidate(ref.path)
+
+    @staticmethod
+    def get_many(refs):
+        """
+        Returns {ref.path: update_time or None} for every marker, reading the
+        ones not cached locally in a single metadata-only multi-get.
+        """
+        versions, missing = CacheVersion.from_cache(refs)
+        if missing:
+            CacheVersion.store(versions, db.get_all(missing, field_paths=[]))
+        return versions
+
+    @staticmethod
+    def from_cache(refs):
+        """Splits `refs` into ({path: version} known locally, [refs to read])."""
+        versions, missing = {}, []
+        for ref in refs:
+            cached = cache_version_cache.get(ref.path)
+            if cached is MISSING:
+                missing.append(ref)
+            else:
+                versions[ref.path] = cached
+        return versions, missing
+
+    @staticmethod
+    def store(versions, snapshots):
+        """Records marker snapshots (read with an empty field mask) in `versions` and the cache."""
+        for snap in snapshots:
+            version = snap.update_time if snap.exists else None
+            versions[snap.reference.path] = version
+            cache_version_cache.set(snap.reference.path, version)
+        return versions
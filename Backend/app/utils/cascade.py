@@ -0,0 +1,145 @@
+"""
+utils/cascade.py
+
+Cascade deletes and deactivations shared by the batch, feedback, dashboard
+and auth routes, built on utils/bulk.BulkWriter.
+
+Each operation first removes / deactivates the documents in bulk, then
+applies the derived-data adjustments (submission counters, faculty
+aggregates, dashboard snapshots) in a final write. If an operation dies
+part-way, the `reconcile-submission-counters`, `rebuild-faculty-aggregates`
+and `rebuild-dashboard-snapshots` commands bring the derived data back in line.
+Response wipes go through the feedback repository (repositories/), which
+does the same for the active storage backend.
+
+Routes call estimate_*() first and hand anything above BULK_JOB_THRESHOLD
+operations to the job queue (see run_or_queue()).
+"""
+
+from flask import current_app, g, jsonify
+
+from ..extensions import db, job_queue, repository
+from ..models.batch import Batch
+from ..models.faculty import Faculty
+from ..models.user import User
+from ..middleware.auth_middleware import bump_token_version
+from .batch_cache import invalidate_batch
+from .bulk import BulkWriter, BATCH_WRITE_LIMIT
+from .cache_versions import CacheVersion, VERSION_FACULTY, VERSION_BATCHES
+from .dashboard_snapshot import DashboardSnapshot
+
+
+def _writer(progress=None):
+    return BulkWriter(
+        parallelism=current_app.config.get('BULK_WRITE_PARALLELISM'),
+        max_attempts=current_app.config.get('BULK_WRITE_ATTEMPTS'),
+        progress=progress,
+    )
+
+
+def _scoped(collection, college, department=None):
+    query = db.collection(collection).where('college', '==', college)
+    if department:
+        query = query.where('department', '==', department)
+    return query
+
+
+def _count(query):
+    return query.count().get()[0][0].value
+
+
+# ── Response wipes ──────────────────────────────────────────────────────────
+
+def scope_batch_ids(college, department=None):
+    return [doc.id for doc in _scoped(Batch.COLLECTION, college, department).select([]).stream()]
+
+
+def wipe_batch_responses(batch_ids, progress=None):
+    """Deletes every submission of the given batches along with their counters."""
+    return {'deletedSubmissions': repository.wipe_batch_responses(batch_ids, progress)}
+
+
+def wipe_faculty_responses(faculty_id, progress=None):
+    """Deletes every submission that rates `faculty_id`."""
+    return {'deletedSubmissions': repository.wipe_faculty_responses(faculty_id, progress)}
+
+
+# ── Deactivations ───────────────────────────────────────────────────────────
+
+def estimate_deactivation(college, department=None):
+    return _count(_scoped(Faculty.COLLECTION, college, department)) + \
+        _count(_scoped(Batch.COLLECTION, college, department))
+
+
+def deactivate_scope(college, department=None, include_hods=False, progress=None):
+    """
+    Soft-deletes the faculty and batches of a college / department and, for
+    a whole college, its HoD accounts (whose tokens are revoked).
+    """
+    hod_ids, faculty_ids, batch_ids, closed_ids = [], [], [], []
+    faculty_depts, batch_depts = set(), set()
+    with _writer(progress) as writer:
+        for doc in _scoped(Faculty.COLLECTION, college, department).select(['department']).stream():
+            writer.update(doc.reference, {'is_active': False})
+            faculty_ids.append(doc.id)
+            faculty_depts.add(doc.to_dict().get('department'))
+        for doc in _scoped(Batch.COLLECTION, college, department).select(['department', 'is_active']).stream():
+            writer.update(doc.reference, {'is_active': False})
+            batch_ids.append(doc.id)
+            batch_depts.add(doc.to_dict().get('department'))
+            if doc.to_dict().get('is_active'):
+                closed_ids.append(doc.id)
+        if include_hods:
+            hods = db.collection(User.COLLECTION).where('college', '==', college).where('role', '==', 'hod')
+            for doc in hods.select(['user_id']).stream():
+                writer.update(doc.reference, {'is_active': False})
+                hod_ids.append(doc.to_dict().get('user_id'))
+    invalidate_batch()
+    repository.close_batches(college, closed_ids)
+    for user_id in hod_ids:
+        bump_token_version(user_id)
+
+    for chunk_start in range(0, max(len(faculty_ids), len(batch_ids)), BATCH_WRITE_LIMIT):
+        batch = db.batch()
+        DashboardSnapshot.remove(batch, college,
+                                 faculty_ids[chunk_start:chunk_start + BATCH_WRITE_LIMIT],
+                                 batch_ids[chunk_start:chunk_start + BATCH_WRITE_LIMIT])
+        batch.commit()
+
+    # Departments in one college number in the tens, well under the batch limit
+    batch = db.batch()
+    if faculty_ids:
+        CacheVersion.bump_departments(batch, VERSION_FACULTY, college, faculty_depts)
+    if batch_ids:
+        CacheVersion.bump_departments(batch, VERSION_BATCHES, college, batch_depts)
+    if len(batch):
+        batch.commit()
+    return {'faculty': len(faculty_ids), 'batches': len(batch_ids), 'hods': len(hod_ids)}
+
+
+# ── Job entry points: fn(params, progress) for run_or_queue / job_queue ────
+
+def wipe_batch_responses_job(params, progress):
+    return wipe_batch_responses(params['batchIds'], progress)
+
+
+def wipe_faculty_responses_job(params, progress):
+    return wipe_faculty_responses(params['facultyId'], progress)
+
+
+def deactivate_scope_job(params, progress):
+    return deactivate_scope(params['college'], params.get('department'), params.get('includeHods', False), progress)
+
+
+# ── Sync vs. background ─────────────────────────────────────────────────────
+
+def run_or_queue(kind, estimated_ops, fn, params):
+    """
+    Runs fn(params, progress) inline and returns its result as JSON, or, when
+    the estimate exceeds BULK_JOB_THRESHOLD, queues it on the job queue and
+    returns 202 with the job (poll GET /api/jobs/<id>).
+    """
+    if estimated_ops > current_app.config.get('BULK_JOB_THRESHOLD'):
+        job = job_queue.submit(kind, fn, g.current_user.get('user_id'), params)
+        return jsonify({"success": True, "queued": True, "jobId": job['id'], "estimatedOperations": estimated_ops}), 202
+    return jsonify({"success": True, **(fn(params, None) or {})}), 200
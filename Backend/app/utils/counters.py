@@ -0,0 +1,72 @@
+"""
+utils/counters.py
+
+Sharded per-batch submission counters.
+
+    submission_counters/{batch_id}/shards/{0..NUM_SHARDS-1}  →  {'count': int}
+
+A submission increments one random shard in the same write as the
+submission document, so concurrent students rarely contend on the same
+counter document. Reading a count is a single multi-get of NUM_SHARDS
+documents, independent of how many responses the batch has.
+
+Counters are derived data: `flask --app run reconcile-submission-counters`
+rebuilds them from feedback_submissions.
+"""
+
+import random
+from firebase_admin import firestore
+from ..extensions import db
+
+
+class SubmissionCounter:
+    COLLECTION = 'submission_counters'
+    SHARD_COLLECTION = 'shards'
+    NUM_SHARDS = 5
+
+    @staticmethod
+    def shard_refs(batch_id):
+        parent = db.collection(SubmissionCounter.COLLECTION).document(batch_id)
+        return [
+            parent.collection(SubmissionCounter.SHARD_COLLECTION).document(str(i))
+            for i in range(SubmissionCounter.NUM_SHARDS)
+        ]
+
+    @staticmethod
+    def increment(writer, batch_id, amount=1):
+        """Queues a shard increment on `writer` (a WriteBatch or Transaction)."""
+        ref = random.choice(SubmissionCounter.shard_refs(batch_id))
+        writer.set(ref, {'count': firestore.Increment(amount)}, merge=True)
+
+    @staticmethod
+    def reset(writer, batch_id, value=0):
+        """Queues writes that set the counter to exactly `value`."""
+        for i, ref in enumerate(SubmissionCounter.shard_refs(batch_id)):
+            writer.set(ref, {'count': value if i == 0 else 0})
+
+    @staticmethod
+    def delete(writer, batch_id):
+        for ref in SubmissionCounter.shard_refs(batch_id):
+            writer.delete(ref)
+
+    @staticmethod
+    def get_counts(batch_ids, transaction=None):
+        """Returns {batch_id: count} for every id, read in one multi-get."""
+        counts = {batch_id: 0 for batch_id in batch_ids}
+        refs = [ref for batch_id in counts for ref in SubmissionCounter.shard_refs(batch_id)]
+        if not refs:
+            return counts
+        return SubmissionCounter.tally(counts, db.get_all(refs, transaction=transaction))
+
+    @staticmethod
+    def tally(counts, shard_snapshots):
+        """Adds shard snapshots (from a multi-get of shard_refs) into {batch_id: count}."""
+        for snap in shard_snapshots:
+            if snap.exists:
+                batch_id = snap.reference.parent.parent.id
+                counts[batch_id] += (snap.to_dict() or {}).get('count', 0)
+        return counts
+
+    @staticmethod
+    def get_count(batch_id, transaction=None):
+        return SubmissionCounter.get_counts([batch_id], transaction=transaction)[batch_id]
@@ -0,0 +1,207 @@
+"""
+utils/dashboard_snapshot.py
+
+Materialized admin dashboard, one document per college plus a global one.
+
+    dashboard_snapshots/{scope}  →  {
+        'faculty':  {faculty_id: <Faculty.to_dict()>},   # active faculty
+        'batches':  {batch_id: True},                     # active batches
+        'built_at': timestamp,    # set by the rebuild command
+        'updated_at': timestamp,
+    }
+
+scope is 'global' or 'college:<name>'. Faculty and batch routes patch the
+snapshots with merge writes as they change things. Submission totals come
+from the feedback repository (repositories/): with Firestore storage, a
+sharded counter per college under the same scope key (see utils/counters.py)
+and a count() aggregation for the global one. Like the live dashboard, a
+college's total only covers its active batches; deactivating batches
+subtracts theirs (repository.close_batches).
+
+A snapshot without built_at has not been initialised yet, and
+GET /api/dashboard/admin falls back to live queries until
+`flask --app run rebuild-dashboard-snapshots` has run. Each snapshot holds
+every active faculty member of its scope, so the global one stays well
+under the 1 MiB document limit only up to a few thousand faculty.
+
+Assembled payloads are cached per process (DASHBOARD_CACHE_TTL) together
+with their ETag, so a matching If-None-Match is answered without reading
+Firestore. Local writes drop the cached copy immediately.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+
+from ..extensions import db, dashboard_cache, repository
+from ..models.batch import Batch
+from ..models.faculty import Faculty
+from ..models.feedback import FeedbackSubmission
+from .cache import MISSING
+from .counters import SubmissionCounter
+
+GLOBAL_SCOPE = 'global'
+
+
+class DashboardSnapshot:
+    COLLECTION = 'dashboard_snapshots'
+
+    @staticmethod
+    def scope(college=None):
+        # Document ids may not contain '/'
+        return f"college:{college.replace('/', '_')}" if college else GLOBAL_SCOPE
+
+    @staticmethod
+    def _write(writer, college, fields):
+        """Merges `fields` into the college snapshot and the global one."""
+        for scope in {DashboardSnapshot.scope(college), GLOBAL_SCOPE}:
+            ref = db.collection(DashboardSnapshot.COLLECTION).document(scope)
+            writer.set(ref, {**fields, 'updated_at': firestore.SERVER_TIMESTAMP}, merge=True)
+            dashboard_cache.invalidate(scope)
+
+    # ── incremental updates (queued on a WriteBatch / Transaction) ──────────
+
+    @staticmethod
+    def put_faculty(writer, faculty_id, data):
+        DashboardSnapshot._write(writer, data.get('college'), {'faculty': {faculty_id: Faculty.to_dict(faculty_id, data)}})
+
+    @staticmethod
+    def put_batch(writer, batch_id, college):
+        DashboardSnapshot._write(writer, college, {'batches': {batch_id: True}})
+
+    @staticmethod
+    def remove(writer, college, faculty_ids=(), batch_ids=()):
+        fields = {}
+        if faculty_ids:
+            fields['faculty'] = {fid: firestore.DELETE_FIELD for fid in faculty_ids}
+        if batch_ids:
+            fields['batches'] = {bid: firestore.DELETE_FIELD for bid in batch_ids}
+        if fields:
+            DashboardSnapshot._write(writer, college, fields)
+
+    @staticmethod
+    def count_submissions(writer, college, amount=1):
+        if college:
+            SubmissionCounter.increment(writer, DashboardSnapshot.scope(college), amount)
+        DashboardSnapshot.forget([college])
+
+    @staticmethod
+    def forget(colleges):
+        """Drops this process's cached payloads of the colleges and the global one."""
+        for college in colleges:
+            if college:
+                dashboard_cache.invalidate(DashboardSnapshot.scope(college))
+        dashboard_cache.invalidate(GLOBAL_SCOPE)
+
+    # ── reading ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def is_built(data):
+        return bool(data and data.get('built_at'))
+
+    @staticmethod
+    def _build_payload(college):
+        scope = DashboardSnapshot.scope(college)
+        doc = db.collection(DashboardSnapshot.COLLECTION).document(scope).get()
+        data = doc.to_dict() if doc.exists else None
+        if not DashboardSnapshot.is_built(data):
+            return None
+
+        return DashboardSnapshot.payload(data, repository.count_submissions(college))
+
+    @staticmethod
+    def payload(data, submissions):
+        """Formats a snapshot document plus its submission total as the dashboard response."""
+        faculty = data.get('faculty') or {}
+        faculty_by_dept = {}
+        for fid in sorted(faculty):
+            f = faculty[fid]
+            faculty_by_dept.setdefault(f"{f.get('college', '')}_{f.get('dept', '')}", []).append(f)
+
+        return {
+            "totalFaculty": len(faculty),
+            "totalBatches": len(data.get('batches') or {}),
+            "totalSubmissions": submissions,
+            "masterFacultyList": faculty_by_dept,
+            "nextCursor": None,
+        }
+
+    @staticmethod
+    def get(college=None):
+        """
+        Returns (etag, payload) for the scope, from the per-process cache when
+        possible, or None if the snapshot has not been built yet.
+        """
+        cached = DashboardSnapshot.cached(college)
+        if cached is not MISSING:
+            return cached
+        payload = DashboardSnapshot._build_payload(college)
+        if payload is None:
+            return None
+        return DashboardSnapshot.remember(college, payload)
+
+    @staticmethod
+    def cached(college=None):
+        """(etag, payload) from this process's cache, or MISSING."""
+        return dashboard_cache.get(DashboardSnapshot.scope(college))
+
+    @staticmethod
+    def remember(college, payload):
+        """Caches an assembled payload with its ETag and returns (etag, payload)."""
+        body = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        cached = (hashlib.sha1(body).hexdigest(), payload)
+        dashboard_cache.set(DashboardSnapshot.scope(college), cached)
+        return cached
+
+    # ── full rebuild ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def rebuild():
+        """
+        Recomputes every snapshot and per-college submission counter from the
+        source collections. Returns the number of scopes written.
+        """
+        snapshots = {GLOBAL_SCOPE: {'faculty': {}, 'batches': {}}}
+
+        def scoped(college):
+            return [snapshots[GLOBAL_SCOPE], snapshots.setdefault(
+                DashboardSnapshot.scope(college), {'faculty': {}, 'batches': {}})]
+
+        for doc in db.collection(Faculty.COLLECTION).where('is_active', '==', True).stream():
+            data = doc.to_dict()
+            for snap in scoped(data.get('college')):
+                snap['faculty'][doc.id] = Faculty.to_dict(doc.id, data)
+
+        batches_by_college = {}
+        for doc in db.collection(Batch.COLLECTION).select(['college', 'is_active']).stream():
+            data = doc.to_dict()
+            batches_by_college.setdefault(data.get('college'), [])
+            if data.get('is_active'):
+                batches_by_college[data.get('college')].append(doc.id)
+                for snap in scoped(data.get('college')):
+                    snap['batches'][doc.id] = True
+
+        # Scopes that exist in Firestore but no longer have any data are emptied
+        for ref in db.collection(DashboardSnapshot.COLLECTION).list_documents():
+            snapshots.setdefault(ref.id, {'faculty': {}, 'batches': {}})
+
+        now = datetime.now(timezone.utc)
+        for scope, snap in snapshots.items():
+            db.collection(DashboardSnapshot.COLLECTION).document(scope).set(
+                {**snap, 'built_at': now, 'updated_at': now})
+            dashboard_cache.invalidate(scope)
+
+        for college, batch_ids in batches_by_college.items():
+            if not college:
+                continue
+            total = 0
+            for i in range(0, len(batch_ids), 30):
+                query = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', 'in', batch_ids[i:i + 30])
+                total += query.count().get()[0][0].value
+            writer = db.batch()
+            SubmissionCounter.reset(writer, DashboardSnapshot.scope(college), total)
+            writer.commit()
+
+        return len(snapshots)
@@ -0,0 +1,319 @@
+"""
+utils/firestore_metrics.py
+
+Firestore operation accounting, per request and per endpoint.
+
+instrument() wraps the RPC methods of a client's generated API layer, which
+every document get, multi-get, query, aggregation and commit goes through
+(transactions and batches included), so no model or route code changes.
+Each RPC is recorded against the request being served (a RequestCost held in
+a context variable) and in this process's totals, which /api/metrics serves
+in Prometheus text format.
+
+Counts follow Firestore billing: a document lookup is one read whether or
+not the document exists, a query is max(1, documents returned) reads, each
+write in a commit is a write or a delete, and aggregation queries are
+counted on their own (each is billed at least one read). For streamed
+results the latency histogram has the time to the first response, while a
+request's RPC time runs to the last response it read.
+
+Every worker process keeps its own totals.
+"""
+
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+OPS = ('reads', 'writes', 'deletes', 'aggregations')
+
+# Upper bounds (seconds) of the RPC latency histogram buckets
+RPC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Ops made outside any request (background jobs, CLI commands)
+BACKGROUND = 'background'
+
+# GAPIC method → RPC name, and whether it returns a stream of responses
+_RPCS = {
+    'batch_get_documents': ('BatchGetDocuments', True),
+    'run_query': ('RunQuery', True),
+    'run_aggregation_query': ('RunAggregationQuery', True),
+    'commit': ('Commit', False),
+    'batch_write': ('BatchWrite', False),
+    'begin_transaction': ('BeginTransaction', False),
+    'rollback': ('Rollback', False),
+    'list_documents': ('ListDocuments', False),
+}
+
+_current = contextvars.ContextVar('firestore_request_cost', default=None)
+
+
+class RequestCost:
+    """Firestore ops and RPC time accumulated by one request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ops = Counter()
+        self.rpcs = 0
+        self.rpc_seconds = 0.0
+
+    def add(self, rpcs=0, seconds=0.0, **ops):
+        with self._lock:
+            self.ops.update(ops)
+            self.rpcs += rpcs
+            self.rpc_seconds += seconds
+
+    def to_dict(self):
+        with self._lock:
+            return {**{op: self.ops[op] for op in OPS},
+                    'rpcs': self.rpcs, 'rpcMs': round(self.rpc_seconds * 1000, 1)}
+
+    def server_timing(self, total_seconds):
+        """Server-Timing header value: total time, Firestore RPC time, op counts."""
+        cost = self.to_dict()
+        metrics = [f"app;dur={total_seconds * 1000:.1f}",
+                   f'firestore;dur={cost["rpcMs"]};desc="{cost["rpcs"]} RPCs"']
+        metrics += [f'fs-{op};desc="{cost[op]}"' for op in OPS]
+        return ', '.join(metrics)
+
+
+def _response_ops(rpc, response):
+    pb = getattr(response, '_pb', response)
+    if rpc == 'BatchGetDocuments':
+        return {'reads': 1} if pb.WhichOneof('result') else {}  # found or missing
+    if rpc == 'RunQuery':
+        return {'reads': 1} if pb.HasField('document') else {}
+    return {'aggregations': 1} if pb.HasField('result') else {}
+
+
+def _unary_ops(rpc, kwargs):
+    if rpc not in ('Commit', 'BatchWrite'):
+        return {}
+    request = kwargs.get('request', {})
+    writes = request.get('writes', []) if isinstance(request, dict) else getattr(request, 'writes', [])
+    deletes = sum(1 for w in writes if getattr(w, '_pb', w).WhichOneof('operation') == 'delete')
+    return {'writes': len(writes) - deletes, 'deletes': deletes}
+
+
+class _StreamTally:
+    """
+    Records a streamed RPC response by response, so a stream the caller stops
+    reading early (a single-document get returns after the first) is counted
+    at once rather than whenever the generator is collected.
+    """
+
+    def __init__(self, metrics, rpc, started):
+        self.metrics = metrics
+        self.rpc = rpc
+        self.mark = started
+        self.responses = 0
+        self.reads = 0
+
+    def response(self, response):
+        now = time.perf_counter()
+        ops = _response_ops(self.rpc, response)
+        self.reads += ops.get('reads', 0)
+        # The first response counts the RPC; later ones only add their time
+        self.metrics.record(None if self.responses else self.rpc, now - self.mark, **ops)
+        self.responses += 1
+        self.mark = now
+
+    def close(self):
+        empty_query = {'reads': 1} if self.rpc == 'RunQuery' and not self.reads else {}
+        if not self.responses:
+            self.metrics.record(self.rpc, time.perf_counter() - self.mark, **empty_query)
+        elif empty_query:
+            self.metrics.record(**empty_query)
+
+
+class FirestoreMetrics:
+    """Per-request cost tracking plus per-endpoint and per-RPC totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = Counter()                 # (endpoint, status) → count
+        self._request_seconds = Counter()          # endpoint → seconds
+        self._ops = defaultdict(Counter)           # endpoint → op → count
+        self._rpcs = Counter()                     # endpoint → RPCs
+        self._rpc_seconds = Counter()              # endpoint → seconds in RPCs
+        self._rpc_histogram = {}                   # rpc → [bucket counts..., +Inf, sum]
+
+    # ── per request ─────────────────────────────────────────────────────────
+
+    def begin_request(self):
+        """Starts a RequestCost for this context; pass the token to end_request()."""
+        return _current.set(RequestCost())
+
+    def end_request(self, token):
+        _current.reset(token)
+
+    @staticmethod
+    def current():
+        """The RequestCost of the request being served, or None."""
+        return _current.get()
+
+    @staticmethod
+    def carry(fn):
+        """
+        Wraps `fn` so the Firestore ops it makes on a pool thread are counted
+        against the request that submitted it.
+        """
+        cost = _current.get()
+
+        @wraps(fn)
+        def run(*args, **kwargs):
+            token = _current.set(cost)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+        return run
+
+    def observe_request(self, endpoint, status, cost, seconds):
+        with self._lock:
+            self._requests[(endpoint, status)] += 1
+            self._request_seconds[endpoint] += seconds
+            if cost is not None:
+                with cost._lock:
+                    self._ops[endpoint].update(cost.ops)
+                    self._rpcs[endpoint] += cost.rpcs
+                    self._rpc_seconds[endpoint] += cost.rpc_seconds
+
+    # ── per RPC ─────────────────────────────────────────────────────────────
+
+    def record(self, rpc=None, seconds=0.0, **ops):
+        """
+        Counts `ops` (reads=, writes=, ...) and, if `rpc` is given, one call of
+        that RPC taking `seconds`, against the current request or BACKGROUND.
+        """
+        cost = _current.get()
+        rpcs = 1 if rpc else 0
+        if cost is not None:
+            cost.add(rpcs, seconds, **ops)
+        with self._lock:
+            if cost is None:
+                self._ops[BACKGROUND].update(ops)
+                self._rpcs[BACKGROUND] += rpcs
+                self._rpc_seconds[BACKGROUND] += seconds
+            if rpc:
+                histogram = self._rpc_histogram.setdefault(rpc, [0] * (len(RPC_BUCKETS) + 2))
+                for i, bound in enumerate(RPC_BUCKETS):
+                    if seconds <= bound:
+                        histogram[i] += 1
+                histogram[-2] += 1
+                histogram[-1] += seconds
+
+    def instrument(self, client):
+        """
+        Wraps the RPC methods of `client` (a google.cloud.firestore Client or
+        AsyncClient) in place and returns it. Clients without a generated API
+        layer (test doubles) are returned untouched.
+        """
+        api = getattr(client, '_firestore_api', None)
+        if api is None:
+            return client
+        from google.cloud.firestore_v1.async_client import AsyncClient
+        wrap = self._wrap_async if isinstance(client, AsyncClient) else self._wrap
+        for method, (rpc, streaming) in _RPCS.items():
+            if hasattr(api, method):
+                setattr(api, method, wrap(getattr(api, method), rpc, streaming))
+        return client
+
+    def _finish(self, rpc, started, ops):
+        self.record(rpc, time.perf_counter() - started, **ops)
+
+    def _wrap(self, call, rpc, streaming):
+        def counted(stream, started):
+            tally = _StreamTally(self, rpc, started)
+            try:
+                for response in stream:
+                    tally.response(response)
+                    yield response
+            finally:
+                tally.close()
+
+        @wraps(call)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = call(*args, **kwargs)
+            except Exception:
+                self._finish(rpc, started, {})
+                raise
+            if streaming:
+                return counted(result, started)
+            self._finish(rpc, started, _unary_ops(rpc, kwargs))
+            return result
+        return wrapper
+
+    def _wrap_async(self, call, rpc, streaming):
+        async def counted(stream, started):
+            tally = _StreamTally(self, rpc, started)
+            try:
+                async for response in stream:
+                    tally.response(response)
+                    yield response
+            finally:
+                tally.close()
+
+        @wraps(call)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await call(*args, **kwargs)
+            except Exception:
+                self._finish(rpc, started, {})
+                raise
+            if streaming:
+                return counted(result, started)
+            self._finish(rpc, started, _unary_ops(rpc, kwargs))
+            return result
+        return wrapper
+
+    # ── exposition ──────────────────────────────────────────────────────────
+
+    def prometheus(self):
+        """All totals in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            request_seconds = sorted(self._request_seconds.items())
+            ops = sorted((endpoint, op, counts[op]) for endpoint, counts in self._ops.items() for op in OPS)
+            rpcs = sorted(self._rpcs.items())
+            rpc_seconds = sorted(self._rpc_seconds.items())
+            histograms = sorted((rpc, list(values)) for rpc, values in self._rpc_histogram.items())
+
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"{name}{suffix}{{{rendered}}} {value:g}" if rendered else f"{name}{suffix} {value:g}")
+
+        family('fds_http_requests_total', 'counter', 'Requests served, by endpoint and status.',
+               [('', [('endpoint', e), ('status', str(s))], n) for (e, s), n in requests])
+        family('fds_http_request_seconds_total', 'counter', 'Time spent serving requests, by endpoint.',
+               [('', [('endpoint', e)], s) for e, s in request_seconds])
+        family('fds_firestore_operations_total', 'counter',
+               'Firestore document reads, writes, deletes and aggregation queries, by endpoint.',
+               [('', [('endpoint', e), ('op', op)], n) for e, op, n in ops])
+        family('fds_firestore_rpcs_total', 'counter', 'Firestore RPCs, by endpoint.',
+               [('', [('endpoint', e)], n) for e, n in rpcs])
+        family('fds_firestore_rpc_seconds_total', 'counter', 'Time spent in Firestore RPCs, by endpoint.',
+               [('', [('endpoint', e)], s) for e, s in rpc_seconds])
+
+        samples = []
+        for rpc, values in histograms:
+            for bound, count in zip(RPC_BUCKETS, values):
+                samples.append(('_bucket', [('rpc', rpc), ('le', f'{bound:g}')], count))
+            samples.append(('_bucket', [('rpc', rpc), ('le', '+Inf')], values[-2]))
+            samples.append(('_sum', [('rpc', rpc)], values[-1]))
+            samples.append(('_count', [('rpc', rpc)], values[-2]))
+        family('fds_firestore_rpc_duration_seconds', 'histogram', 'Firestore RPC latency, by RPC.', samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,136 @@
+"""
+utils/jobs.py
+
+In-process background job queue with a local file store.
+
+Each job is a JSON metadata file plus (when finished) one artifact file in
+JOB_DIR. Because state lives on disk rather than in a worker's memory, any
+gunicorn worker on the same host can answer a status poll or serve the
+download. Jobs run on a small thread pool; they are not resumed after a
+restart, and finished jobs are purged after JOB_TTL seconds.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class JobQueue:
+    def __init__(self, workers=2, ttl=3600, directory=None):
+        self.workers = workers
+        self.ttl = ttl
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'rise-fds-jobs')
+        self._app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.workers = app.config.get('JOB_WORKERS', self.workers)
+        self.ttl = app.config.get('JOB_TTL', self.ttl)
+        self.directory = app.config.get('JOB_DIR') or self.directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge_expired()
+
+    def _pool(self):
+        # Threads don't survive a fork; gunicorn workers each build their own pool.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _save(self, job):
+        tmp = self._meta_path(job['id']) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp, self._meta_path(job['id']))
+
+    def _update(self, job, **fields):
+        # Progress may be reported from several threads of one job
+        with self._lock:
+            job.update(fields, updated_at=time.time())
+            self._save(job)
+
+    def submit(self, kind, fn, owner, params):
+        """
+        Queues fn(params, progress) and returns the job dict. fn returns
+        either (filename, mimetype, bytes), stored as the job's artifact, or
+        a JSON-serializable summary stored as job['result'].
+        progress(done, total=None) may be called along the way.
+        """
+        self.purge_expired()
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'owner': owner,
+            'params': params,
+            'status': 'queued',
+            'progress': {'done': 0, 'total': None},
+            'error': None,
+            'result': None,
+            'filename': None,
+            'mimetype': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._save(job)
+        self._pool().submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        def progress(done, total=None):
+            self._update(job, progress={'done': done, 'total': total})
+
+        with self._app.app_context():
+            self._update(job, status='running')
+            try:
+                result = fn(job['params'], progress)
+                if isinstance(result, tuple):
+                    filename, mimetype, content = result
+                    with open(self.artifact_path(job), 'wb') as f:
+                        f.write(content)
+                    self._update(job, status='done', filename=filename, mimetype=mimetype)
+                else:
+                    self._update(job, status='done', result=result)
+                logger.info(f"Job {job['id']} ({job['kind']}) finished")
+            except Exception as e:
+                logger.exception(f"Job {job['id']} ({job['kind']}) failed")
+                self._update(job, status='failed', error=str(e))
+
+    def get(self, job_id):
+        """Returns the job dict, or None for unknown / expired / malformed ids."""
+        if not _JOB_ID.fullmatch(job_id or ''):
+            return None
+        try:
+            with open(self._meta_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def artifact_path(self, job):
+        return os.path.join(self.directory, f"{job['id']}.artifact")
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,103 @@
+"""
+utils/pagination.py
+
+Cursor pagination, ordering and field projection for list endpoints.
+
+Query parameters (all optional):
+    limit       page size (1..PAGE_MAX_LIMIT). Omit to get the whole list.
+    startAfter  id of the last document on the previous page (the nextCursor
+                of the previous response).
+    orderBy     API field to sort by, e.g. "name"; defaults to document id.
+                Sorting on a field combined with filters may need a composite
+                index, and documents missing the field are skipped by Firestore.
+    order       "asc" (default) or "desc".
+    select      comma-separated API fields to return, e.g. "name,subject".
+                "id" is always included.
+
+Each model exposes FIELDS, mapping its API keys to the Firestore field they
+are read from, which is used to translate orderBy / select.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from google.cloud.firestore_v1 import Query
+from google.cloud.firestore_v1.field_path import FieldPath
+
+
+class PaginationError(ValueError):
+    """Bad pagination parameters; routes turn it into a 400."""
+
+
+@dataclass
+class Page:
+    limit: Optional[int] = None
+    start_after: Optional[str] = None
+    order_by: Optional[str] = None
+    descending: bool = False
+    fields: Optional[list] = None       # API keys to return (None → all)
+    projection: Optional[list] = None   # Firestore fields to read for them
+
+
+def parse_page(args, model_fields, max_limit):
+    """Validates the pagination query parameters against a model's FIELDS."""
+    page = Page()
+
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            page.limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if not 1 <= page.limit <= max_limit:
+            raise PaginationError(f"limit must be between 1 and {max_limit}")
+
+    page.start_after = args.get('startAfter') or None
+
+    order_by = args.get('orderBy')
+    if order_by and order_by != 'id':
+        if not model_fields.get(order_by):
+            raise PaginationError(f"Cannot order by '{order_by}'")
+        page.order_by = model_fields[order_by]
+
+    order = args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise PaginationError("order must be 'asc' or 'desc'")
+    page.descending = order == 'desc'
+
+    select = args.get('select')
+    if select:
+        fields = [f.strip() for f in select.split(',') if f.strip()]
+        unknown = [f for f in fields if f != 'id' and f not in model_fields]
+        if unknown:
+            raise PaginationError(f"Unknown field(s) in select: {', '.join(unknown)}")
+        page.fields = fields
+        page.projection = sorted({model_fields[f] for f in fields if model_fields.get(f)})
+    return page
+
+
+def fetch_page(query, collection, page):
+    """
+    Runs `query` for one page. Returns (snapshots, next_cursor); next_cursor
+    is None on the last page or when no limit was requested.
+    """
+    direction = Query.DESCENDING if page.descending else Query.ASCENDING
+    if page.order_by:
+        query = query.order_by(page.order_by, direction=direction)
+    if page.order_by or page.limit or page.descending:
+        query = query.order_by(FieldPath.document_id(), direction=direction)
+    if page.projection is not None:
+        query = query.select(page.projection)
+
+    if page.start_after:
+        cursor = collection.document(page.start_after).get()
+        if not cursor.exists:
+            raise PaginationError("Invalid startAfter cursor")
+        query = query.start_after(cursor)
+
+    if page.limit is None:
+        return list(query.stream()), None
+
+    docs = list(query.limit(page.limit).stream())
+    next_cursor = docs[-1].id if len(docs) == page.limit else None
+    return docs, next_cursor
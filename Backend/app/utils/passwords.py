@@ -0,0 +1,115 @@
+"""
+utils/passwords.py
+
+bcrypt hashing and verification, run in a process pool.
+
+With PASSWORD_POOL_WORKERS > 0 every hash/check is sent to a process pool
+owned by the gunicorn worker; the request thread waits for the result, but
+the CPU work happens outside the worker process. At most
+PASSWORD_POOL_MAX_PENDING jobs may be queued or running, which by default
+leaves one of the worker's REQUEST_THREADS free for everything else. Beyond
+that, and when a job does not finish within PASSWORD_POOL_TIMEOUT seconds,
+PasswordPoolBusy is raised and create_app() turns it into a 503 with
+Retry-After. A job that timed out keeps its slot until the child is done
+with it, so abandoned hashes still count against the limit.
+
+The pool is started on the first hash/check, so CLI commands that never
+touch a password do not start it. Children are spawned rather than forked,
+since by then the worker already has Firestore's gRPC channels and threads.
+Only `bcrypt` functions are shipped to them; they re-import the __main__
+script, which run.py guards against.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """The password worker pool is saturated; the client should retry."""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.rounds = 12
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = 10
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rounds = int(app.config.get('BCRYPT_ROUNDS', self.rounds))
+        self.workers = int(app.config.get('PASSWORD_POOL_WORKERS', 0))
+        self.max_pending = int(app.config.get('PASSWORD_POOL_MAX_PENDING') or
+                               max(int(app.config.get('REQUEST_THREADS', 2)) - 1, 1))
+        self.timeout = float(app.config.get('PASSWORD_POOL_TIMEOUT', self.timeout))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._shutdown()
+
+    def _shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            # A pool inherited through fork() belongs to the parent; start our own.
+            if self._executor is None or self._executor_pid != os.getpid():
+                # No more than max_pending jobs ever run at once
+                self._executor = ProcessPoolExecutor(
+                    max_workers=min(self.workers, self.max_pending),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordPoolBusy()
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except Exception:
+                slots.release()
+                raise
+            # The slot is freed when the child is done, not when this thread stops waiting
+            future.add_done_callback(lambda _: slots.release())
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise PasswordPoolBusy()
+        except BrokenProcessPool:
+            logger.error("Password worker pool crashed; restarting it")
+            self._shutdown()
+            raise PasswordPoolBusy()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, hashed_password):
+        if not hashed_password:
+            return False
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password):
+        """True when the stored hash was made with a different BCRYPT_ROUNDS cost."""
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
@@ -0,0 +1,87 @@
+"""
+utils/rating_schema.py
+
+Versioned feedback form schema and the compact ratings encoding.
+
+Each form version is the ordered list of parameters the student form asks
+about (Frontend/src/components/StudentFeedback/StudentFeedback.jsx). A
+submission stores the version it was encoded with and, per faculty member,
+one byte per parameter in that order (0 for a parameter left unrated):
+
+    {'form_version': 1, 'ratings': {'<faculty_id>': b'\\x09\\x08...'}}
+
+instead of repeating every parameter name for every faculty member:
+
+    {'ratings': {'<faculty_id>': {'Knowledge of the subject': 9, ...}}}
+
+Ratings whose parameters are not all in the current form stay in the map
+form, which is also how submissions written before form_version existed
+look. decode_ratings() reads all of them.
+
+Changing the form means appending a new version here and pointing
+CURRENT_FORM_VERSION at it; never edit a version submissions were stored
+with.
+"""
+
+FORM_VERSIONS = {
+    1: (
+        'Knowledge of the subject',
+        'Coming well prepared for the class',
+        'Giving clear explanations',
+        'Command of language',
+        'Clear and audible voice',
+        'Holding the attention of students through the class',
+        'Providing more matter than in the textbooks',
+        'Capability to clear the doubts of students',
+        'Encouraging students to ask questions and participate',
+        'Appreciating students as and when deserving',
+        'Willingness to help students even out of the class',
+        'Return of valued test papers/records in time',
+        'Punctuality and following timetable schedule',
+        'Coverage of syllabus',
+        'Impartial (teaching all students alike)',
+    ),
+}
+
+CURRENT_FORM_VERSION = 1
+
+_POSITIONS = {
+    version: {param: i for i, param in enumerate(params)}
+    for version, params in FORM_VERSIONS.items()
+}
+
+
+def _pack(ratings, positions):
+    """One byte per form parameter, or None if `ratings` does not fit the form."""
+    packed = bytearray(len(positions))
+    for param, rating in ratings.items():
+        i = positions.get(param)
+        if i is None or not isinstance(rating, int) or not 1 <= rating <= 255:
+            return None
+        packed[i] = rating
+    return bytes(packed)
+
+
+def encode_ratings(ratings_map, version=CURRENT_FORM_VERSION):
+    """{faculty_id: {parameter: rating}} → (version, stored ratings map)."""
+    positions = _POSITIONS[version]
+    encoded = {}
+    for faculty_id, ratings in ratings_map.items():
+        packed = _pack(ratings, positions) if ratings else None
+        encoded[faculty_id] = ratings if packed is None else packed
+    return version, encoded
+
+
+def decode_faculty_ratings(stored, version):
+    """One faculty member's stored ratings → {parameter: rating}."""
+    if not isinstance(stored, bytes):
+        return stored or {}
+    if version not in FORM_VERSIONS:
+        raise ValueError(f"Unknown feedback form version {version!r}")
+    return {param: rating for param, rating in zip(FORM_VERSIONS[version], stored) if rating}
+
+
+def decode_ratings(stored_map, version):
+    """A submission's stored ratings map → {faculty_id: {parameter: rating}}."""
+    return {faculty_id: decode_faculty_ratings(stored, version)
+            for faculty_id, stored in (stored_map or {}).items()}
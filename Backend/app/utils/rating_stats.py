@@ -0,0 +1,302 @@
+"""
+utils/rating_stats.py
+
+Rating statistics for many faculty members at once, computed with NumPy.
+
+RatingStats keeps, for faculty × slots × parameters, the rating count, sum,
+sum of squares and 1–10 histogram as arrays. It is filled either from
+faculty_aggregates documents (from_aggregates: the stats endpoints) or from
+a scan of feedback_submissions (add_submission: report bundles). A scan is
+loaded into a dense (submissions × faculty × parameters) block, NaN where a
+faculty member or parameter was not rated, and each full block is reduced
+with array operations; compact ratings (utils/rating_schema.py) are copied
+straight from their bytes.
+
+stats() then derives mean, standard deviation, median, percentiles and
+histograms for every faculty member, slot and parameter in one go and
+formats them as the payload FacultyAggregate.to_stats always returned, with
+`median`, `percentiles` and `histogram` added per parameter. Percentiles
+are nearest-rank over the 1–10 ratings, so they are always a whole rating;
+ratings outside the scale count towards the mean but not the histogram.
+"""
+
+import numpy as np
+
+from .rating_schema import FORM_VERSIONS, CURRENT_FORM_VERSION
+
+RATING_SCALE = np.arange(1, 11)
+
+PERCENTILES = (25, 50, 75, 90)
+
+# Histogram bin of each key of an aggregate's 'histogram' map
+_BINS = {str(r): i for i, r in enumerate(RATING_SCALE)}
+
+# Submissions per dense block; a block holds block × faculty × parameters
+# float32s, so this bounds memory for college-wide scans.
+SUBMISSION_BLOCK = 128
+
+
+def _parameter_order(names):
+    """Current form parameters in form order, then any others alphabetically."""
+    form = [p for p in FORM_VERSIONS[CURRENT_FORM_VERSION] if p in names]
+    return form + sorted(set(names) - set(form))
+
+
+class RatingStats:
+    def __init__(self, faculty_ids, slots=(), parameters=()):
+        self.faculty_ids = list(dict.fromkeys(faculty_ids))
+        self.slots = list(slots)
+        self.parameters = list(parameters)
+        self._faculty_index = {fid: i for i, fid in enumerate(self.faculty_ids)}
+        self._slot_index = {slot: i for i, slot in enumerate(self.slots)}
+        self._parameter_index = {param: i for i, param in enumerate(self.parameters)}
+        self._form_columns = {}
+
+        shape = (len(self.faculty_ids), len(self.slots), len(self.parameters))
+        self.responses = np.zeros(shape[:2], dtype=np.int64)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.sum = np.zeros(shape, dtype=np.int64)
+        self.sum_squares = np.zeros(shape, dtype=np.int64)
+        self.histogram = np.zeros(shape + (len(RATING_SCALE),), dtype=np.int64)
+
+        # Submissions buffered for the next dense block: the slot index of
+        # each, compact ratings per form version as (rows, faculty, bytes),
+        # and map-form ratings as (row, faculty, parameter, rating) columns
+        self._rows = 0
+        self._row_slots = []
+        self._packed = {}
+        self._loose = ([], [], [], [])
+
+    # ── from faculty_aggregates ─────────────────────────────────────────────
+
+    @classmethod
+    def from_aggregates(cls, aggregates):
+        """{faculty_id: faculty_aggregates document or None} → RatingStats."""
+        slots, parameters = set(), set()
+        for data in aggregates.values():
+            for slot_key, slot in ((data or {}).get('slots') or {}).items():
+                slots.add(int(slot_key))
+                parameters.update(slot.get('parameters') or {})
+
+        stats = cls(aggregates, sorted(slots), _parameter_order(parameters))
+        n_slots, n_params = len(stats.slots), len(stats.parameters)
+        slot_cells, responses, cells, counts, sums, squares, bins, binned = [], [], [], [], [], [], [], []
+        for fi, data in enumerate(aggregates.values()):
+            for slot_key, slot in ((data or {}).get('slots') or {}).items():
+                si = stats._slot_index[int(slot_key)]
+                slot_cells.append(fi * n_slots + si)
+                responses.append(slot.get('responses', 0))
+                for param, p in (slot.get('parameters') or {}).items():
+                    cell = (fi * n_slots + si) * n_params + stats._parameter_index[param]
+                    cells.append(cell)
+                    counts.append(p.get('count', 0))
+                    sums.append(p.get('sum', 0))
+                    squares.append(p.get('sum_squares', 0))
+                    first_bin = cell * len(RATING_SCALE)
+                    for rating, n in (p.get('histogram') or {}).items():
+                        i = _BINS.get(rating)
+                        if i is not None:
+                            bins.append(first_bin + i)
+                            binned.append(n)
+
+        np.put(stats.responses, slot_cells, responses)
+        for array, values in ((stats.count, counts), (stats.sum, sums), (stats.sum_squares, squares)):
+            np.put(array, cells, values)
+        np.put(stats.histogram, bins, binned)
+        return stats
+
+    # ── from feedback_submissions ───────────────────────────────────────────
+
+    def add_submission(self, data):
+        """
+        Adds a stored submission (a dict with slot, ratings and form_version).
+        Ratings of faculty members not passed to the constructor are ignored.
+        """
+        ratings = data.get('ratings') or {}
+        rated = [(self._faculty_index[fid], stored) for fid, stored in ratings.items()
+                 if fid in self._faculty_index and stored]
+        if not rated:
+            return
+
+        slot = data.get('slot', 1)
+        if slot not in self._slot_index:
+            self._add_slot(slot)
+        row = self._rows
+        for fi, stored in rated:
+            if isinstance(stored, bytes):
+                version = data.get('form_version')
+                width = len(self._columns(version))
+                rows, faculty, packed = self._packed.setdefault(version, ([], [], bytearray()))
+                rows.append(row)
+                faculty.append(fi)
+                packed += stored[:width].ljust(width, b'\0')
+            else:
+                for param, rating in stored.items():
+                    pi = self._parameter_index.get(param)
+                    if pi is None:
+                        pi = self._add_parameter(param)
+                    for column, value in zip(self._loose, (row, fi, pi, rating)):
+                        column.append(value)
+
+        self._row_slots.append(self._slot_index[slot])
+        self._rows += 1
+        if self._rows == SUBMISSION_BLOCK:
+            self._flush()
+
+    def _columns(self, version):
+        """Parameter axis positions of a form version's parameters, in form order."""
+        if version not in self._form_columns:
+            if version not in FORM_VERSIONS:
+                raise ValueError(f"Unknown feedback form version {version!r}")
+            columns = []
+            for param in FORM_VERSIONS[version]:
+                pi = self._parameter_index.get(param)
+                columns.append(self._add_parameter(param) if pi is None else pi)
+            self._form_columns[version] = np.array(columns, dtype=np.int64)
+        return self._form_columns[version]
+
+    def _add_parameter(self, param):
+        self._parameter_index[param] = len(self.parameters)
+        self.parameters.append(param)
+        self._grow(('count', 'sum', 'sum_squares', 'histogram'), axis=2)
+        return self._parameter_index[param]
+
+    def _add_slot(self, slot):
+        self._slot_index[slot] = len(self.slots)
+        self.slots.append(slot)
+        self._grow(('responses', 'count', 'sum', 'sum_squares', 'histogram'), axis=1)
+
+    def _grow(self, names, axis):
+        for name in names:
+            array = getattr(self, name)
+            widths = [(0, 0)] * array.ndim
+            widths[axis] = (0, 1)
+            setattr(self, name, np.pad(array, widths))
+
+    def _flush(self):
+        """Loads the buffered submissions into a dense block and adds it to the totals."""
+        if not self._rows:
+            return
+        n_faculty, n_slots, n_params = self.count.shape
+        block = np.full((self._rows, n_faculty, n_params), np.nan, dtype=np.float32)
+        for version, (rows, faculty, packed) in self._packed.items():
+            columns = self._form_columns[version]
+            values = np.frombuffer(bytes(packed), dtype=np.uint8).reshape(len(rows), len(columns))
+            block[np.array(rows)[:, None], np.array(faculty)[:, None], columns] = \
+                np.where(values > 0, values, np.nan)
+        if self._loose[0]:
+            rows, faculty, params, values = self._loose
+            block[rows, faculty, params] = values
+
+        # Every (submission, faculty, parameter) that was rated, tallied into
+        # its (faculty, slot, parameter) cell
+        row_slots = np.array(self._row_slots)
+        rated = ~np.isnan(block)
+        r, f, p = np.nonzero(rated)
+        values = block[r, f, p].astype(np.int64)
+        cells = (f * n_slots + row_slots[r]) * n_params + p
+        size = n_faculty * n_slots * n_params
+        self.count += np.bincount(cells, minlength=size).reshape(self.count.shape)
+        self.sum += np.bincount(cells, weights=values, minlength=size).astype(np.int64).reshape(self.sum.shape)
+        self.sum_squares += np.bincount(cells, weights=values * values, minlength=size) \
+            .astype(np.int64).reshape(self.sum_squares.shape)
+        on_scale = (values >= 1) & (values <= len(RATING_SCALE))
+        self.histogram += np.bincount(cells[on_scale] * len(RATING_SCALE) + values[on_scale] - 1,
+                                      minlength=size * len(RATING_SCALE)).reshape(self.histogram.shape)
+        r, f = np.nonzero(rated.any(axis=2))
+        self.responses += np.bincount(f * n_slots + row_slots[r], minlength=n_faculty * n_slots) \
+            .reshape(self.responses.shape)
+
+        self._rows = 0
+        self._row_slots = []
+        self._packed = {}
+        self._loose = ([], [], [], [])
+
+    # ── results ─────────────────────────────────────────────────────────────
+
+    def slot_totals(self, slot):
+        """
+        (count, sum, sum_squares) as float (faculty × parameters) arrays and
+        responses per faculty member for one slot; zeros if nobody rated it.
+        """
+        self._flush()
+        if slot not in self._slot_index:
+            shape = (len(self.faculty_ids), len(self.parameters))
+            return np.zeros(shape), np.zeros(shape), np.zeros(shape), np.zeros(shape[0], dtype=np.int64)
+        si = self._slot_index[slot]
+        return (self.count[:, si].astype(float), self.sum[:, si].astype(float),
+                self.sum_squares[:, si].astype(float), self.responses[:, si])
+
+    def stats(self):
+        """{faculty_id: stats payload, or None if they have no responses}."""
+        self._flush()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = self.sum / self.count
+            std = np.sqrt(np.maximum(self.sum_squares / self.count - mean * mean, 0))
+            overall = self.sum.sum(axis=2) / self.count.sum(axis=2)
+        rated_params = (self.count > 0).sum(axis=2)
+        response_count = np.where(rated_params > 0, self.count.sum(axis=2) // np.maximum(rated_params, 1), 0)
+
+        # Nearest-rank percentiles: the first rating whose cumulative count
+        # reaches ceil(q% of the in-scale ratings)
+        cumulative = self.histogram.cumsum(axis=3)
+        in_scale = cumulative[..., -1]
+        ranks = np.maximum(np.ceil(np.multiply.outer(np.array(PERCENTILES) / 100, in_scale)), 1)
+        percentiles = (cumulative[None] < ranks[..., None]).sum(axis=4) + 1
+        percentiles = np.moveaxis(percentiles, 0, -1)   # (faculty, slots, parameters, q)
+
+        # Rounded in Python below: np.round can differ from round() in the last digit
+        mean, std, overall = mean.tolist(), std.tolist(), overall.tolist()
+        count, responses, in_scale = self.count.tolist(), self.responses.tolist(), in_scale.tolist()
+        response_count, histogram, percentiles = response_count.tolist(), self.histogram.tolist(), percentiles.tolist()
+        median = PERCENTILES.index(50)
+        keys = [f'p{q}' for q in PERCENTILES]
+
+        results = {}
+        for fi, faculty_id in enumerate(self.faculty_ids):
+            slots = {}
+            for si, slot in enumerate(self.slots):
+                if responses[fi][si] <= 0:
+                    continue
+                cell_count, cell_mean, cell_std = count[fi][si], mean[fi][si], std[fi][si]
+                cell_scale, cell_pcts, cell_hist = in_scale[fi][si], percentiles[fi][si], histogram[fi][si]
+                param_stats = {}
+                for pi, param in enumerate(self.parameters):
+                    if cell_count[pi] <= 0:
+                        continue
+                    avg = cell_mean[pi]
+                    pcts = cell_pcts[pi] if cell_scale[pi] > 0 else [None] * len(keys)
+                    param_stats[param] = {
+                        'average': round(avg, 2),
+                        'percentage': round((avg / 10) * 100, 1),
+                        'totalRatings': cell_count[pi],
+                        'stdDev': round(cell_std[pi], 2),
+                        'median': pcts[median],
+                        'percentiles': dict(zip(keys, pcts)),
+                        'histogram': cell_hist[pi],
+                    }
+                slots[slot] = {
+                    'responses': responses[fi][si],
+                    'stats': {
+                        'parameterStats': param_stats,
+                        'overallAverage': round(overall[fi][si], 2) if param_stats else 0,
+                        'responseCount': response_count[fi][si],
+                    },
+                }
+            results[faculty_id] = _payload(slots)
+        return results
+
+
+def _payload(slots):
+    if not slots:
+        return None
+    stats = {
+        "totalResponses": sum(s['responses'] for s in slots.values()),
+        "hasSlot1": 1 in slots,
+        "hasSlot2": 2 in slots,
+    }
+    if 1 in slots:
+        stats["slot1"] = slots[1]['stats']
+    if 2 in slots:
+        stats["slot2"] = slots[2]['stats']
+    return stats
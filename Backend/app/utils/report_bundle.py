@@ -0,0 +1,105 @@
+"""
+utils/report_bundle.py
+
+Department / college report bundles, built by the report job queue.
+
+The feedback repository loads the ratings of every batch in scope into
+utils/rating_stats.py (one pass over feedback_submissions on Firestore, a
+GROUP BY query on SQL), whose per-faculty stats (including the
+median, percentiles and 1–10 distribution of each parameter) are then
+rendered as an XLSX workbook or a zip of CSV files.
+"""
+
+import csv
+import io
+import re
+import zipfile
+
+from ..extensions import db, repository
+from ..models.faculty import Faculty
+from .rating_stats import PERCENTILES, RATING_SCALE
+
+SUMMARY_COLUMNS = ['College', 'Department', 'Faculty', 'Subject', 'Year', 'Sem', 'Sec',
+                   'Slot', 'Responses', 'Overall Average', 'Overall %']
+PARAMETER_COLUMNS = ['College', 'Department', 'Faculty', 'Subject', 'Year', 'Sem', 'Sec',
+                     'Slot', 'Parameter', 'Average', 'Percentage', 'Ratings', 'Std Dev', 'Median'] + \
+    [f'P{q}' for q in PERCENTILES if q != 50] + [f'Rated {r}' for r in RATING_SCALE]
+
+
+def _scoped(collection, college, department):
+    query = db.collection(collection).where('college', '==', college)
+    if department:
+        query = query.where('department', '==', department)
+    return query
+
+
+def collect_faculty_stats(college, department=None, progress=None):
+    """Returns [(faculty dict, stats or None)] for every faculty member in scope."""
+    faculty = [Faculty.to_dict(doc.id, doc.to_dict())
+               for doc in _scoped(Faculty.COLLECTION, college, department).stream()]
+    stats = repository.scope_stats(college, department, [f['id'] for f in faculty], progress).stats()
+
+    faculty.sort(key=lambda f: (f['dept'], f['name'].lower()))
+    return [(f, stats[f['id']]) for f in faculty]
+
+
+def _rows(faculty_stats):
+    summary, parameters = [], []
+    for f, stats in faculty_stats:
+        prefix = [f['college'], f['dept'], f['name'], f['subject'], f['year'], f['sem'], f['sec']]
+        for slot in (1, 2):
+            slot_stats = (stats or {}).get(f'slot{slot}')
+            if not slot_stats:
+                continue
+            summary.append(prefix + [
+                slot, slot_stats['responseCount'], slot_stats['overallAverage'],
+                round(slot_stats['overallAverage'] * 10, 1),
+            ])
+            for param, p in slot_stats['parameterStats'].items():
+                parameters.append(prefix + [
+                    slot, param, p['average'], p['percentage'], p['totalRatings'], p['stdDev'], p['median'],
+                ] + [p['percentiles'][f'p{q}'] for q in PERCENTILES if q != 50] + p['histogram'])
+    return summary, parameters
+
+
+def render_csv_bundle(faculty_stats):
+    summary, parameters = _rows(faculty_stats)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, columns, rows in (('summary.csv', SUMMARY_COLUMNS, summary),
+                                    ('parameters.csv', PARAMETER_COLUMNS, parameters)):
+            text = io.StringIO()
+            writer = csv.writer(text)
+            writer.writerow(columns)
+            writer.writerows(rows)
+            zf.writestr(name, text.getvalue())
+    return buf.getvalue()
+
+
+def render_xlsx(faculty_stats):
+    from openpyxl import Workbook
+
+    summary, parameters = _rows(faculty_stats)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Summary'
+    for sheet, columns, rows in ((ws, SUMMARY_COLUMNS, summary),
+                                 (wb.create_sheet('Parameters'), PARAMETER_COLUMNS, parameters)):
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+        sheet.freeze_panes = 'A2'
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def build_report(params, progress):
+    """Job entry point: params = {college, department, format}."""
+    faculty_stats = collect_faculty_stats(params['college'], params.get('department'), progress)
+    scope = re.sub(r'[^A-Za-z0-9_-]+', '_', '-'.join(p for p in (params['college'], params.get('department')) if p))
+    if params['format'] == 'xlsx':
+        return (f'feedback-report-{scope}.xlsx',
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                render_xlsx(faculty_stats))
+    return f'feedback-report-{scope}.zip', 'application/zip', render_csv_bundle(faculty_stats)
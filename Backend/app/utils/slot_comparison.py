@@ -0,0 +1,104 @@
+"""
+utils/slot_comparison.py
+
+Slot-over-slot comparison of a whole department's feedback.
+
+For every faculty member, and for the department as a whole, each
+parameter's average in one slot is compared with another: the change in
+average and its effect size, Hedges' g (the difference in means over the
+pooled sample standard deviation, corrected for small samples). "overall"
+pools all of a faculty member's ratings across parameters. Faculty members
+are then ranked by their overall effect size into the biggest improvements
+and declines.
+
+The inputs are the count / sum / sum-of-squares arrays of a RatingStats
+(utils/rating_stats.py), so every faculty member and parameter is compared
+with the same few array operations, whether the stats came from
+faculty_aggregates or a pass over the submissions.
+"""
+
+import numpy as np
+
+
+def _moments(count, total, squares):
+    """Mean and sample variance from count / sum / sum of squares (NaN where undefined)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        variance = np.maximum(squares - count * mean * mean, 0) / (count - 1)
+    return mean, np.where(count > 1, variance, np.nan)
+
+
+def _effect(count_a, total_a, squares_a, count_b, total_b, squares_b):
+    """(mean a, mean b, delta, Hedges' g) arrays; NaN where a side has no ratings."""
+    mean_a, var_a = _moments(count_a, total_a, squares_a)
+    mean_b, var_b = _moments(count_b, total_b, squares_b)
+    n = count_a + count_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = np.sqrt(((count_a - 1) * var_a + (count_b - 1) * var_b) / (n - 2))
+        correction = 1 - 3 / (4 * n - 9)
+        effect = np.where(pooled > 0, (mean_b - mean_a) / pooled * correction, np.nan)
+    return mean_a, mean_b, mean_b - mean_a, effect
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _entry(mean_a, mean_b, delta, effect):
+    return {'from': _number(mean_a), 'to': _number(mean_b), 'delta': _number(delta), 'effectSize': _number(effect)}
+
+
+def compare_slots(stats, from_slot, to_slot, top=10):
+    """
+    Compares `from_slot` with `to_slot` for every faculty member in `stats`
+    (a RatingStats). Returns {faculty, department, improvements, declines}:
+    faculty members rated in both slots with their overall and per-parameter
+    changes, the same for the department, and the `top` faculty members with
+    the largest positive / negative overall effect size.
+    """
+    count_a, total_a, squares_a, responses_a = stats.slot_totals(from_slot)
+    count_b, total_b, squares_b, responses_b = stats.slot_totals(to_slot)
+
+    per_parameter = _effect(count_a, total_a, squares_a, count_b, total_b, squares_b)
+    overall = _effect(*(a.sum(axis=1) for a in (count_a, total_a, squares_a, count_b, total_b, squares_b)))
+    department = _effect(*(a.sum(axis=0) for a in (count_a, total_a, squares_a, count_b, total_b, squares_b)))
+    department_overall = _effect(*(a.sum() for a in (count_a, total_a, squares_a, count_b, total_b, squares_b)))
+
+    compared = (responses_a > 0) & (responses_b > 0)
+    faculty = []
+    for fi in np.flatnonzero(compared):
+        parameters = {
+            param: _entry(*(a[fi, pi] for a in per_parameter))
+            for pi, param in enumerate(stats.parameters)
+            if count_a[fi, pi] > 0 and count_b[fi, pi] > 0
+        }
+        faculty.append({
+            'facultyId': stats.faculty_ids[fi],
+            'responses': {'from': int(responses_a[fi]), 'to': int(responses_b[fi])},
+            'overall': _entry(*(a[fi] for a in overall)),
+            'parameters': parameters,
+        })
+
+    effect = overall[3]
+    ranked = np.flatnonzero(compared & ~np.isnan(effect))
+    ranked = ranked[np.argsort(effect[ranked], kind='stable')]   # biggest decline first
+    declines = [fi for fi in ranked if effect[fi] < 0][:top]
+    improvements = [fi for fi in ranked[::-1] if effect[fi] > 0][:top]
+
+    def ranking(indices):
+        return [{'facultyId': stats.faculty_ids[fi], 'delta': _number(overall[2][fi]),
+                 'effectSize': _number(effect[fi])} for fi in indices]
+
+    return {
+        'faculty': faculty,
+        'department': {
+            'overall': _entry(*department_overall),
+            'parameters': {
+                param: _entry(*(a[pi] for a in department))
+                for pi, param in enumerate(stats.parameters)
+                if count_a[:, pi].sum() > 0 and count_b[:, pi].sum() > 0
+            },
+        },
+        'improvements': ranking(improvements),
+        'declines': ranking(declines),
+    }
@@ -0,0 +1,160 @@
+"""
+utils/token_blocklist.py
+
+Revoked-JWT storage. Every entry is kept only until the token's own `exp`,
+after which the JWT is rejected as expired anyway.
+
+Backends (BLOCKLIST_BACKEND):
+  - memory     → per-process dict + expiry heap. Only correct with one worker.
+  - firestore  → `revoked_tokens/{jti}` documents, shared by every worker and
+                 instance. Add a Firestore TTL policy on `expires_at` so the
+                 collection cleans itself up.
+  - redis      → `revoked:{jti}` keys with EXPIREAT (needs REDIS_URL; startup
+                 fails without the `redis` package).
+
+The shared backends take their client as a constructor argument so a local
+fake can be swapped in. TokenBlocklist sits in front of whichever backend is
+active and answers the hot path from memory: tokens revoked by this process
+are known locally, and recent "not revoked" answers are kept in a short-lived
+negative cache (BLOCKLIST_NEGATIVE_TTL seconds). When the shared backend
+cannot be reached, tokens are treated as revoked unless BLOCKLIST_FAIL_OPEN
+is set.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBlocklist:
+    """jti -> exp map; expired entries are pruned as the heap head expires."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiry = {}
+        self._heap = []
+
+    def _prune(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            exp, jti = heapq.heappop(self._heap)
+            if self._expiry.get(jti) == exp:
+                del self._expiry[jti]
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._prune(time.time())
+            self._expiry[jti] = expires_at
+            heapq.heappush(self._heap, (expires_at, jti))
+
+    def contains(self, jti):
+        # Lock-free on the common path: dict membership is atomic under the GIL
+        # and pruning only needs the lock once the earliest entry has expired.
+        heap = self._heap
+        if heap and heap[0][0] <= time.time():
+            with self._lock:
+                self._prune(time.time())
+        return jti in self._expiry
+
+    def __len__(self):
+        return len(self._expiry)
+
+
+class FirestoreBlocklist:
+    COLLECTION = 'revoked_tokens'
+
+    def __init__(self, client):
+        self._collection = client.collection(self.COLLECTION)
+
+    def add(self, jti, expires_at):
+        self._collection.document(jti).set({
+            'expires_at': datetime.fromtimestamp(expires_at, tz=timezone.utc),
+        })
+
+    def contains(self, jti):
+        doc = self._collection.document(jti).get()
+        if not doc.exists:
+            return False
+        expires_at = (doc.to_dict() or {}).get('expires_at')
+        return expires_at is None or expires_at > datetime.now(timezone.utc)
+
+
+class RedisBlocklist:
+    KEY_PREFIX = 'revoked:'
+
+    def __init__(self, client):
+        self._client = client
+
+    def add(self, jti, expires_at):
+        self._client.set(f'{self.KEY_PREFIX}{jti}', 1, exat=int(expires_at) + 1)
+
+    def contains(self, jti):
+        return bool(self._client.exists(f'{self.KEY_PREFIX}{jti}'))
+
+
+class TokenBlocklist:
+    """Revocation front end used by the JWT blocklist loader."""
+
+    def __init__(self):
+        self._local = MemoryBlocklist()
+        # jti -> monotonic deadline. A plain dict keeps the lookup lock-free;
+        # it is simply dropped when it reaches negative_cache_size.
+        self._not_revoked = {}
+        self.negative_ttl = 5
+        self.negative_cache_size = 10000
+        self.fail_open = False
+        self.backend = None  # None → the local map is the only store
+
+    def init_app(self, app, client=None):
+        self.negative_ttl = app.config.get('BLOCKLIST_NEGATIVE_TTL', self.negative_ttl)
+        self.negative_cache_size = app.config.get('BLOCKLIST_NEGATIVE_CACHE_SIZE', self.negative_cache_size)
+        self.fail_open = app.config.get('BLOCKLIST_FAIL_OPEN', self.fail_open)
+        self._not_revoked = {}
+        name = app.config.get('BLOCKLIST_BACKEND', 'memory')
+        if name == 'firestore':
+            self.backend = FirestoreBlocklist(client)
+        elif name == 'redis':
+            # A missing package must stop startup, not quietly go per-process
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("BLOCKLIST_BACKEND=redis needs the redis package (requirements.txt)") from e
+            self.backend = RedisBlocklist(redis.Redis.from_url(app.config['REDIS_URL']))
+        else:
+            self.backend = None
+        logger.info(f"Token blocklist backend: {name if self.backend else 'memory'}")
+
+    def add(self, jti, expires_at):
+        self._local.add(jti, expires_at)
+        self._not_revoked.pop(jti, None)
+        if self.backend is not None:
+            self.backend.add(jti, expires_at)
+
+    def is_revoked(self, jti, expires_at=None):
+        if self._local.contains(jti):
+            return True
+        if self.backend is None:
+            return False
+        deadline = self._not_revoked.get(jti)
+        if deadline is not None and deadline > time.monotonic():
+            return False
+
+        try:
+            revoked = self.backend.contains(jti)
+        except Exception as e:
+            # Fail closed unless BLOCKLIST_FAIL_OPEN: an outage of the shared
+            # store must not re-admit revoked tokens. The answer is not cached,
+            # so the next call retries.
+            logger.error(f"Token blocklist lookup failed: {e}")
+            return not self.fail_open
+
+        if revoked:
+            self._local.add(jti, expires_at or time.time() + 3600)
+        else:
+            if len(self._not_revoked) >= self.negative_cache_size:
+                self._not_revoked = {}
+            self._not_revoked[jti] = time.monotonic() + self.negative_ttl
+        return revoked
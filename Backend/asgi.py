@@ -0,0 +1,30 @@
+"""
+ASGI entry point: the hot endpoints on the async Firestore client, everything
+else on the Flask app (see app/asgi/__init__.py).
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --proxy-headers
+    python asgi.py
+
+The WSGI entry point (gunicorn -c gunicorn_config.py run:app) is unchanged.
+"""
+
+import os
+
+from app.asgi import create_asgi_app
+from run import app as flask_app  # creates the Flask app and seeds the admin account
+
+app = create_asgi_app(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    uvicorn.run(
+        "asgi:app" if workers > 1 else app,  # several workers re-import this module
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 5000)),
+        workers=workers,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("TRUSTED_PROXY_IPS", "127.0.0.1"),
+        timeout_graceful_shutdown=20,
+    )
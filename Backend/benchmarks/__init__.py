@@ -0,0 +1 @@
+# Benchmarks — run from Backend/ as `python -m benchmarks.<name>`
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+benchmarks/asgi_vs_wsgi.py
+
+Student submission burst against both serving modes:
+
+    wsgi   gunicorn -c gunicorn_config.py run:app   (gthread, 1 worker × 2 threads)
+    asgi   uvicorn asgi:app                         (async Firestore client)
+
+Each of --students simulated students opens the feedback link
+(GET /api/batch/<id>) and submits (POST /api/feedback/submit) from its own
+X-Forwarded-For address, at most --concurrency at a time. Every mode gets a
+fresh batch, so duplicate-device checks never collide between runs.
+
+Runs only against the Firestore emulator; start one first, then from Backend/:
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=demo-fds \\
+        python -m benchmarks.asgi_vs_wsgi --students 300 --concurrency 300
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import seed_batch, student_submission, student_headers, percentile
+
+SERVERS = {
+    'wsgi': lambda port: ['gunicorn', '-c', 'gunicorn_config.py', 'run:app'],
+    'asgi': lambda port: ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                          '--log-level', 'warning'],
+}
+
+
+def start_server(mode, port):
+    env = {**os.environ, 'PORT': str(port), 'RATELIMIT_ENABLED': 'false'}
+    proc = subprocess.Popen(SERVERS[mode](port), env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health', timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f'{mode} server did not come up on port {port}')
+
+
+async def run_burst(base_url, batch_id, faculty_ids, students, concurrency):
+    latencies = {'lookup': [], 'submit': []}
+    statuses = {}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def timed(kind, request):
+        started = time.perf_counter()
+        response = await request
+        latencies[kind].append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def student(client, n):
+        async with gate:
+            await timed('lookup', client.get(f'/api/batch/{batch_id}'))
+            await timed('submit', client.post('/api/feedback/submit', json=student_submission(batch_id, faculty_ids),
+                                              headers=student_headers(n)))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(student(client, n) for n in range(students)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses
+
+
+def report(mode, students, elapsed, latencies, statuses):
+    print(f"\n{mode}: {students} students in {elapsed:.2f}s "
+          f"→ {students / elapsed:.1f} submissions/s   statuses {dict(sorted(statuses.items()))}")
+    for kind, values in latencies.items():
+        ms = [v * 1000 for v in values]
+        print(f"  {kind:<7} p50 {percentile(ms, 50):8.1f} ms   p95 {percentile(ms, 95):8.1f} ms   "
+              f"p99 {percentile(ms, 99):8.1f} ms   mean {statistics.fmean(ms):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--faculty', type=int, default=8, help='faculty rated per submission')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        sys.exit('Set FIRESTORE_EMULATOR_HOST; this benchmark writes hundreds of test submissions.')
+
+    from app import create_app
+    with create_app().app_context():
+        for mode in args.modes.split(','):
+            batch_id, faculty_ids = seed_batch(args.faculty)
+            proc = start_server(mode, args.port)
+            try:
+                result = asyncio.run(run_burst(f'http://127.0.0.1:{args.port}', batch_id, faculty_ids,
+                                               args.students, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+            report(mode, args.students, *result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+benchmarks/common.py
+
+Seeding and reporting helpers shared by the benchmarks. Seed data is written
+straight to Firestore (emulator or fake) from inside an app context.
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+
+
+def form_parameters():
+    """The parameters of the current feedback form (app/utils/rating_schema.py)."""
+    from app.utils.rating_schema import FORM_VERSIONS, CURRENT_FORM_VERSION
+    return FORM_VERSIONS[CURRENT_FORM_VERSION]
+
+
+def seed_batch(faculty_count, college='Bench', department='CSE', total_students=0):
+    """
+    Writes an open batch with `faculty_count` new faculty; total_students=0
+    leaves it uncapped. Returns (batch_id, faculty_ids).
+    """
+    from app.extensions import db
+    from app.models.batch import Batch
+    from app.models.faculty import Faculty
+
+    now = datetime.now(timezone.utc)
+    faculty = []
+    for i in range(faculty_count):
+        ref = db.collection(Faculty.COLLECTION).document()
+        data = {'name': f'Bench Faculty {i}', 'subject': 'Benchmarking', 'college': college,
+                'department': department, 'is_active': True, 'created_at': now}
+        ref.set(data)
+        faculty.append({**data, 'id': ref.id})
+
+    batch_id = f"{college}-{department}-{int(time.time() * 1000)}"
+    db.collection(Batch.COLLECTION).document(batch_id).set({
+        'batch_id': batch_id, 'college': college, 'department': department, 'branch': department,
+        'year': '2', 'semester': '1', 'section': 'A', 'slot': 1, 'slot_label': 'Slot 1',
+        'total_students': total_students, 'faculty': faculty, 'is_active': True, 'created_at': now,
+    })
+    return batch_id, [f['id'] for f in faculty]
+
+
+def seed_staff(role, count, college='Bench', department='CSE'):
+    """
+    Writes `count` active users with `role` and returns an access token for
+    each, minted as routes/auth.login would (no password round trip).
+    """
+    from flask import current_app
+    from flask_jwt_extended import create_access_token
+    from app.extensions import db
+    from app.middleware.auth_middleware import current_token_version
+    from app.models.user import User
+
+    tokens = []
+    for i in range(count):
+        user_id = f"bench-{college}-{role}-{i}".lower()
+        data = {'user_id': user_id, 'name': f'Bench {role} {i}', 'role': role, 'college': college,
+                'department': department if role == 'hod' else None, 'is_active': True,
+                'created_at': datetime.now(timezone.utc)}
+        ref = db.collection(User.COLLECTION).document(user_id)
+        ref.set(data)
+        claims = None
+        if current_app.config.get('JWT_EMBED_USER_CLAIMS'):
+            claims = User.access_claims(ref.id, data, current_token_version(user_id))
+        tokens.append(create_access_token(identity=user_id, additional_claims=claims))
+    return tokens
+
+
+def student_submission(batch_id, faculty_ids):
+    parameters = form_parameters()
+    return {'batchId': batch_id, 'comments': '', 'responses': [
+        {'facultyId': fid, 'ratings': {p: random.randint(1, 10) for p in parameters}}
+        for fid in faculty_ids
+    ]}
+
+
+def student_headers(n):
+    """A distinct client address per student, so device checks never collide."""
+    return {'X-Forwarded-For': f'10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}'}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
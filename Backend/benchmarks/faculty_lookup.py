@@ -0,0 +1,156 @@
+"""
+benchmarks/faculty_lookup.py
+
+Finding the submissions that rate one faculty member, the query behind the
+faculty report export, the faculty response wipe and rebuild-faculty-aggregates:
+
+    legacy   where('ratings.<faculty_id>', '!=', None)
+             an inequality on a per-faculty map path: one index entry per
+             faculty key, scanned in key order
+    array    where('faculty_ids', 'array_contains', faculty_id)
+             an equality on the single-field array index
+
+Seeds --batches batches of --faculty faculty with --submissions submissions
+each, written as they were before faculty_ids existed, then runs --lookups
+lookups per phase:
+
+    before backfill   legacy, and array (which finds nothing yet)
+    backfill          flask backfill-submission-faculty-ids
+    after backfill    legacy and array again
+
+Reported per phase: documents found, Firestore reads and RPCs per lookup (as
+counted by utils/firestore_metrics.py) and p50/p95 latency. Both queries
+return the same documents and are billed the same reads; the difference is
+in how much index the backend scans, which the fake (a flat --rpc-latency ms
+per RPC) does not model, so compare latencies on the emulator. From Backend/:
+
+    python -m benchmarks.faculty_lookup
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=demo-fds \\
+        python -m benchmarks.faculty_lookup --backend emulator --batches 40 --submissions 60
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+from .common import form_parameters, seed_batch, percentile
+
+
+def seed_legacy_submissions(batches, faculty, submissions):
+    """Writes submissions without faculty_ids. Returns every faculty id seeded."""
+    from app.extensions import db
+    from app.models.feedback import FeedbackSubmission
+    from app.utils.bulk import BATCH_WRITE_LIMIT
+
+    college = f'Lookup-{int(time.time())}'
+    parameters = form_parameters()
+    all_faculty = []
+    writer, pending = db.batch(), 0
+    for _ in range(batches):
+        batch_id, faculty_ids = seed_batch(faculty, college=college)
+        all_faculty += faculty_ids
+        for n in range(submissions):
+            ratings = {fid: {p: random.randint(1, 10) for p in parameters} for fid in faculty_ids}
+            data = FeedbackSubmission.create_submission_data(batch_id, 1, '', f'10.0.{n // 256}.{n % 256}', ratings)
+            del data['faculty_ids']
+            writer.set(db.collection(FeedbackSubmission.COLLECTION).document(), data)
+            pending += 1
+            if pending >= BATCH_WRITE_LIMIT:
+                writer.commit()
+                writer, pending = db.batch(), 0
+    if pending:
+        writer.commit()
+    return all_faculty
+
+
+def run_lookups(faculty_ids, legacy):
+    """Streams each faculty member's submissions as rebuild-faculty-aggregates does."""
+    from app.extensions import db, firestore_metrics
+    from app.models.feedback import FeedbackSubmission
+
+    latencies, found, reads, rpcs = [], 0, 0, 0
+    for fid in faculty_ids:
+        token = firestore_metrics.begin_request()
+        try:
+            started = time.perf_counter()
+            query = FeedbackSubmission.faculty_query(db.collection(FeedbackSubmission.COLLECTION), fid, legacy=legacy)
+            found += sum(1 for _ in query.select(FeedbackSubmission.RATING_FIELDS).stream())
+            latencies.append((time.perf_counter() - started) * 1000)
+            cost = firestore_metrics.current().to_dict()
+        finally:
+            firestore_metrics.end_request(token)
+        reads += cost['reads']
+        rpcs += cost['rpcs']
+    n = len(faculty_ids)
+    return {'found': found / n, 'reads': reads / n, 'rpcs': rpcs / n,
+            'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95)}
+
+
+def run_backfill(flask_app):
+    from app.commands import backfill_submission_faculty_ids
+    from app.extensions import firestore_metrics
+
+    token = firestore_metrics.begin_request()
+    try:
+        started = time.perf_counter()
+        result = flask_app.test_cli_runner().invoke(backfill_submission_faculty_ids)
+        elapsed = time.perf_counter() - started
+        cost = firestore_metrics.current().to_dict()
+    finally:
+        firestore_metrics.end_request(token)
+    if result.exit_code:
+        raise RuntimeError(result.output) from result.exception
+    return {'seconds': elapsed, 'summary': result.output.strip().splitlines()[-1], **cost}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['fake', 'emulator'], default='fake')
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--faculty', type=int, default=8, help='faculty per batch')
+    parser.add_argument('--submissions', type=int, default=60, help='submissions per batch')
+    parser.add_argument('--lookups', type=int, default=40, help='faculty looked up per phase')
+    parser.add_argument('--rpc-latency', type=float, default=15, help='fake backend: ms per Firestore RPC')
+    args = parser.parse_args()
+
+    fake = None
+    if args.backend == 'fake':
+        from . import fake_firestore
+        fake = fake_firestore.install(latency=args.rpc_latency / 1000)
+    elif not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        sys.exit('Set FIRESTORE_EMULATOR_HOST; this benchmark writes thousands of test submissions.')
+
+    os.environ.setdefault('FLASK_ENV', 'development')
+    from app import create_app
+    from app.extensions import firestore_metrics
+
+    if fake:
+        fake.ops.listener = firestore_metrics.record
+    flask_app = create_app()
+    logging.disable(logging.INFO)
+
+    with flask_app.app_context():
+        faculty_ids = seed_legacy_submissions(args.batches, args.faculty, args.submissions)
+        sample = random.sample(faculty_ids, min(args.lookups, len(faculty_ids)))
+        phases = [('before backfill', 'legacy', run_lookups(sample, legacy=True)),
+                  ('before backfill', 'array', run_lookups(sample, legacy=False))]
+        backfill = run_backfill(flask_app)
+        phases += [('after backfill', 'legacy', run_lookups(sample, legacy=True)),
+                   ('after backfill', 'array', run_lookups(sample, legacy=False))]
+
+    backend = f"fake, {args.rpc_latency:g} ms/RPC" if fake else 'emulator'
+    print(f"\n{args.batches * args.submissions} submissions, {len(faculty_ids)} faculty, "
+          f"{len(sample)} lookups per phase ({backend})")
+    print(f"  {'phase':<16} {'query':<7} {'found':>6} {'reads':>7} {'RPCs':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for phase, query, r in phases:
+        print(f"  {phase:<16} {query:<7} {r['found']:>6.1f} {r['reads']:>7.1f} {r['rpcs']:>5.1f}"
+              f" {r['p50']:>8.1f} {r['p95']:>8.1f}")
+    print(f"\nbackfill: {backfill['summary']} in {backfill['seconds']:.2f}s "
+          f"({backfill['reads']} reads, {backfill['writes']} writes, {backfill['rpcs']} RPCs)")
+
+
+if __name__ == '__main__':
+    main()
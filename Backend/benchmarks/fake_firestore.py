@@ -0,0 +1,742 @@
+"""
+benchmarks/fake_firestore.py
+
+In-memory stand-in for the part of the Firestore client API the app uses,
+so the load test (benchmarks/loadtest.py) runs without the emulator.
+
+    from benchmarks import fake_firestore
+    fake = fake_firestore.install(latency=0.02)   # before `import app`
+
+Documents live in one dict keyed by path; queries support the filters,
+ordering, cursors, projections and count() the routes use. Each RPC
+(document get, multi-get, query, aggregation, commit) sleeps `latency`
+seconds, so requests spend their time waiting on I/O as they would against
+Firestore instead of finishing in a dict lookup. A transaction locks every
+document it reads until it commits or rolls back, like Firestore's server
+side transactions, so contention on the per-batch counter shards is real.
+
+Reads, writes, queries and aggregations are counted in `client.ops`, which
+can forward them to the app's Firestore metrics (see OpCounter.listener).
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+OPS = ('reads', 'writes', 'deletes', 'queries', 'aggregations')
+
+
+class OpCounter:
+    """
+    Firestore operations and RPCs made through the fake. `listener`, if set,
+    is called as listener(rpc=None, seconds=0.0, **ops) for each, with the
+    signature of FirestoreMetrics.record, so the app's own per-request
+    accounting (Server-Timing, /api/metrics) sees the fake's traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self.listener = None
+
+    def add(self, **kwargs):
+        with self._lock:
+            self._counts.update(kwargs)
+        if self.listener:
+            # Queries are RPCs, not a billed operation
+            self.listener(**{op: n for op, n in kwargs.items() if op != 'queries'})
+
+    def rpc(self, name, seconds):
+        with self._lock:
+            self._counts['rpcs'] += 1
+        if self.listener:
+            self.listener(name, seconds)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {op: self._counts[op] for op in OPS}
+
+
+# ── document data helpers ───────────────────────────────────────────────────
+
+def _get_path(data, path):
+    cur = data
+    for part in path.split('.'):
+        if not isinstance(cur, dict) or part not in cur:
+            return None, False
+        cur = cur[part]
+    return cur, True
+
+
+def _apply_value(existing, value):
+    if isinstance(value, transforms.Increment):
+        return (existing if isinstance(existing, (int, float)) else 0) + value.value
+    if isinstance(value, transforms.ArrayUnion):
+        base = list(existing) if isinstance(existing, list) else []
+        return base + [v for v in value.values if v not in base]
+    if isinstance(value, transforms.ArrayRemove):
+        base = list(existing) if isinstance(existing, list) else []
+        return [v for v in base if v not in value.values]
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    return copy.deepcopy(value)
+
+
+def _set_path(data, path, value):
+    parts = path.split('.')
+    cur = data
+    for part in parts[:-1]:
+        if not isinstance(cur.get(part), dict):
+            cur[part] = {}
+        cur = cur[part]
+    if value is transforms.DELETE_FIELD:
+        cur.pop(parts[-1], None)
+    else:
+        cur[parts[-1]] = _apply_value(cur.get(parts[-1]), value)
+
+
+def _merge(target, updates):
+    for key, value in updates.items():
+        if isinstance(value, dict):
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            _merge(target[key], value)
+        elif value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        else:
+            target[key] = _apply_value(target.get(key), value)
+
+
+def _resolve(data):
+    result = {}
+    _merge(result, data)
+    return result
+
+
+def _project(data, fields):
+    if data is None or fields is None:
+        return data
+    return {f: _get_path(data, f)[0] for f in fields if _get_path(data, f)[1]}
+
+
+# ── snapshots, references and queries ───────────────────────────────────────
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        value, _ = _get_path(self._data or {}, field)
+        return copy.deepcopy(value)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name):
+        return FakeCollectionReference(self._client, f'{self.path}/{name}')
+
+    def get(self, field_paths=None, transaction=None):
+        self._client._rpc('BatchGetDocuments')
+        if transaction is not None:
+            transaction._lock_paths([self.path])
+        return self._client._read(self.path, field_paths)
+
+    def set(self, data, merge=False):
+        self._client._rpc('Commit')
+        self._client._write(self.path, data, merge=merge)
+
+    def create(self, data):
+        self._client._rpc('Commit')
+        self._client._create(self.path, data)
+
+    def update(self, data):
+        self._client._rpc('Commit')
+        self._client._update(self.path, data)
+
+    def delete(self):
+        self._client._rpc('Commit')
+        self._client._delete(self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+class FakeAggregationResult:
+    def __init__(self, value):
+        self.value = value
+        self.alias = 'count'
+
+
+class FakeAggregationQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def _result(self):
+        self._query._client.ops.add(aggregations=1)
+        return [[FakeAggregationResult(len(self._query._matches()))]]
+
+    def get(self, transaction=None):
+        self._query._client._rpc('RunAggregationQuery')
+        return self._result()
+
+
+class FakeQuery:
+    def __init__(self, client, parent, filters=(), limit=None, orders=(), start_after=None, fields=None):
+        self._client = client
+        self._parent = parent
+        self._filters = tuple(filters)
+        self._limit = limit
+        self._orders = tuple(orders)
+        self._start_after = start_after
+        self._fields = fields
+
+    def _copy(self, **kwargs):
+        params = dict(filters=self._filters, limit=self._limit, orders=self._orders,
+                      start_after=self._start_after, fields=self._fields)
+        params.update(kwargs)
+        return FakeQuery(self._client, self._parent, **params)
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def start_after(self, document):
+        return self._copy(start_after=document)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def count(self, alias=None):
+        return FakeAggregationQuery(self)
+
+    def _match(self, doc_id, data):
+        for field, op, value in self._filters:
+            if field == '__name__':
+                actual, present = doc_id, True
+            else:
+                actual, present = _get_path(data, field)
+            if not present:
+                return False
+            if op == '==':
+                ok = actual == value
+            elif op == '!=':
+                ok = actual is not None and actual != value
+            elif op == 'in':
+                ok = actual in value
+            elif op == 'not-in':
+                ok = actual is not None and actual not in value
+            elif op == 'array_contains':
+                ok = isinstance(actual, list) and value in actual
+            elif op == 'array_contains_any':
+                ok = isinstance(actual, list) and any(v in actual for v in value)
+            elif op in ('<', '<=', '>', '>='):
+                try:
+                    ok = actual is not None and {'<': actual < value, '<=': actual <= value,
+                                                 '>': actual > value, '>=': actual >= value}[op]
+                except TypeError:
+                    ok = False
+            else:
+                raise NotImplementedError(op)
+            if not ok:
+                return False
+        return True
+
+    def _sort_key(self, doc_id, data):
+        key = []
+        for field, _ in self._orders or (('__name__', 'ASCENDING'),):
+            value = doc_id if field == '__name__' else _get_path(data, field)[0]
+            key.append((value is not None, value if value is not None else 0))
+        key.append((True, doc_id))
+        return key
+
+    def _matches(self):
+        with self._client._lock:
+            items = [
+                (path.rsplit('/', 1)[-1], path, copy.deepcopy(data))
+                for path, data in self._client._docs.items()
+                if path.rsplit('/', 1)[0] == self._parent and self._match(path.rsplit('/', 1)[-1], data)
+            ]
+        descending = bool(self._orders) and self._orders[0][1] == 'DESCENDING'
+        items.sort(key=lambda item: self._sort_key(item[0], item[2]), reverse=descending)
+        if self._start_after is not None:
+            after_id = (self._start_after.id if hasattr(self._start_after, 'id')
+                        else self._start_after.get('__name__'))
+            after_id = getattr(after_id, 'id', after_id)  # {'__name__': DocumentReference}
+            ids = [item[0] for item in items]
+            items = items[ids.index(after_id) + 1:] if after_id in ids else items
+        if self._limit is not None:
+            items = items[:self._limit]
+        return items
+
+    def _results(self):
+        matches = self._matches()
+        self._client.ops.add(queries=1, reads=max(1, len(matches)))
+        return [FakeSnapshot(FakeDocumentReference(self._client, path), _project(data, self._fields))
+                for _, path, data in matches]
+
+    def stream(self, transaction=None):
+        self._client._rpc('RunQuery')
+        yield from self._results()
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        if '/' not in self.path:
+            return None
+        return FakeDocumentReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self._client, f'{self.path}/{doc_id or uuid.uuid4().hex[:20]}')
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self):
+        with self._client._lock:
+            paths = [p for p in self._client._docs if p.rsplit('/', 1)[0] == self.path]
+        return [FakeDocumentReference(self._client, p) for p in paths]
+
+
+# ── writes and transactions ─────────────────────────────────────────────────
+
+class FakeWriteBatch:
+    """WriteBatch and BulkWriter: queued writes applied atomically on commit."""
+
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(('set', ref.path, data, merge))
+
+    def create(self, ref, data):
+        self._ops.append(('create', ref.path, data, False))
+
+    def update(self, ref, data):
+        self._ops.append(('update', ref.path, data, False))
+
+    def delete(self, ref):
+        self._ops.append(('delete', ref.path, None, False))
+
+    def __len__(self):
+        return len(self._ops)
+
+    def _apply(self):
+        with self._client._lock:
+            for kind, path, data, merge in self._ops:
+                if kind == 'set':
+                    self._client._write(path, data, merge=merge)
+                elif kind == 'create':
+                    self._client._create(path, data)
+                elif kind == 'update':
+                    self._client._update(path, data)
+                else:
+                    self._client._delete(path)
+        self._ops = []
+        return []
+
+    def commit(self):
+        self._client._rpc('Commit')
+        return self._apply()
+
+    def flush(self):
+        self.commit()
+
+    def close(self):
+        self.commit()
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Locks each document it reads until commit or rollback."""
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._held = []
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    def _lock_paths(self, paths):
+        for path in sorted(set(paths) - set(self._held)):
+            self._client._document_lock(path).acquire()
+            self._held.append(path)
+
+    def _release(self):
+        for path in self._held:
+            self._client._document_lock(path).release()
+        self._held = []
+        self._id = None
+
+    def _clean_up(self):
+        self._ops = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._client._rpc('BeginTransaction')
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        try:
+            self.commit()
+        finally:
+            self._release()
+        return []
+
+    def _rollback(self):
+        self._ops = []
+        self._release()
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, FakeDocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        return ref_or_query.stream()
+
+    def get_all(self, references, **kwargs):
+        return self._client.get_all(references, transaction=self)
+
+
+class FakeFirestoreClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.ops = OpCounter()
+        self._docs = {}
+        self._update_times = {}
+        self._lock = threading.RLock()
+        self._document_locks = {}
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def document(self, path):
+        return FakeDocumentReference(self, path)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def bulk_writer(self, **kwargs):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self, **kwargs)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        paths = [ref.path for ref in references]
+        self._rpc('BatchGetDocuments')
+        if transaction is not None:
+            transaction._lock_paths(paths)
+        for path in paths:
+            yield self._read(path, field_paths)
+
+    def _rpc(self, name):
+        if self.latency:
+            time.sleep(self.latency)
+        self.ops.rpc(name, self.latency)
+
+    def _document_lock(self, path):
+        with self._lock:
+            return self._document_locks.setdefault(path, threading.Lock())
+
+    def _read(self, path, field_paths=None):
+        self.ops.add(reads=1)
+        with self._lock:
+            data = copy.deepcopy(self._docs.get(path))
+            update_time = self._update_times.get(path) if data is not None else None
+        return FakeSnapshot(FakeDocumentReference(self, path), _project(data, field_paths), update_time)
+
+    def _touch(self, path):
+        # Strictly increasing per document, like Firestore's update_time
+        now = datetime.now(timezone.utc)
+        previous = self._update_times.get(path)
+        if previous is not None and now <= previous:
+            now = previous + timedelta(microseconds=1)
+        self._update_times[path] = now
+
+    def _write(self, path, data, merge=False):
+        with self._lock:
+            self.ops.add(writes=1)
+            self._touch(path)
+            if merge and path in self._docs:
+                _merge(self._docs[path], data)
+            else:
+                self._docs[path] = _resolve(data)
+
+    def _create(self, path, data):
+        with self._lock:
+            if path in self._docs:
+                raise AlreadyExists(path)
+            self._write(path, data)
+
+    def _update(self, path, data):
+        with self._lock:
+            if path not in self._docs:
+                raise NotFound(path)
+            self.ops.add(writes=1)
+            self._touch(path)
+            for field, value in data.items():
+                _set_path(self._docs[path], field, value)
+
+    def _delete(self, path):
+        with self._lock:
+            self.ops.add(deletes=1)
+            self._docs.pop(path, None)
+            self._update_times.pop(path, None)
+
+
+# ── async client (firebase_admin.firestore_async) ──────────────────────────
+
+class AsyncFakeDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return AsyncFakeQuery(self._client, self._client._sync.collection(self.path.rsplit('/', 1)[0]))
+
+    def collection(self, name):
+        return AsyncFakeQuery(self._client, self._client._sync.collection(f'{self.path}/{name}'))
+
+    async def get(self, field_paths=None, transaction=None):
+        await self._client._rpc('BatchGetDocuments')
+        if transaction is not None:
+            await transaction._lock_paths([self.path])
+        return self._client._sync._read(self.path, field_paths)
+
+    async def set(self, data, merge=False):
+        await self._client._rpc('Commit')
+        self._client._sync._write(self.path, data, merge=merge)
+
+    async def update(self, data):
+        await self._client._rpc('Commit')
+        self._client._sync._update(self.path, data)
+
+    async def delete(self):
+        await self._client._rpc('Commit')
+        self._client._sync._delete(self.path)
+
+
+class AsyncFakeAggregationQuery:
+    def __init__(self, client, sync):
+        self._client = client
+        self._sync = sync
+
+    async def get(self, transaction=None):
+        await self._client._rpc('RunAggregationQuery')
+        return self._sync._result()
+
+
+class AsyncFakeQuery:
+    _BUILDERS = ('where', 'limit', 'order_by', 'start_after', 'select')
+
+    def __init__(self, client, sync):
+        self._client = client
+        self._sync = sync
+
+    def __getattr__(self, name):
+        attr = getattr(self._sync, name)
+        if name in self._BUILDERS:
+            return lambda *args, **kwargs: AsyncFakeQuery(self._client, attr(*args, **kwargs))
+        return attr
+
+    def document(self, doc_id=None):
+        return AsyncFakeDocumentReference(self._client, self._sync.document(doc_id).path)
+
+    def count(self, alias=None):
+        return AsyncFakeAggregationQuery(self._client, self._sync.count())
+
+    async def stream(self, transaction=None):
+        await self._client._rpc('RunQuery')
+        for snapshot in self._sync._results():
+            yield snapshot
+
+    async def get(self, transaction=None):
+        return [snapshot async for snapshot in self.stream()]
+
+
+class AsyncFakeTransaction(FakeWriteBatch):
+    """The coroutine counterpart of FakeTransaction, for @async_transactional."""
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client._sync)
+        self._async_client = client
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._held = []
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    @property
+    def id(self):
+        return self._id
+
+    async def _lock_paths(self, paths):
+        for path in sorted(set(paths) - set(self._held)):
+            await self._async_client._document_lock(path).acquire()
+            self._held.append(path)
+
+    def _release(self):
+        for path in self._held:
+            self._async_client._document_lock(path).release()
+        self._held = []
+        self._id = None
+
+    def _clean_up(self):
+        self._ops = []
+        self._id = None
+
+    async def _begin(self, retry_id=None):
+        await self._async_client._rpc('BeginTransaction')
+        self._id = uuid.uuid4().bytes
+
+    async def _commit(self):
+        try:
+            await self._async_client._rpc('Commit')
+            self._apply()
+        finally:
+            self._release()
+        return []
+
+    async def _rollback(self):
+        self._ops = []
+        self._release()
+
+
+class AsyncFakeWriteBatch(FakeWriteBatch):
+    def __init__(self, client):
+        super().__init__(client._sync)
+        self._async_client = client
+
+    async def commit(self):
+        await self._async_client._rpc('Commit')
+        return self._apply()
+
+
+class AsyncFakeFirestoreClient:
+    """Shares documents and op counts with a FakeFirestoreClient."""
+
+    def __init__(self, sync):
+        self._sync = sync
+        self._document_locks = {}
+
+    @property
+    def ops(self):
+        return self._sync.ops
+
+    def collection(self, name):
+        return AsyncFakeQuery(self, self._sync.collection(name))
+
+    def document(self, path):
+        return AsyncFakeDocumentReference(self, path)
+
+    def batch(self):
+        return AsyncFakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return AsyncFakeTransaction(self, **kwargs)
+
+    async def get_all(self, references, field_paths=None, transaction=None):
+        paths = [ref.path for ref in references]
+        await self._rpc('BatchGetDocuments')
+        if transaction is not None:
+            await transaction._lock_paths(paths)
+        for path in paths:
+            yield self._sync._read(path, field_paths)
+
+    async def _rpc(self, name):
+        if self._sync.latency:
+            await asyncio.sleep(self._sync.latency)
+        self._sync.ops.rpc(name, self._sync.latency)
+
+    def _document_lock(self, path):
+        return self._document_locks.setdefault(path, asyncio.Lock())
+
+
+def install(latency=0.0):
+    """
+    Points firebase_admin's firestore.client() and firestore_async.client() at
+    a new fake, and makes initialize_app a no-op. Must run before `import app`,
+    whose extensions module creates the client at import time.
+    """
+    import firebase_admin
+    from firebase_admin import firestore, firestore_async
+
+    client = FakeFirestoreClient(latency=latency)
+    async_client = AsyncFakeFirestoreClient(client)
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    firestore.client = lambda *args, **kwargs: client
+    firestore_async.client = lambda *args, **kwargs: async_client
+    return client
@@ -0,0 +1,283 @@
+"""
+benchmarks/loadtest.py
+
+Load test for a single app instance, run in process against the in-memory
+Firestore fake (benchmarks/fake_firestore.py) or the Firestore emulator.
+
+Scenario, once per serving mode, each mode on its own freshly seeded college:
+
+    students  --students students each open GET /api/batch/<id> and then
+              POST /api/feedback/submit, arriving uniformly over --window
+              seconds (a class filling the form in once the link is shared)
+    hods      --hods HoDs of that department, arriving over the same window,
+              each loading the HoD dashboard and every faculty member's stats
+              page --page-loads times, revalidating with If-None-Match as a
+              browser does
+    admins    --admins admins reloading the admin dashboard --page-loads times
+
+    wsgi   the Flask app on a pool of --threads threads (one gunicorn gthread worker)
+    asgi   app/asgi through httpx's ASGI transport (one uvicorn worker)
+
+Latency is measured from the moment a request is issued, so time spent
+waiting for a free worker thread counts. Reported per endpoint: requests,
+status codes, throughput, p50/p95/p99 latency, and Firestore RPCs, RPC time
+and reads/writes/deletes/aggregations per request as the app itself reports
+them in its Server-Timing header (utils/firestore_metrics.py).
+
+The fake sleeps --rpc-latency ms per RPC; its numbers are comparable between
+runs on the same machine, not with production. From Backend/:
+
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --students 600 --window 5 --modes asgi --json out.json
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=demo-fds \\
+        python -m benchmarks.loadtest --backend emulator
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import seed_batch, seed_staff, student_submission, student_headers, percentile
+
+# Server-Timing metrics summed per endpoint: the `firestore` entry (RPC count
+# in its description, RPC time as its duration) and the fs-<op> counts
+COSTS = ('rpcs', 'rpcMs', 'reads', 'writes', 'deletes', 'aggregations')
+
+LOOKUP = 'batch lookup'
+SUBMIT = 'feedback submit'
+HOD_DASHBOARD = 'hod dashboard'
+FACULTY_STATS = 'faculty stats'
+ADMIN_DASHBOARD = 'admin dashboard'
+
+
+def parse_server_timing(header):
+    """{cost: value} from a Server-Timing header set by middleware/request_metrics.py."""
+    costs = {}
+    for metric in (header or '').split(','):
+        name, *params = [part.strip() for part in metric.split(';')]
+        params = dict(p.split('=', 1) for p in params if '=' in p)
+        desc = params.get('desc', '').strip('"')
+        if name == 'firestore':
+            costs['rpcMs'] = float(params.get('dur', 0))
+            costs['rpcs'] = int(desc.split()[0]) if desc else 0
+        elif name.startswith('fs-') and desc:
+            costs[name[3:]] = int(desc)
+    return costs
+
+
+class WsgiServer:
+    """The Flask app on a fixed pool of threads, like one gthread worker."""
+
+    def __init__(self, flask_app, threads):
+        self._app = flask_app
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self._local = threading.local()
+
+    def _call(self, method, path, headers, body):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self._app.test_client()
+        response = self._local.client.open(path, method=method, headers=headers, json=body)
+        return response.status_code, response.headers
+
+    async def request(self, method, path, headers=None, body=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._call, method, path, headers, body)
+
+    async def close(self):
+        self._pool.shutdown()
+
+
+class AsgiServer:
+    """app/asgi driven in this event loop, like one uvicorn worker."""
+
+    def __init__(self, flask_app):
+        import httpx
+        from app.asgi import create_asgi_app
+
+        transport = httpx.ASGITransport(app=create_asgi_app(flask_app))
+        self._client = httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None)
+
+    async def request(self, method, path, headers=None, body=None):
+        response = await self._client.request(method, path, headers=headers, json=body)
+        return response.status_code, response.headers
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.costs = defaultdict(Counter)
+
+    async def timed(self, server, label, method, path, headers=None, body=None):
+        started = time.perf_counter()
+        status, response_headers = await server.request(method, path, headers, body)
+        self.latencies[label].append(time.perf_counter() - started)
+        self.statuses[label][status] += 1
+        self.costs[label].update(parse_server_timing(response_headers.get('Server-Timing')))
+        return status, response_headers.get('ETag')
+
+
+async def _student(server, results, arrival, batch_id, faculty_ids, n):
+    await asyncio.sleep(arrival)
+    await results.timed(server, LOOKUP, 'GET', f'/api/batch/{batch_id}')
+    await results.timed(server, SUBMIT, 'POST', '/api/feedback/submit',
+                        student_headers(n), student_submission(batch_id, faculty_ids))
+
+
+async def _staff(server, results, arrival, token, pages, page_loads):
+    """Reloads `pages` [(label, path)] in order, sending back the ETags it got."""
+    await asyncio.sleep(arrival)
+    etags = {}
+    for _ in range(page_loads):
+        for label, path in pages:
+            headers = {'Authorization': f'Bearer {token}'}
+            if path in etags:
+                headers['If-None-Match'] = etags[path]
+            _, etag = await results.timed(server, label, 'GET', path, headers)
+            if etag:
+                etags[path] = etag
+
+
+def _seed(mode, args):
+    from app.utils.dashboard_snapshot import DashboardSnapshot
+
+    college = f'Load-{mode}-{int(time.time())}'
+    batch_id, faculty_ids = seed_batch(args.faculty, college=college, department='CSE',
+                                       total_students=0 if args.uncapped else args.students)
+    hod_tokens = seed_staff('hod', args.hods, college=college, department='CSE')
+    admin_tokens = seed_staff('admin', args.admins, college=college)
+    DashboardSnapshot.rebuild()
+    return batch_id, faculty_ids, hod_tokens, admin_tokens
+
+
+def _clear_caches():
+    from app.extensions import user_cache, token_version_cache, batch_cache, dashboard_cache, cache_version_cache
+
+    for cache in (user_cache, token_version_cache, batch_cache, dashboard_cache, cache_version_cache):
+        cache.clear()
+
+
+async def run_mode(flask_app, mode, args):
+    batch_id, faculty_ids, hod_tokens, admin_tokens = _seed(mode, args)
+    _clear_caches()
+
+    if mode == 'wsgi':
+        server = WsgiServer(flask_app, args.threads)
+    else:
+        server = AsgiServer(flask_app)
+
+    hod_pages = [(HOD_DASHBOARD, '/api/dashboard/hod')] + [
+        (FACULTY_STATS, f'/api/feedback/faculty/{fid}/stats') for fid in faculty_ids]
+    admin_pages = [(ADMIN_DASHBOARD, '/api/dashboard/admin')]
+
+    results = Results()
+    arrivals = lambda: random.uniform(0, args.window)
+    tasks = [_student(server, results, arrivals(), batch_id, faculty_ids, n) for n in range(args.students)]
+    tasks += [_staff(server, results, arrivals(), token, hod_pages, args.page_loads) for token in hod_tokens]
+    tasks += [_staff(server, results, arrivals(), token, admin_pages, args.page_loads) for token in admin_tokens]
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await server.close()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for label, values in results.latencies.items():
+        ms = [v * 1000 for v in values]
+        entry = {
+            'requests': len(ms),
+            'perSecond': round(len(ms) / elapsed, 1),
+            'p50': round(percentile(ms, 50), 1),
+            'p95': round(percentile(ms, 95), 1),
+            'p99': round(percentile(ms, 99), 1),
+            'statuses': dict(sorted(results.statuses[label].items())),
+            'perRequest': {cost: round(results.costs[label][cost] / len(ms), 2) for cost in COSTS},
+        }
+        endpoints[label] = entry
+    return {'mode': mode, 'elapsed': round(elapsed, 2), 'endpoints': endpoints}
+
+
+def report(result, args):
+    backend = f"fake, {args.rpc_latency:g} ms/RPC" if args.backend == 'fake' else 'emulator'
+    total = sum(e['requests'] for e in result['endpoints'].values())
+    print(f"\n{result['mode']} ({backend}): {args.students} students over {args.window:g}s, "
+          f"{args.hods} HoDs, {args.admins} admins × {args.page_loads} page loads")
+    print(f"  {total} requests in {result['elapsed']:.2f}s → {total / result['elapsed']:.1f} req/s")
+    print(f"  {'':<16} {'':>5} {'':>7} {'':>8} {'':>8} {'':>8}  {'Firestore per request':-^42}")
+    print(f"  {'endpoint':<16} {'reqs':>5} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f"  {'RPCs':>5} {'RPC ms':>7} {'reads':>6} {'writes':>6} {'dels':>5} {'aggs':>5}  statuses")
+    for label in (LOOKUP, SUBMIT, HOD_DASHBOARD, FACULTY_STATS, ADMIN_DASHBOARD):
+        e = result['endpoints'].get(label)
+        if not e:
+            continue
+        c = e['perRequest']
+        print(f"  {label:<16} {e['requests']:>5} {e['perSecond']:>7.1f} {e['p50']:>8.1f} {e['p95']:>8.1f}"
+              f" {e['p99']:>8.1f}  {c['rpcs']:>5.2f} {c['rpcMs']:>7.1f} {c['reads']:>6.2f} {c['writes']:>6.2f}"
+              f" {c['deletes']:>5.2f} {c['aggregations']:>5.2f}  {e['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['fake', 'emulator'], default='fake')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--window', type=float, default=10, help='seconds over which students arrive')
+    parser.add_argument('--faculty', type=int, default=8, help='faculty rated per submission')
+    parser.add_argument('--uncapped', action='store_true',
+                        help='no total_students cap, so submissions skip the counter shard reads')
+    parser.add_argument('--hods', type=int, default=5)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--page-loads', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=2, help='wsgi worker threads (gunicorn_config.py)')
+    parser.add_argument('--rpc-latency', type=float, default=15, help='fake backend: ms per Firestore RPC')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    fake = None
+    if args.backend == 'fake':
+        from . import fake_firestore
+        fake = fake_firestore.install(latency=args.rpc_latency / 1000)
+    elif not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        sys.exit('Set FIRESTORE_EMULATOR_HOST; this benchmark writes hundreds of test documents.')
+
+    # Read when app.config is imported
+    os.environ['RATELIMIT_ENABLED'] = 'false'
+    os.environ['SERVER_TIMING_ENABLED'] = 'true'
+    os.environ.setdefault('FLASK_ENV', 'development')
+    from app import create_app
+    from app.extensions import firestore_metrics
+
+    if fake:
+        fake.ops.listener = firestore_metrics.record
+    flask_app = create_app()
+    logging.disable(logging.INFO)
+
+    async def run_all():
+        results = []
+        for mode in args.modes.split(','):
+            with flask_app.app_context():
+                results.append(await run_mode(flask_app, mode, args))
+            report(results[-1], args)
+        return results
+
+    results = asyncio.run(run_all())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,11 @@ import os
 
 # Server
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-workers = 1
-threads = 2
+# More than one worker needs a shared token blocklist (BLOCKLIST_BACKEND=firestore
+# or redis); the in-memory backend only sees logouts handled by its own process.
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Also read by create_app() (REQUEST_THREADS) to size the password pool backlog
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
 worker_class = "gthread"
 timeout = 60
 graceful_timeout = 20
@@ -0,0 +1,29 @@
+"""faculty doc_id
+
+Revision ID: c7e4a2d9f1b3
+Revises: 50865ea3903a
+Create Date: 2026-10-17 10:12:44.318206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e4a2d9f1b3'
+down_revision = '50865ea3903a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Firestore id of the faculty member a row mirrors (SQL feedback backend, app/repositories/sql.py)
+    with op.batch_alter_table('faculty', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('doc_id', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_faculty_doc_id'), ['doc_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('faculty', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_faculty_doc_id'))
+        batch_op.drop_column('doc_id')
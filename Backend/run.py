@@ -4,7 +4,11 @@ from app import create_app
 from app.extensions import db
 from app.models.user import User
 
-app = create_app()
+# Password pool children (utils/passwords.py) are spawned and re-import this
+# script as __mp_main__ when it is run directly; they only run bcrypt.
+POOL_CHILD = __name__ == '__mp_main__'
+
+app = None if POOL_CHILD else create_app()
 
 def seed_admin():
     """Seed default admin account if none exists in Firestore."""
@@ -28,6 +32,7 @@ def seed_admin():
                     'is_active': True,
                     'created_at': datetime.now(timezone.utc)
                 }
+                new_admin['login_identifiers'] = User.login_identifiers(new_admin)
                 
                 users_ref.add(new_admin)
                 print('✅ Default admin created in Firestore')
@@ -43,6 +48,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=int(os.getenv("PORT", 5000)),
     )
-else:
+elif not POOL_CHILD:
     # Running under gunicorn
     seed_admin()
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Shared fixtures. The app runs against the in-memory Firestore fake
+(benchmarks/fake_firestore.py), which has to be installed before `app` is
+imported; from Backend/:
+
+    python -m pytest
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_firestore  # noqa: E402
+
+os.environ['RATELIMIT_ENABLED'] = 'false'
+os.environ['PASSWORD_POOL_WORKERS'] = '0'
+os.environ.setdefault('FLASK_ENV', 'development')
+
+FAKE = fake_firestore.install()
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def app_context(flask_app):
+    with flask_app.app_context():
+        yield flask_app
@@ -0,0 +1,136 @@
+"""
+SqlRepository against an in-memory SQLite database: the backend behind
+STORAGE_BACKEND=sql, exercised through the FeedbackRepository interface.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.common import form_parameters
+
+COLLEGE = 'Sql College'
+
+
+@pytest.fixture
+def repo(app_context):
+    from app.repositories.sql import SqlRepository
+
+    repository = SqlRepository.from_url('sqlite://')
+    repository.create_schema()
+    return repository
+
+
+def _batch(batch_id, faculty_ids, slot=1, total_students=0):
+    return {
+        'batch_id': batch_id, 'college': COLLEGE, 'department': 'CSE', 'branch': 'CSE',
+        'year': '2', 'semester': '1', 'section': 'A', 'slot': slot, 'total_students': total_students,
+        'is_active': True, 'created_at': datetime.now(timezone.utc),
+        'faculty': [{'id': fid, 'name': fid, 'college': COLLEGE, 'department': 'CSE'} for fid in faculty_ids],
+    }
+
+
+def _ratings(faculty_ids, rating):
+    return {fid: {p: rating for p in form_parameters()} for fid in faculty_ids}
+
+
+def test_feedback_repository_is_abstract():
+    from app.repositories import FeedbackRepository
+
+    class Partial(FeedbackRepository):
+        def submit(self, batch_id, batch_data, client_ip, comments, ratings_map):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_submit_and_stats(repo):
+    batch = _batch('b1', ['f1', 'f2'])
+    repo.submit('b1', batch, '10.0.0.1', '', _ratings(['f1', 'f2'], 4))
+    repo.submit('b1', batch, '10.0.0.2', 'good', _ratings(['f1', 'f2'], 8))
+    repo.submit('b1', batch, '10.0.0.3', '', _ratings(['f1'], 6))
+
+    stats = repo.faculty_stats(['f1', 'f2', 'f3']).stats()
+    assert stats['f1']['totalResponses'] == 3
+    assert stats['f1']['slot1']['overallAverage'] == 6.0
+    assert stats['f2']['totalResponses'] == 2
+    assert stats['f3'] is None
+
+    scoped = repo.scope_stats(COLLEGE, 'CSE', ['f1']).stats()
+    assert scoped['f1'] == stats['f1']
+    assert repo.count_submissions(COLLEGE) == 3
+    assert repo.submission_counts(['b1', 'b2']) == {'b1': 3, 'b2': 0}
+    assert repo.count_faculty_responses('f2') == 2
+
+
+def test_duplicate_device_is_rejected(repo):
+    from app.repositories import SubmissionRejected
+
+    batch = _batch('b1', ['f1'])
+    repo.submit('b1', batch, '10.0.0.1', '', _ratings(['f1'], 5))
+    with pytest.raises(SubmissionRejected) as rejected:
+        repo.submit('b1', batch, '10.0.0.1', '', _ratings(['f1'], 9))
+    assert rejected.value.status == 409
+    assert repo.submission_counts(['b1']) == {'b1': 1}
+
+
+def test_total_students_caps_submissions(repo):
+    from app.repositories import SubmissionRejected
+
+    batch = _batch('b1', ['f1'], total_students=2)
+    for n in range(2):
+        repo.submit('b1', batch, f'10.0.0.{n}', '', _ratings(['f1'], 5))
+    with pytest.raises(SubmissionRejected) as rejected:
+        repo.submit('b1', batch, '10.0.0.9', '', _ratings(['f1'], 5))
+    assert rejected.value.status == 409
+    assert repo.submission_counts(['b1']) == {'b1': 2}
+
+
+def test_total_students_is_read_from_the_synced_batch(repo):
+    from app.repositories import SubmissionRejected
+
+    cached = _batch('b1', ['f1'], total_students=5)
+    repo.sync_batch('b1', cached)
+    repo.sync_batch('b1', {**cached, 'total_students': 1})
+
+    repo.submit('b1', cached, '10.0.0.1', '', _ratings(['f1'], 5))
+    with pytest.raises(SubmissionRejected):
+        repo.submit('b1', cached, '10.0.0.2', '', _ratings(['f1'], 5))
+    assert repo.submission_counts(['b1']) == {'b1': 1}
+
+
+def test_invalid_ratings_are_rejected(repo):
+    from app.repositories import SubmissionRejected
+
+    with pytest.raises(SubmissionRejected) as rejected:
+        repo.submit('b1', _batch('b1', ['f1']), '10.0.0.1', '', _ratings(['f1'], 11))
+    assert rejected.value.status == 400
+
+
+def test_closed_batches_stop_counting_and_accepting(repo):
+    from app.repositories import SubmissionRejected
+
+    batch = _batch('b1', ['f1'])
+    repo.submit('b1', batch, '10.0.0.1', '', _ratings(['f1'], 5))
+    repo.close_batches(COLLEGE, ['b1'])
+    assert repo.count_submissions(COLLEGE) == 0
+    assert repo.count_submissions() == 1
+    with pytest.raises(SubmissionRejected) as rejected:
+        repo.submit('b1', batch, '10.0.0.2', '', _ratings(['f1'], 5))
+    assert rejected.value.status == 404
+
+
+def test_wipes_delete_submissions_and_ratings(repo):
+    repo.submit('b1', _batch('b1', ['f1', 'f2']), '10.0.0.1', '', _ratings(['f1', 'f2'], 5))
+    repo.submit('b2', _batch('b2', ['f1'], slot=2), '10.0.0.1', '', _ratings(['f1'], 7))
+    repo.submit('b2', _batch('b2', ['f1'], slot=2), '10.0.0.2', '', _ratings(['f1'], 9))
+
+    assert repo.wipe_batch_responses(['b2']) == 2
+    stats = repo.faculty_stats(['f1']).stats()
+    assert stats['f1']['totalResponses'] == 1
+    assert not stats['f1']['hasSlot2']
+
+    assert repo.wipe_faculty_responses('f2') == 1
+    assert repo.faculty_stats(['f1', 'f2']).stats() == {'f1': None, 'f2': None}
+    assert repo.count_submissions() == 0
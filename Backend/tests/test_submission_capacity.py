@@ -0,0 +1,61 @@
+"""
+total_students is enforced inside the submit transaction: a burst of more
+students than the cap stores exactly the cap, on the Flask routes and on the
+native ASGI ones, and the sharded counter agrees with the stored documents.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.common import seed_batch, student_headers, student_submission
+
+TOTAL_STUDENTS = 12
+STUDENTS = 40
+
+
+def _stored(batch_id):
+    from app.extensions import db
+    from app.models.feedback import FeedbackSubmission
+    from app.utils.counters import SubmissionCounter
+
+    query = db.collection(FeedbackSubmission.COLLECTION).where('batch_id', '==', batch_id)
+    return len(list(query.stream())), SubmissionCounter.get_count(batch_id)
+
+
+def _check(codes, batch_id):
+    assert codes.count(201) == TOTAL_STUDENTS
+    assert codes.count(409) == STUDENTS - TOTAL_STUDENTS
+    assert _stored(batch_id) == (TOTAL_STUDENTS, TOTAL_STUDENTS)
+
+
+def test_flask_burst_stops_at_total_students(app_context):
+    batch_id, faculty_ids = seed_batch(3, college='Capacity', total_students=TOTAL_STUDENTS)
+
+    def student(n):
+        client = app_context.test_client()
+        return client.post('/api/feedback/submit', json=student_submission(batch_id, faculty_ids),
+                           headers=student_headers(n)).status_code
+
+    with ThreadPoolExecutor(max_workers=STUDENTS) as pool:
+        codes = list(pool.map(student, range(STUDENTS)))
+    _check(codes, batch_id)
+
+
+def test_asgi_burst_stops_at_total_students(app_context):
+    from app.asgi import create_asgi_app
+
+    batch_id, faculty_ids = seed_batch(3, college='Capacity', department='ECE', total_students=TOTAL_STUDENTS)
+    asgi = create_asgi_app(app_context)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=asgi)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            async def student(n):
+                r = await client.post('/api/feedback/submit', json=student_submission(batch_id, faculty_ids),
+                                      headers=student_headers(n))
+                return r.status_code
+            return await asyncio.gather(*[student(n) for n in range(STUDENTS)])
+
+    _check(asyncio.run(burst()), batch_id)